@@ -0,0 +1,224 @@
+"""
+End-to-end get_dashboard_data benchmark against the fake Dune API.
+
+Starts benchmarks/fake_dune.py (and optional forwarding proxies) in a
+subprocess, so the server's threads and memory do not count towards the
+client, then runs `--calls` tool calls at `--concurrency`. By default every
+call requests a different dashboard, so all caches stay cold; `--warm`
+repeats one dashboard. Reports latency percentiles, throughput, peak RSS,
+per-stage timings from main.metrics and upstream request outcomes.
+
+`--output` saves the results as JSON; `--baseline` compares with a saved run
+and exits with status 1 if p95 latency, throughput or peak RSS is more than
+`--tolerance` worse:
+
+    python benchmarks/bench_dashboard.py --calls 50 --output baseline.json
+    python benchmarks/bench_dashboard.py --calls 50 --baseline baseline.json
+    python benchmarks/bench_dashboard.py --error-rate 0.05 --cloudflare-rate 0.02 --proxies 4 --proxy-failure-rate 0.1
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import re
+import resource
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+os.environ.setdefault("DUNE_USE_PROXY", "0")  # switched on below when --proxies is given
+os.environ.setdefault("DUNE_PROXY_POOL_START", "manual")  # never fetch real proxies
+os.environ.setdefault("DUNE_PROXY_STATE_FILE", "")
+os.environ.setdefault("DUNE_RESULT_STORE_DIR", "")  # results on disk would make later runs warm
+os.environ.setdefault("DUNE_RATE_LIMIT", "0")
+os.environ.setdefault("DUNE_PROXY_RATE_LIMIT", "0")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main  # noqa: E402
+from fake_dune import FAKE_HANDLE, FAKE_SLUG  # noqa: E402
+
+FAKE_DUNE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fake_dune.py")
+
+# 回归比较的指标：(结果中的键, 数值越大越好)
+COMPARED = (("p95", False), ("throughput", True), ("peak_rss_mb", False))
+
+
+def start_fake_dune(args):
+    """Run fake_dune.py in a subprocess; returns (process, base_url, proxy urls)."""
+    command = [
+        sys.executable, FAKE_DUNE, "--port", "0",
+        "--widgets", str(args.widgets), "--rows", str(args.rows), "--columns", str(args.columns),
+        "--latency", str(args.latency), "--error-rate", str(args.error_rate),
+        "--cloudflare-rate", str(args.cloudflare_rate), "--proxies", str(args.proxies),
+        "--proxy-latency", str(args.proxy_latency), "--proxy-failure-rate", str(args.proxy_failure_rate),
+    ]
+    if args.queries:
+        command += ["--queries", str(args.queries)]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    base_url, proxies = None, []
+    for line in process.stdout:
+        if match := re.match(r"Fake Dune API on (\S+)", line):
+            base_url = match.group(1)
+        elif match := re.match(r"Fake proxy on (\S+)", line):
+            proxies.append(match.group(1))
+        elif line.startswith("Ready"):
+            return process, base_url, proxies
+    raise RuntimeError("fake_dune.py exited before it was ready")
+
+
+def histogram_quantile(histogram, q):
+    """按分桶上界估计分位数（与Prometheus的histogram_quantile类似，不插值）"""
+    target = q * histogram.count
+    for bound, count in histogram.cumulative():
+        if count >= target:
+            return bound
+    return float("inf")
+
+
+def stage_timings():
+    stages = {}
+    for labels, histogram in main.metrics.samples().get("dune_stage_duration_seconds", []):
+        stages[dict(labels)["stage"]] = {
+            "count": histogram.count,
+            "mean": histogram.sum / histogram.count if histogram.count else 0.0,
+            "p95_le": histogram_quantile(histogram, 0.95),
+        }
+    return stages
+
+
+def request_outcomes():
+    outcomes = {}
+    for labels, value in main.metrics.samples().get("dune_http_requests_total", []):
+        labels = dict(labels)
+        outcomes[f"{labels['endpoint']}/{labels['route']}/{labels['outcome']}"] = value
+    return outcomes
+
+
+async def run(args, dashboard_url):
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies = []
+    failed_calls = 0
+    missing_charts = 0
+
+    async def call(i):
+        nonlocal failed_calls, missing_charts
+        url = dashboard_url if args.warm else f"{dashboard_url}-{i + 1}"
+        async with semaphore:
+            start = time.perf_counter()
+            result = json.loads(await main.get_dashboard_data(url, max_rows=args.max_rows))
+            latencies.append(time.perf_counter() - start)
+        if "error" in result:
+            failed_calls += 1
+        else:
+            missing_charts += args.widgets - len(result["charts"])
+
+    if args.warm:
+        await call(-1)  # fill the caches
+        latencies.clear()
+        main.metrics.reset()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(call(i) for i in range(args.calls)))
+    elapsed = time.perf_counter() - start
+    await main.http_pool.aclose()
+
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    return {
+        "calls": args.calls,
+        "elapsed": elapsed,
+        "throughput": args.calls / elapsed,
+        "p50": float(p50),
+        "p95": float(p95),
+        "p99": float(p99),
+        "failed_calls": failed_calls,
+        "missing_charts": missing_charts,
+    }
+
+
+def compare(results, baseline, tolerance):
+    """打印与基线的对比，返回退化的指标名"""
+    regressions = []
+    print(f"\n{'metric':<12} {'baseline':>10} {'current':>10} {'change':>8}")
+    for key, higher_is_better in COMPARED:
+        before, after = baseline[key], results[key]
+        change = after / before - 1 if before else 0.0
+        worse = -change if higher_is_better else change
+        flag = "  REGRESSION" if worse > tolerance else ""
+        print(f"{key:<12} {before:>10.3f} {after:>10.3f} {change:>+7.1%}{flag}")
+        if flag:
+            regressions.append(key)
+    return regressions
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--warm", action="store_true", help="repeat one dashboard instead of distinct ones")
+    parser.add_argument("--max-rows", type=int, default=None, help="max_rows passed to the tool")
+    parser.add_argument("--widgets", type=int, default=10)
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--columns", type=int, default=5)
+    parser.add_argument("--queries", type=int, default=None, help="distinct queries shared by the widgets")
+    parser.add_argument("--latency", type=float, default=0.02, help="seconds added per fake API response")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of responses that are 502 pages")
+    parser.add_argument("--cloudflare-rate", type=float, default=0.0, help="share of responses that are Cloudflare challenges")
+    parser.add_argument("--proxies", type=int, default=0, help="route requests through this many fake proxies")
+    parser.add_argument("--proxy-latency", type=float, default=0.0)
+    parser.add_argument("--proxy-failure-rate", type=float, default=0.0, help="share of proxied requests dropped")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="compare with results saved by --output")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative regression")
+    args = parser.parse_args()
+
+    main.structlog.configure(wrapper_class=main.structlog.make_filtering_bound_logger(logging.CRITICAL))
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    process, base_url, proxies = start_fake_dune(args)
+    try:
+        main.GRAPHQL_API = f"{base_url}/public/graphql"
+        main.EXECUTION_API = f"{base_url}/public/execution"
+        if proxies:
+            main.USE_PROXY_POOL = True
+            for proxy in proxies:
+                main.proxy_pool.record_result(proxy, True, args.proxy_latency)
+        rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        results = asyncio.run(run(args, f"https://dune.com/{FAKE_HANDLE}/{FAKE_SLUG}"))
+    finally:
+        process.terminate()
+        process.wait()
+
+    results["peak_rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    results["stages"] = stage_timings()
+    results["requests"] = request_outcomes()
+    results["config"] = {key: value for key, value in vars(args).items() if key not in ("output", "baseline", "tolerance")}
+
+    print(f"{args.calls} {'warm' if args.warm else 'cold'} calls, concurrency {args.concurrency}: "
+          f"{args.widgets} widgets x {args.rows} rows x {args.columns + 1} columns, latency {args.latency}s")
+    print(f"throughput {results['throughput']:.2f} calls/s  p50 {results['p50']:.3f}s  p95 {results['p95']:.3f}s  p99 {results['p99']:.3f}s")
+    print(f"failed calls {results['failed_calls']}  missing charts {results['missing_charts']}")
+    print(f"peak RSS {results['peak_rss_mb']:.0f} MB (after import {rss_before:.0f} MB)")
+    print(f"\n{'stage':<22} {'count':>6} {'mean (s)':>9} {'p95 (s) <=':>11}")
+    for stage, timing in results["stages"].items():
+        print(f"{stage:<22} {timing['count']:>6} {timing['mean']:>9.4f} {timing['p95_le']:>11}")
+    print(f"\n{'requests (endpoint/route/outcome)':<40} {'count':>6}")
+    for outcome, count in sorted(results["requests"].items()):
+        print(f"{outcome:<40} {count:>6}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get("config") != results["config"]:
+            print("\nnote: the baseline was run with different options")
+        if compare(results, baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main_cli()
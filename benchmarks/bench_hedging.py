@@ -0,0 +1,93 @@
+"""
+Tail latency of run_curl_command through proxies, with and without hedging.
+
+Routes GetLatestResultSetIds lookups through local forwarding proxies of which
+a small fraction of requests stall, and reports client-side p50/p95/p99 with
+hedging off and on (DUNE_HEDGE):
+
+    python benchmarks/bench_hedging.py --requests 400 --slow-fraction 0.05
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+
+import numpy as np
+
+os.environ.setdefault("DUNE_USE_PROXY", "0")  # no background proxy fetching; the pool is filled below
+os.environ.setdefault("DUNE_RATE_LIMIT", "0")
+os.environ.setdefault("DUNE_PROXY_RATE_LIMIT", "0")
+os.environ.setdefault("DUNE_PROXY_STATE_FILE", "")
+os.environ.setdefault("DUNE_PROXY_POOL_START", "manual")  # never fetch real proxies
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main  # noqa: E402
+from fake_dune import FakeDuneConfig, FakeDuneServer, FakeProxyServer, BASE_QUERY_ID  # noqa: E402
+
+
+async def run(server, args):
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies = []
+
+    async def lookup(i):
+        data = {
+            "operationName": "GetLatestResultSetIds",
+            "variables": {"queryId": BASE_QUERY_ID + i, "parameters": [], "canRefresh": True},
+            "query": main.GET_EXECUTION_QUERY,
+        }
+        async with semaphore:
+            start = time.perf_counter()
+            assert await main.run_curl_command(server.graphql_url, data) is not None
+            latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(lookup(i) for i in range(args.requests)))
+    return np.percentile(latencies, [50, 95, 99])
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--proxies", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.02, help="normal per-request proxy latency (s)")
+    parser.add_argument("--slow-fraction", type=float, default=0.05, help="share of requests that stall")
+    parser.add_argument("--slow-latency", type=float, default=2.0, help="latency of a stalled request (s)")
+    parser.add_argument("--percentile", type=float, default=main.HEDGE_PERCENTILE, help="hedge after this latency percentile")
+    args = parser.parse_args()
+
+    main.structlog.configure(wrapper_class=main.structlog.make_filtering_bound_logger(logging.WARNING))
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    proxies = [
+        FakeProxyServer(args.latency, args.slow_fraction, args.slow_latency, seed=i).start()
+        for i in range(args.proxies)
+    ]
+    main.USE_PROXY_POOL = True
+    main.HEDGE_PERCENTILE = args.percentile
+    for proxy in proxies:
+        main.proxy_pool.record_result(proxy.proxy_url, True, args.latency)
+
+    with FakeDuneServer(FakeDuneConfig()) as server:
+        print(f"{args.proxies} proxies, {args.slow_fraction:.0%} of requests stall for {args.slow_latency}s")
+        print(f"{'hedging':<8} {'p50 (s)':>8} {'p95 (s)':>8} {'p99 (s)':>8} {'hedged':>7} {'won':>5}")
+
+        async def compare():
+            for hedging in (False, True):
+                main.HEDGE_ENABLED = hedging
+                main.hedge_stats.update(hedged=0, hedge_won=0)
+                main.latency_trackers.clear()
+                p50, p95, p99 = await run(server, args)
+                stats = main.hedge_stats
+                print(f"{'on' if hedging else 'off':<8} {p50:>8.3f} {p95:>8.3f} {p99:>8.3f} {stats['hedged']:>7} {stats['hedge_won']:>5}")
+            await main.http_pool.aclose()
+
+        asyncio.run(compare())
+
+    for proxy in proxies:
+        proxy.stop()
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,116 @@
+"""
+Requests/sec of run_curl_command (pooled httpx) vs. the old curl subprocess path.
+
+Both backends send the same GetLatestResultSetIds / execution payloads to a
+local fake Dune server, sequentially and concurrently (a thread pool for
+curl, concurrent tasks for the async client).
+
+    python benchmarks/bench_http_client.py --requests 500 --concurrency 8
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+os.environ.setdefault("DUNE_RATE_LIMIT", "0")  # the fake server is not rate limited
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main  # noqa: E402
+from fake_dune import FakeDuneConfig, FakeDuneServer, BASE_QUERY_ID  # noqa: E402
+
+
+def curl_request(url, data):
+    """The pre-pool request path: one curl process per call, full argv rebuilt."""
+    cmd = ['curl', '-s', url]
+    for name, value in main.DUNE_HEADERS.items():
+        if name == 'cookie':
+            cmd.extend(['-b', value])
+        else:
+            cmd.extend(['-H', f'{name}: {value}'])
+    cmd.extend(['-H', 'content-type: application/json', '--data-raw', json.dumps(data)])
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    return json.loads(result.stdout)
+
+
+async def pooled_request(url, data):
+    return await main.run_curl_command(url, data, use_proxy=False)
+
+
+def payloads(server, count, rows):
+    """Alternate between a small GraphQL lookup and an execution fetch."""
+    for i in range(count):
+        query_id = BASE_QUERY_ID + (i % 10)
+        if rows and i % 2:
+            yield server.execution_url, {
+                "execution_id": f"01FAKE{query_id}",
+                "query_id": query_id,
+                "parameters": [],
+                "output_columns": [],
+                "sampling": {"count": 8000},
+            }
+        else:
+            yield server.graphql_url, {
+                "operationName": "GetLatestResultSetIds",
+                "variables": {"queryId": query_id, "parameters": [], "canRefresh": True},
+                "query": main.GET_EXECUTION_QUERY,
+            }
+
+
+def run_curl(server, count, concurrency, rows):
+    jobs = list(payloads(server, count, rows))
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for result in executor.map(lambda job: curl_request(*job), jobs):
+            assert result is not None
+    return count / (time.perf_counter() - start)
+
+
+async def run_pooled(server, count, concurrency, rows):
+    jobs = list(payloads(server, count, rows))
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def send(url, data):
+        async with semaphore:
+            assert await pooled_request(url, data) is not None
+
+    start = time.perf_counter()
+    await asyncio.gather(*(send(url, data) for url, data in jobs))
+    return count / (time.perf_counter() - start)
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--rows", type=int, default=100, help="rows per execution payload (0 = GraphQL only)")
+    args = parser.parse_args()
+
+    # 关闭info日志，避免日志输出影响计时
+    main.structlog.configure(wrapper_class=main.structlog.make_filtering_bound_logger(logging.WARNING))
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    config = FakeDuneConfig(rows=args.rows or 1)
+    with FakeDuneServer(config) as server:
+        print(f"{'backend':<8} {'mode':<14} {'req/s':>10}")
+        modes = (("sequential", 1), (f"concurrent={args.concurrency}", args.concurrency))
+        for mode, concurrency in modes:
+            rate = run_curl(server, args.requests, concurrency, args.rows)
+            print(f"{'curl':<8} {mode:<14} {rate:>10.1f}")
+
+        async def pooled():
+            await pooled_request(*next(payloads(server, 1, 0)))  # warm-up
+            for mode, concurrency in modes:
+                rate = await run_pooled(server, args.requests, concurrency, args.rows)
+                print(f"{'httpx':<8} {mode:<14} {rate:>10.1f}")
+            await main.http_pool.aclose()
+
+        asyncio.run(pooled())
+
+
+if __name__ == "__main__":
+    main_cli()
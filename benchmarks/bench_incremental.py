@@ -0,0 +1,102 @@
+"""
+Refresh cost of time-series charts after a new execution, with and without
+incremental fetching (DUNE_INCREMENTAL).
+
+Fetches a dashboard of daily time series, lets every query's new execution
+append `--new-rows` days, then fetches the dashboard again and reports the
+latency of that second call, the execution payload bytes downloaded and how
+many rows were reused from the previous result and spot-checked against the
+new execution. Both modes must return the same data:
+
+    python benchmarks/bench_incremental.py --rows 5000 --new-rows 1
+    python benchmarks/bench_incremental.py --order desc --full-result
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+
+os.environ.setdefault("DUNE_USE_PROXY", "0")
+os.environ.setdefault("DUNE_PROXY_POOL_START", "manual")
+os.environ.setdefault("DUNE_PROXY_STATE_FILE", "")
+os.environ.setdefault("DUNE_RESULT_STORE_DIR", "")  # results on disk would make the first call warm
+os.environ.setdefault("DUNE_RATE_LIMIT", "0")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main  # noqa: E402
+from fake_dune import FakeDuneConfig, FakeDuneServer  # noqa: E402
+
+
+def counter(name, **labels):
+    return sum(value for key, value in main.metrics.samples().get(name, []) if labels.items() <= dict(key).items())
+
+
+def execution_bytes():
+    """从指标中读出执行API响应的总字节数"""
+    return sum(histogram.sum for labels, histogram in main.metrics.samples().get("dune_http_response_bytes", [])
+               if dict(labels)["endpoint"] == "execution")
+
+
+async def refresh(server, args, incremental):
+    main.INCREMENTAL_ENABLED = incremental
+    for cache in (main.dashboard_cache, main.result_cache, main.latest_results):
+        cache.clear()
+    server.config.rows = args.rows
+    kwargs = {"full_result": True} if args.full_result else {"sample_size": args.rows + args.new_rows}
+    await main.get_dashboard_data(server.dashboard_url, **kwargs)
+
+    server.config.rows = args.rows + args.new_rows
+    main.metrics.reset()
+    start = time.perf_counter()
+    result = await main.get_dashboard_data(server.dashboard_url, **kwargs)
+    elapsed = time.perf_counter() - start
+    return (result, elapsed, execution_bytes(), counter("dune_incremental_rows_total", source="reused"),
+            counter("dune_incremental_rows_total", source="verified"))
+
+
+def chart_data(result):
+    """去掉增量结果的说明字段，只比较数据"""
+    dashboard = json.loads(result)
+    for chart in dashboard.get("charts", []):
+        chart.pop("incremental", None)
+    return dashboard
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--widgets", type=int, default=10)
+    parser.add_argument("--rows", type=int, default=5000, help="days in each series before the new execution")
+    parser.add_argument("--new-rows", type=int, default=1, help="days the new execution adds")
+    parser.add_argument("--columns", type=int, default=5)
+    parser.add_argument("--order", choices=("asc", "desc"), default="asc", help="row order of the query results")
+    parser.add_argument("--full-result", action="store_true", help="use full_result=True instead of sampling")
+    parser.add_argument("--latency", type=float, default=0.01, help="seconds added per fake API response")
+    args = parser.parse_args()
+
+    main.structlog.configure(wrapper_class=main.structlog.make_filtering_bound_logger(logging.WARNING))
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    config = FakeDuneConfig(args.widgets, args.rows, args.columns, args.latency, order=args.order)
+    with FakeDuneServer(config) as server:
+        main.GRAPHQL_API = server.graphql_url
+        main.EXECUTION_API = server.execution_url
+
+        async def compare():
+            results = {incremental: await refresh(server, args, incremental) for incremental in (False, True)}
+            await main.http_pool.aclose()
+            return results
+
+        results = asyncio.run(compare())
+
+    print(f"{args.widgets} charts x {args.rows} rows ({args.order}), new execution adds {args.new_rows} rows")
+    print(f"{'incremental':<12} {'latency (s)':>12} {'downloaded':>12} {'reused rows':>12} {'verified rows':>14}")
+    for incremental, (_, elapsed, downloaded, reused, verified) in results.items():
+        print(f"{'on' if incremental else 'off':<12} {elapsed:>12.3f} {downloaded / 2**20:>10.2f}MB {reused:>12} {verified:>14}")
+    assert chart_data(results[True][0]) == chart_data(results[False][0]), "incremental result differs"
+
+
+if __name__ == "__main__":
+    main_cli()
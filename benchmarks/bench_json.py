@@ -0,0 +1,98 @@
+"""
+JSON decode/encode cost of an execution payload per serializer backend.
+
+Times the steps a chart goes through: parsing the execution response,
+converting its rows to a ColumnarResult, and encoding the tool response from
+plain rows, from the columnar result, and in the column-oriented
+`format="columns"` output. "old" is parse + encode of plain rows; "served"
+is what the server does (parse, columnar_response, encode), trading some
+encode CPU with the json module for the much smaller cached columns
+("held"). orjson is measured only when it is installed
+(pip install "dune-dashboard-mcp[orjson]"):
+
+    python benchmarks/bench_json.py --rows 8000 --columns 6
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+os.environ.setdefault("DUNE_USE_PROXY", "0")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main  # noqa: E402
+from fake_dune import FakeDuneConfig, FakeDuneServer, BASE_QUERY_ID, build_rows, column_names  # noqa: E402
+
+
+def best_of(func, repeat):
+    """Best wall time of `repeat` runs, in milliseconds."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times) * 1000
+
+
+def peak_memory(func):
+    """Peak traced allocation of one run, in MB."""
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak / 2**20
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=8000)
+    parser.add_argument("--columns", type=int, default=6, help="numeric columns (plus a date column)")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    config = FakeDuneConfig(rows=args.rows, columns=args.columns)
+    server = FakeDuneServer(config)
+    server.server_close()  # only the payload builder is needed
+    columns = column_names(config)
+    payload = server.execution_payload({"execution_id": "01FAKE"}, columns, build_rows(config, BASE_QUERY_ID), args.rows)
+    print(f"payload: {args.rows} rows x {args.columns + 1} columns, {len(payload) / 2**20:.1f} MB")
+
+    backends = ["json"] + (["orjson"] if main.importlib.util.find_spec("orjson") else [])
+    print(f"{'backend':<8} {'decode':>9} {'columnar':>9} {'enc rows':>9} {'enc cols':>9} {'enc fmt':>9}"
+          f" {'old':>9} {'served':>9} {'held rows':>10} {'held cols':>10} {'peak rows':>10} {'peak cols':>10}")
+    for backend in backends:
+        serializer = main.serializer = main.JsonSerializer(backend)
+        response = serializer.loads(payload)
+        plain = {"charts": [{"data": response["execution_succeeded"]["data"]}]}
+        data = main.columnar_rows(response["execution_succeeded"])
+        shaped = {"charts": [{"data": data}]}
+        column_format = lambda: serializer.dumps({"charts": [{"data": main.columns_data(data, data.columns)}]})  # noqa: E731
+
+        def serve():
+            served = main.columnar_response(serializer.loads(payload))
+            return serializer.dumps({"charts": [{"data": served["execution_succeeded"]["data"]}]})
+
+        decode = best_of(lambda: serializer.loads(payload), args.repeat)
+        convert = best_of(lambda: main.columnar_rows(response["execution_succeeded"]), args.repeat)
+        encode_rows = best_of(lambda: serializer.dumps(plain), args.repeat)
+        encode_columnar = best_of(lambda: serializer.dumps(shaped), args.repeat)
+        encode_format = best_of(column_format, args.repeat)
+        old = best_of(lambda: serializer.dumps({"charts": [{"data": serializer.loads(payload)["execution_succeeded"]["data"]}]}), args.repeat)
+        served = best_of(serve, args.repeat)
+        assert json.loads(serializer.dumps(shaped)) == json.loads(serializer.dumps(plain)) == json.loads(serve())
+        # 缓存中保留的数据：解析出的行字典 vs 列数组
+        held_rows = peak_memory(lambda: serializer.loads(payload))
+        held_columnar = data.nbytes / 2**20
+        peak_rows = peak_memory(lambda: serializer.dumps(plain))
+        peak_columnar = peak_memory(lambda: serializer.dumps(shaped))
+        print(f"{backend:<8} {decode:>7.1f}ms {convert:>7.1f}ms {encode_rows:>7.1f}ms {encode_columnar:>7.1f}ms {encode_format:>7.1f}ms"
+              f" {old:>7.1f}ms {served:>7.1f}ms {held_rows:>8.1f}MB {held_columnar:>8.1f}MB {peak_rows:>8.1f}MB {peak_columnar:>8.1f}MB")
+    print(f"response size: rows {len(serializer.dumps(plain)) / 2**20:.1f} MB, format=columns {len(column_format()) / 2**20:.1f} MB")
+    if len(backends) == 1:
+        print("orjson is not installed; only the json module was measured")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,81 @@
+"""
+run_curl_command against a fake Dune server that answers 429 above a fixed rate.
+
+Sends GetLatestResultSetIds lookups from many concurrent tasks and reports how
+many succeeded per second and how many requests were rejected, once with
+rate limiting disabled (immediate retries) and once with the adaptive limiter
+starting well above the server's limit:
+
+    python benchmarks/bench_rate_limit.py --server-rate 20 --requests 400
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+
+os.environ.setdefault("DUNE_USE_PROXY", "0")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main  # noqa: E402
+from fake_dune import FakeDuneConfig, FakeDuneServer, BASE_QUERY_ID  # noqa: E402
+
+
+async def run(server, args, limiter):
+    main.rate_limiter = limiter
+    start_requests, start_rejected = server.request_count, server.rejected_count
+    semaphore = asyncio.Semaphore(args.concurrency)
+    succeeded = 0
+
+    async def lookup(i):
+        nonlocal succeeded
+        data = {
+            "operationName": "GetLatestResultSetIds",
+            "variables": {"queryId": BASE_QUERY_ID + i, "parameters": [], "canRefresh": True},
+            "query": main.GET_EXECUTION_QUERY,
+        }
+        async with semaphore:
+            if await main.run_curl_command(server.graphql_url, data, use_proxy=False):
+                succeeded += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(lookup(i) for i in range(args.requests)))
+    elapsed = time.perf_counter() - start
+    sent = server.request_count - start_requests
+    rejected = server.rejected_count - start_rejected
+    return succeeded, elapsed, sent, rejected
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--server-rate", type=float, default=20, help="requests/s the fake server accepts")
+    parser.add_argument("--start-rate", type=float, default=80, help="initial limiter rate (req/s)")
+    args = parser.parse_args()
+
+    main.structlog.configure(wrapper_class=main.structlog.make_filtering_bound_logger(logging.WARNING))
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    config = FakeDuneConfig(rate_limit=args.server_rate)
+    with FakeDuneServer(config) as server:
+        print(f"server limit {args.server_rate} req/s, {args.requests} lookups, concurrency {args.concurrency}")
+        print(f"{'limiter':<10} {'ok':>5} {'ok/s':>7} {'sent':>6} {'429s':>6}")
+        limiters = (
+            ("off", main.RateLimiter(rate=0)),
+            ("adaptive", main.RateLimiter(rate=args.start_rate, burst=args.start_rate)),
+        )
+
+        async def compare():
+            for name, limiter in limiters:
+                await asyncio.sleep(1.5)  # let the server's bucket refill between runs
+                succeeded, elapsed, sent, rejected = await run(server, args, limiter)
+                print(f"{name:<10} {succeeded:>5} {succeeded / elapsed:>7.1f} {sent:>6} {rejected:>6}")
+            await main.http_pool.aclose()
+
+        asyncio.run(compare())
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,103 @@
+"""
+Cold-start cost of the server: `import main` and import-to-ready latency.
+
+Each run starts a fresh interpreter. "import" is the time to import main.py,
+with the heavy modules and threads present afterwards; "ready" is the time
+from spawning `python main.py` until it answers an MCP initialize and
+tools/list over stdio. Pass --script to measure another copy of main.py
+(e.g. an older revision):
+
+    python benchmarks/bench_startup.py --runs 5
+    python benchmarks/bench_startup.py --proxy-start eager
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_PROBE = """
+import sys, threading, time
+sys.path.insert(0, {directory!r})
+start = time.perf_counter()
+import main
+elapsed = time.perf_counter() - start
+heavy = [name for name in ("pandas", "bs4", "requests") if name in sys.modules]
+print("RESULT", elapsed, threading.active_count(), ",".join(heavy) or "-")
+"""
+
+
+def measure_import(script, env):
+    probe = IMPORT_PROBE.format(directory=os.path.dirname(os.path.abspath(script)))
+    output = subprocess.run([sys.executable, "-c", probe], env=env, capture_output=True, text=True, check=True).stdout
+    line = next(line for line in output.splitlines() if line.startswith("RESULT"))
+    _, elapsed, threads, heavy = line.split()
+    return float(elapsed), int(threads), heavy
+
+
+def send(process, message):
+    process.stdin.write(json.dumps(message) + "\n")
+    process.stdin.flush()
+
+
+def wait_for(process, request_id):
+    """读取stdout直到收到指定id的响应（跳过日志行）"""
+    for line in process.stdout:
+        try:
+            message = json.loads(line)
+        except ValueError:
+            continue
+        if isinstance(message, dict) and message.get("id") == request_id:
+            return message
+    raise RuntimeError("server exited before answering")
+
+
+def measure_ready(script, env):
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, script], env=env, text=True,
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+    )
+    try:
+        send(process, {"jsonrpc": "2.0", "id": 1, "method": "initialize", "params": {
+            "protocolVersion": "2024-11-05",
+            "capabilities": {},
+            "clientInfo": {"name": "bench_startup", "version": "0"},
+        }})
+        wait_for(process, 1)
+        send(process, {"jsonrpc": "2.0", "method": "notifications/initialized"})
+        send(process, {"jsonrpc": "2.0", "id": 2, "method": "tools/list"})
+        wait_for(process, 2)
+        return time.perf_counter() - start
+    finally:
+        process.kill()
+        process.wait()
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--script", default=os.path.join(ROOT, "main.py"), help="main.py to measure")
+    parser.add_argument("--proxy-start", choices=("lazy", "eager"), default="lazy", help="DUNE_PROXY_POOL_START")
+    parser.add_argument("--no-proxy", action="store_true", help="set DUNE_USE_PROXY=0")
+    args = parser.parse_args()
+
+    env = dict(os.environ, DUNE_PROXY_POOL_START=args.proxy_start, DUNE_PROXY_STATE_FILE="")
+    if args.no_proxy:
+        env["DUNE_USE_PROXY"] = "0"
+
+    imports = [measure_import(args.script, env) for _ in range(args.runs)]
+    ready = [measure_ready(args.script, env) for _ in range(args.runs)]
+    _, threads, heavy = imports[-1]
+    print(f"{args.script} (proxy start: {args.proxy_start}{', proxy pool off' if args.no_proxy else ''}, {args.runs} runs)")
+    print(f"import main:     median {statistics.median(t for t, _, _ in imports):.3f}s  min {min(t for t, _, _ in imports):.3f}s")
+    print(f"  threads after import: {threads}, heavy modules loaded: {heavy}")
+    print(f"import-to-ready: median {statistics.median(ready):.3f}s  min {min(ready):.3f}s")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,435 @@
+"""
+Local stand-in for the Dune endpoints used by main.py.
+
+Serves the FindDashboard / GetLatestResultSetIds GraphQL operations and the
+public execution endpoint with synthetic, deterministic data so benchmarks can
+run offline. Point main.GRAPHQL_API / main.EXECUTION_API at `graphql_url` /
+`execution_url` of a running server. A share of requests can fail with a 502
+page or a Cloudflare challenge, and FakeProxyServer can drop connections.
+
+Dashboards named `fake-dashboard-<n>` use their own query IDs, so a benchmark
+can request distinct dashboards to keep every cache cold. Each query's latest
+execution ID includes the row count, so raising `config.rows` at runtime
+simulates a new execution that appended rows to the time series.
+
+Run standalone with:  python benchmarks/fake_dune.py --port 8765 --proxies 4
+"""
+import argparse
+import http.client
+import json
+import random
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+FAKE_HANDLE = "bench"
+FAKE_SLUG = "fake-dashboard"
+BASE_QUERY_ID = 3000000
+
+
+class FakeDuneConfig:
+    """Shape and behavior of the fake API."""
+
+    def __init__(self, widgets=10, rows=1000, columns=5, latency=0.0, page_limit=100000, rate_limit=None, queries=None,
+                 error_rate=0.0, cloudflare_rate=0.0, seed=0, order="asc", revisions=None):
+        self.widgets = widgets        # visualization widgets per dashboard
+        self.rows = rows              # rows per execution result
+        self.columns = columns        # numeric columns per result (plus a date column)
+        self.latency = latency        # seconds added to every response
+        self.page_limit = page_limit  # max rows returned per paginated request
+        self.rate_limit = rate_limit  # requests/s answered before returning 429 (None = unlimited)
+        self.queries = queries        # distinct queries shared by the widgets (None = one per widget)
+        self.error_rate = error_rate  # share of requests answered with a 502 HTML page
+        self.cloudflare_rate = cloudflare_rate  # share of requests answered with a Cloudflare challenge (403)
+        self.seed = seed              # seed of the failure injection
+        self.order = order            # "asc" (oldest day first) or "desc" (newest first)
+        self.revisions = revisions or {}  # day index -> value replacing every numeric column (revised history)
+
+
+def column_names(config):
+    return ["date"] + [f"value_{i}" for i in range(config.columns)]
+
+
+def dashboard_offset(config, slug):
+    """Query ID offset of a dashboard: `fake-dashboard-<n>` gets its own range."""
+    suffix = slug[len(FAKE_SLUG) + 1:] if slug.startswith(FAKE_SLUG + "-") else ""
+    return int(suffix) * config.widgets if suffix.isdigit() else 0
+
+
+def build_dashboard(config, handle=FAKE_HANDLE, slug=FAKE_SLUG):
+    """Build a FindDashboard node with `config.widgets` chart widgets."""
+    widgets = []
+    names = column_names(config)
+    offset = dashboard_offset(config, slug)
+    for i in range(config.widgets):
+        query_id = BASE_QUERY_ID + offset + (i % config.queries if config.queries else i)
+        # 共享查询的图表各自展示日期列和一个数值列
+        mapped = [names[0], names[1 + i % config.columns]] if config.queries else names
+        widgets.append({
+            "id": 9000000 + i,
+            "options": {},
+            "visualization": {
+                "id": 5000000 + i,
+                "type": "chart",
+                "name": f"Chart {i}",
+                "description": "",
+                "options": {"columnMapping": {name: {} for name in mapped}},
+                "created_at": "2024-01-01T00:00:00Z",
+                "query_details": {
+                    "query_id": query_id,
+                    "name": f"Query {i}",
+                    "description": "",
+                    "show_watermark": False,
+                    "parameters": [],
+                    "dataset_id": None,
+                    "user": {"id": 1, "name": handle, "profile_image_url": None},
+                    "team": None,
+                },
+            },
+        })
+
+    return {
+        "id": 120839,
+        "name": "Fake Dashboard",
+        "slug": slug,
+        "user": {"id": 1, "name": handle, "profile_image_url": None},
+        "team": None,
+        "textWidgets": [],
+        "visualizationWidgets": widgets,
+        "paramWidgets": [],
+    }
+
+
+def build_rows(config, query_id, columns=None, offset=0, limit=None):
+    """Deterministic daily time series for one query (rows offset..offset+limit)."""
+    names = columns or column_names(config)
+    start = datetime(2019, 6, 1, tzinfo=timezone.utc)
+    stop = config.rows if limit is None else min(config.rows, offset + limit)
+    rows = []
+    for r in range(offset, stop):
+        day = r if config.order == "asc" else config.rows - 1 - r
+        row = {}
+        for name in names:
+            if name == "date":
+                row[name] = (start + timedelta(days=day)).strftime("%Y-%m-%d %H:%M:%S.000 UTC")
+            elif day in config.revisions:
+                row[name] = config.revisions[day]
+            else:
+                row[name] = (query_id % 97) + day * 0.5 + sum(map(ord, name)) % 13
+        rows.append(row)
+    return rows
+
+
+BAD_GATEWAY_PAGE = b"<html><head><title>502 Bad Gateway</title></head><body><h1>502 Bad Gateway</h1></body></html>"
+CLOUDFLARE_PAGE = (
+    b"<!DOCTYPE html><html><head><title>Just a moment...</title></head><body>"
+    b"<div id=\"challenge-body-text\">Checking your browser before accessing dune.com.</div>"
+    b"<div class=\"footer\">Performance &amp; security by Cloudflare</div></body></html>"
+)
+
+
+class FakeDuneHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real API
+    disable_nagle_algorithm = True  # headers and body are written separately
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        length = int(self.headers.get("content-length", 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+        server = self.server
+
+        if server.config.latency:
+            time.sleep(server.config.latency)
+
+        with server.stats_lock:
+            server.request_count += 1
+            limited = not server.take_token()
+            failure = server.pick_failure()
+
+        if limited:
+            self.send_json(429, b'{"error": "rate limited"}')
+            return
+        if failure == "error":
+            self.send_html(502, BAD_GATEWAY_PAGE)
+            return
+        if failure == "cloudflare":
+            self.send_html(403, CLOUDFLARE_PAGE)
+            return
+
+        if self.path.endswith("/graphql"):
+            payload = server.handle_graphql(body)
+        elif self.path.endswith("/execution"):
+            payload = server.handle_execution(body)
+        else:
+            self.send_json(404, b'{"error": "not found"}')
+            return
+        self.send_json(200, payload)
+
+    def send_json(self, status, payload, content_type="application/json"):
+        self.send_response(status)
+        self.send_header("content-type", content_type)
+        self.send_header("content-length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def send_html(self, status, page):
+        self.send_json(status, page, "text/html")
+
+
+class FakeDuneServer(ThreadingHTTPServer):
+    """Threaded fake Dune API; use as a context manager or call start()/stop()."""
+
+    daemon_threads = True
+    request_queue_size = 1024  # many clients connect at once during load tests
+
+    def __init__(self, config=None, host="127.0.0.1", port=0):
+        super().__init__((host, port), FakeDuneHandler)
+        self.config = config or FakeDuneConfig()
+        self.stats_lock = threading.Lock()
+        self.request_count = 0
+        self.rejected_count = 0
+        self.failure_counts = {"error": 0, "cloudflare": 0}
+        self.rng = random.Random(self.config.seed)
+        self.tokens = self.config.rate_limit or 0
+        self.tokens_updated = time.monotonic()
+        self.payload_cache = {}
+        self.thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def graphql_url(self):
+        return f"{self.base_url}/public/graphql"
+
+    @property
+    def execution_url(self):
+        return f"{self.base_url}/public/execution"
+
+    @property
+    def dashboard_url(self):
+        return f"https://dune.com/{FAKE_HANDLE}/{FAKE_SLUG}"
+
+    def take_token(self):
+        """Token bucket with one second of burst; call with stats_lock held."""
+        rate = self.config.rate_limit
+        if not rate:
+            return True
+        now = time.monotonic()
+        self.tokens = min(rate, self.tokens + (now - self.tokens_updated) * rate)
+        self.tokens_updated = now
+        if self.tokens < 1:
+            self.rejected_count += 1
+            return False
+        self.tokens -= 1
+        return True
+
+    def pick_failure(self):
+        """Injected failure for this request ("error", "cloudflare" or None); call with stats_lock held."""
+        roll = self.rng.random()
+        if roll < self.config.error_rate:
+            failure = "error"
+        elif roll < self.config.error_rate + self.config.cloudflare_rate:
+            failure = "cloudflare"
+        else:
+            return None
+        self.failure_counts[failure] += 1
+        return failure
+
+    def handle_graphql(self, body):
+        operation = body.get("operationName")
+        variables = body.get("variables", {})
+        if operation == "FindDashboard":
+            filters = variables.get("filters", {})
+            handle = filters.get("handle", {}).get("equals", FAKE_HANDLE)
+            slug = filters.get("slug", {}).get("equals", FAKE_SLUG)
+            node = build_dashboard(self.config, handle, slug)
+            return json.dumps({"data": {"dashboards": {"edges": [{"node": node}]}}}).encode()
+        if operation == "GetLatestResultSetIds":
+            query_id = variables.get("queryId")
+            result = {
+                "completedExecutionId": f"01FAKE{query_id}R{self.config.rows}",
+                "failedExecutionId": None,
+                "pendingExecutionId": None,
+            }
+            return json.dumps({"data": {"resultSetForQuery": result}}).encode()
+        if operation == "GetLatestResultSetIdsBatch":
+            # 别名 result{i} 对应变量 queryId{i}
+            data = {}
+            i = 0
+            while f"queryId{i}" in variables:
+                query_id = variables[f"queryId{i}"]
+                data[f"result{i}"] = {
+                    "completedExecutionId": f"01FAKE{query_id}R{self.config.rows}",
+                    "failedExecutionId": None,
+                    "pendingExecutionId": None,
+                }
+                i += 1
+            return json.dumps({"data": data}).encode()
+        return json.dumps({"errors": [{"message": f"unknown operation {operation}"}]}).encode()
+
+    def handle_execution(self, body):
+        query_id = body.get("query_id")
+        columns = body.get("output_columns") or column_names(self.config)
+        pagination = body.get("pagination")
+        if pagination:
+            offset = pagination.get("offset", 0)
+            limit = min(pagination.get("limit", 100), self.config.page_limit)
+            rows = build_rows(self.config, query_id, columns, offset, limit)
+            return self.execution_payload(body, columns, rows, self.config.rows)
+
+        # 与真实API一样，未分页的请求只返回前 sampling.count 行
+        sample = (body.get("sampling") or {}).get("count")
+        # build_rows 的数据只取决于 query_id % 97，不同仪表盘的查询可以共用编码好的行
+        key = (query_id % 97, tuple(columns), sample, self.config.rows, self.config.order,
+               tuple(sorted(self.config.revisions.items())))
+        data = self.payload_cache.get(key)
+        if data is None:
+            data = self.payload_cache[key] = json.dumps(build_rows(self.config, query_id, columns, limit=sample)).encode()
+        return self.execution_payload(body, columns, None, self.config.rows).replace(b'"data": null', b'"data": ' + data, 1)
+
+    def execution_payload(self, body, columns, rows, total_row_count):
+        return json.dumps({
+            "execution_succeeded": {
+                "execution_id": body.get("execution_id"),
+                "columns": columns,
+                "columns_metadata": [
+                    {"name": name, "type": "timestamp with time zone" if name == "date" else "double"}
+                    for name in columns
+                ],
+                "data": rows,
+                "total_row_count": total_row_count,
+            }
+        }).encode()
+
+    def start(self):
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class FakeProxyHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        length = int(self.headers.get("content-length", 0))
+        body = self.rfile.read(length)
+        proxy = self.server
+        with proxy.stats_lock:
+            proxy.request_count += 1
+            slow = proxy.rng.random() < proxy.slow_fraction
+            failed = proxy.rng.random() < proxy.fail_fraction
+            proxy.failed_count += failed
+
+        time.sleep(proxy.slow_latency if slow else proxy.latency)
+        if failed:
+            # 模拟失效的免费代理：不返回任何响应直接断开
+            self.close_connection = True
+            return
+
+        # 代理请求行使用绝对URL（POST http://host:port/path）
+        target = urlsplit(self.path)
+        upstream = http.client.HTTPConnection(target.hostname, target.port, timeout=30)
+        try:
+            headers = {"content-type": self.headers.get("content-type", "application/json")}
+            upstream.request("POST", target.path, body=body, headers=headers)
+            response = upstream.getresponse()
+            payload = response.read()
+        finally:
+            upstream.close()
+
+        self.send_response(response.status)
+        self.send_header("content-type", "application/json")
+        self.send_header("content-length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+class FakeProxyServer(ThreadingHTTPServer):
+    """
+    Forwarding HTTP proxy; a `slow_fraction` of requests take `slow_latency`
+    seconds and a `fail_fraction` are dropped without a response.
+    """
+
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def __init__(self, latency=0.0, slow_fraction=0.0, slow_latency=1.0, seed=0, host="127.0.0.1", port=0, fail_fraction=0.0):
+        super().__init__((host, port), FakeProxyHandler)
+        self.latency = latency
+        self.slow_fraction = slow_fraction
+        self.slow_latency = slow_latency
+        self.fail_fraction = fail_fraction
+        self.rng = random.Random(seed)
+        self.stats_lock = threading.Lock()
+        self.request_count = 0
+        self.failed_count = 0
+        self.thread = None
+
+    def handle_error(self, request, client_address):
+        pass  # hedged requests are cancelled mid-flight; broken pipes are expected
+
+    @property
+    def proxy_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    start = FakeDuneServer.start
+    stop = FakeDuneServer.stop
+    __enter__ = FakeDuneServer.__enter__
+    __exit__ = FakeDuneServer.__exit__
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a fake Dune API server")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--widgets", type=int, default=10)
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--columns", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--queries", type=int, default=None, help="distinct queries shared by the widgets")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered with a 502 page")
+    parser.add_argument("--cloudflare-rate", type=float, default=0.0, help="share of requests answered with a Cloudflare challenge")
+    parser.add_argument("--proxies", type=int, default=0, help="forwarding proxies to start")
+    parser.add_argument("--proxy-latency", type=float, default=0.0)
+    parser.add_argument("--proxy-failure-rate", type=float, default=0.0, help="share of proxied requests dropped")
+    args = parser.parse_args()
+
+    config = FakeDuneConfig(
+        args.widgets, args.rows, args.columns, args.latency, queries=args.queries,
+        error_rate=args.error_rate, cloudflare_rate=args.cloudflare_rate,
+    )
+    proxies = [
+        FakeProxyServer(args.proxy_latency, seed=i, fail_fraction=args.proxy_failure_rate).start()
+        for i in range(args.proxies)
+    ]
+    server = FakeDuneServer(config, port=args.port)
+    print(f"Fake Dune API on {server.base_url} (dashboard {server.dashboard_url})")
+    for proxy in proxies:
+        print(f"Fake proxy on {proxy.proxy_url}")
+    print("Ready", flush=True)
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Concurrent get_dashboard_data invocations through the FastMCP tool layer.
+
+Fires N simultaneous tool calls at a fake Dune server with injected latency
+and reports throughput and latency per concurrency level. `--mode blocking`
+registers a synchronous wrapper tool that blocks the event loop for the whole
+call, which is how the server behaved before the call chain was async:
+
+    python benchmarks/load_test_tool.py --mode async
+    python benchmarks/load_test_tool.py --mode blocking
+"""
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import sys
+import threading
+import time
+
+os.environ.setdefault("DUNE_USE_PROXY", "0")
+os.environ.setdefault("DUNE_RATE_LIMIT", "0")  # the fake server is not rate limited
+# every call must reach the fake server: no dashboard/result caches, no result store, no incremental merges
+os.environ.setdefault("DUNE_DASHBOARD_CACHE_TTL", "0")
+os.environ.setdefault("DUNE_RESULT_CACHE_MAX_BYTES", "0")
+os.environ.setdefault("DUNE_RESULT_STORE_DIR", "")
+os.environ.setdefault("DUNE_INCREMENTAL", "0")
+os.environ.setdefault("DUNE_PROXY_STATE_FILE", "")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main  # noqa: E402
+from fake_dune import FakeDuneConfig, FakeDuneServer  # noqa: E402
+
+
+def register_blocking_tool():
+    """Register a sync tool that runs the async chain on a side loop and waits for it."""
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+
+    def get_dashboard_data_blocking(url: str) -> str:
+        future = asyncio.run_coroutine_threadsafe(main.get_dashboard_data(url), loop)
+        return future.result()
+
+    main.mcp.add_tool(get_dashboard_data_blocking)
+    return "get_dashboard_data_blocking"
+
+
+async def run_level(tool, url, concurrency):
+    latencies = []
+
+    # 所有调用同时提交，延迟从提交时刻算起（阻塞模式下排队时间也计入）
+    async def call():
+        await main.mcp.call_tool(tool, {"url": url})
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(call() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+    return concurrency / elapsed, statistics.median(latencies), p95
+
+
+async def run(args, server):
+    tool = register_blocking_tool() if args.mode == "blocking" else "get_dashboard_data"
+    await main.mcp.call_tool(tool, {"url": server.dashboard_url})  # warm-up
+
+    print(f"mode={args.mode} widgets={args.widgets} latency={args.latency}s")
+    print(f"{'concurrency':>11} {'calls/s':>9} {'p50 (s)':>9} {'p95 (s)':>9}")
+    for concurrency in args.levels:
+        rate, p50, p95 = await run_level(tool, server.dashboard_url, concurrency)
+        print(f"{concurrency:>11} {rate:>9.2f} {p50:>9.3f} {p95:>9.3f}")
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=("async", "blocking"), default="async")
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument("--widgets", type=int, default=10)
+    parser.add_argument("--rows", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds added per fake API response")
+    args = parser.parse_args()
+
+    main.structlog.configure(wrapper_class=main.structlog.make_filtering_bound_logger(logging.WARNING))
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    config = FakeDuneConfig(widgets=args.widgets, rows=args.rows, latency=args.latency)
+    with FakeDuneServer(config) as server:
+        main.GRAPHQL_API = server.graphql_url
+        main.EXECUTION_API = server.execution_url
+        asyncio.run(run(args, server))
+
+
+if __name__ == "__main__":
+    main_cli()
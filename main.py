@@ -1,14 +1,27 @@
 from mcp.server.fastmcp import FastMCP
 import json
-import pandas as pd
-import subprocess
+import numpy as np
+import httpx
 import os
-import requests
+import sys
+import asyncio
+import shutil
+import hashlib
+import argparse
+import atexit
+import base64
+import bisect
+import contextlib
+import functools
+import importlib.util
+import heapq
 import random
+import re
 import time
 import threading
-from bs4 import BeautifulSoup
-from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict, deque
+from collections.abc import Sequence
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from urllib.parse import urlparse
 from dotenv import load_dotenv
 import structlog
@@ -17,11 +30,26 @@ logger = structlog.get_logger()
 
 load_dotenv()
 
+@functools.cache
+def lazy_import(name):
+    """首次用到时才导入较重的模块（pandas、bs4、requests），缩短启动时间"""
+    return importlib.import_module(name)
+
+@contextlib.asynccontextmanager
+async def server_lifespan(server):
+    """服务器事件循环启动后开始刷新关注的仪表盘，退出时停止调度任务"""
+    watchlist.start()
+    try:
+        yield
+    finally:
+        await watchlist.stop()
+
 # Initialize MCP server
 mcp = FastMCP(
     name="Dune Dashboard MCP",
     description="Retrieve raw data from Dune dashboards",
-    dependencies=["pandas", "python-dotenv", "requests", "beautifulsoup4"],
+    dependencies=["pandas", "httpx", "python-dotenv", "requests", "beautifulsoup4"],
+    lifespan=server_lifespan,
 )
 
 # API endpoints
@@ -163,21 +191,115 @@ GET_EXECUTION_QUERY = """query GetLatestResultSetIds($canRefresh: Boolean!, $que
     }
 }"""
 
+# 代理健康检查配置
+PROXY_CHECK_CONCURRENCY = int(os.getenv('DUNE_PROXY_CHECK_CONCURRENCY', '200'))  # 同时检查的代理数
+PROXY_CHECK_TIMEOUT = float(os.getenv('DUNE_PROXY_CHECK_TIMEOUT', '3'))  # 单个代理检查的超时（秒）
+# 代理池维护配置
+PROXY_REFRESH_INTERVAL = float(os.getenv('DUNE_PROXY_REFRESH_INTERVAL', '1800'))  # 获取新候选代理的间隔（秒）
+PROXY_RECHECK_INTERVAL = float(os.getenv('DUNE_PROXY_RECHECK_INTERVAL', '120'))  # 滚动复查的间隔（秒）
+PROXY_RECHECK_BATCH = int(os.getenv('DUNE_PROXY_RECHECK_BATCH', '50'))  # 每轮复查的可用代理数
+PROXY_MAX_FAILURES = int(os.getenv('DUNE_PROXY_MAX_FAILURES', '3'))  # 连续失败多少次后移出代理池
+# 代理评分持久化配置（文件设为空字符串时关闭）
+PROXY_STATE_FILE = os.getenv('DUNE_PROXY_STATE_FILE', os.path.join(os.path.expanduser('~'), '.cache', 'dune-dashboard-mcp', 'proxies.json'))
+PROXY_STATE_SAVE_INTERVAL = float(os.getenv('DUNE_PROXY_STATE_SAVE_INTERVAL', '300'))  # 定期保存的间隔（秒）
+PROXY_STATE_MAX_AGE = float(os.getenv('DUNE_PROXY_STATE_MAX_AGE', '86400'))  # 超过该时长未确认健康的代理不再加载（秒）
+
+class ProxyScore:
+    """单个代理的延迟与成功率统计"""
+
+    LATENCY_WEIGHT = 0.3  # 延迟EWMA中新样本的权重
+
+    def __init__(self):
+        self.latency = None  # 平均延迟（秒，EWMA）
+        self.successes = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.last_checked = 0.0  # 最近一次得知健康状况的时间（主动检查或实际请求）
+        self.next_turn = 0.0  # 在调度堆中的虚拟时间
+
+    def record(self, ok, latency=None):
+        self.last_checked = time.time()
+        if ok:
+            self.successes += 1
+            self.consecutive_failures = 0
+            if latency is not None:
+                self.latency = latency if self.latency is None else self.latency + self.LATENCY_WEIGHT * (latency - self.latency)
+        else:
+            self.failures += 1
+            self.consecutive_failures += 1
+
+    def to_dict(self):
+        return {
+            "latency": self.latency,
+            "successes": self.successes,
+            "failures": self.failures,
+            "consecutive_failures": self.consecutive_failures,
+            "last_checked": self.last_checked,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        score = cls()
+        score.latency = data.get('latency')
+        score.successes = data.get('successes', 0)
+        score.failures = data.get('failures', 0)
+        score.consecutive_failures = data.get('consecutive_failures', 0)
+        score.last_checked = data.get('last_checked', 0.0)
+        return score
+
+    @property
+    def success_rate(self):
+        # 加一平滑，避免少量样本得到0或1
+        return (self.successes + 1) / (self.successes + self.failures + 2)
+
+    @property
+    def cost(self):
+        """延迟 / 成功率，越小越好"""
+        latency = self.latency if self.latency is not None else PROXY_CHECK_TIMEOUT
+        return latency / self.success_rate
+
 class FreeProxyPool:
+    """
+    Free proxies fetched from public lists, verified and scored.
+    
+    Working proxies are kept in a heap ordered by virtual time: each time a
+    proxy is handed out, its next turn moves forward by its cost (latency
+    divided by success rate). Fast, reliable proxies therefore come up more
+    often, slow ones still get occasional traffic, and `get_proxy` is
+    O(log n).
+    
+    The pool is maintained incrementally: working proxies are re-checked in
+    small rolling batches, new candidates are added without dropping healthy
+    proxies, and a proxy is only evicted after PROXY_MAX_FAILURES consecutive
+    failures, counting both health checks and real requests (reported via
+    `report_success` / `report_failure`).
+    
+    Scores of working proxies can be saved to a JSON file and loaded on the
+    next start, so requests go through known proxies immediately while the
+    background thread revalidates them.
+    """
+
     def __init__(self):
         self.proxies = set()
         self.working_proxies = set()
+        self.scores = {}  # proxy -> ProxyScore
+        self.heap = []  # (next_turn, proxy)，只包含working_proxies
+        self.clock = 0.0  # 最近一次出堆的虚拟时间
         self.lock = threading.Lock()
         self.test_url = "https://httpbin.org/ip"  # 用来测试代理
         self.initialized = False
         self.initialization_thread = None
-        self.max_workers = 20  # 最大并行验证代理的线程数
+        self.check_concurrency = PROXY_CHECK_CONCURRENCY
+        self.check_timeout = PROXY_CHECK_TIMEOUT
+        self.state_file = None
+        self.restored = 0  # 从状态文件加载、尚未重新验证的代理数
+        self.started = False
         
     def fetch_free_proxy_list(self):
         """从free-proxy-list.net获取免费代理"""
         try:
-            response = requests.get('https://free-proxy-list.net/', timeout=10)
-            soup = BeautifulSoup(response.text, 'html.parser')
+            response = lazy_import('requests').get('https://free-proxy-list.net/', timeout=10)
+            soup = lazy_import('bs4').BeautifulSoup(response.text, 'html.parser')
             table = soup.find('table', {'id': 'proxylisttable'})
             
             for row in table.tbody.find_all('tr'):
@@ -202,7 +324,7 @@ class FreeProxyPool:
         """从Geonode获取免费代理"""
         try:
             url = "https://proxylist.geonode.com/api/proxy-list?limit=500&page=1&sort_by=lastChecked&sort_type=desc"
-            response = requests.get(url, timeout=10)
+            response = lazy_import('requests').get(url, timeout=10)
             data = response.json()
             
             for proxy in data.get('data', []):
@@ -222,7 +344,7 @@ class FreeProxyPool:
         """从ProxyScrape获取免费代理"""
         try:
             url = "https://api.proxyscrape.com/v2/?request=getproxies&protocol=http&timeout=10000&country=all&ssl=all&anonymity=all"
-            response = requests.get(url, timeout=10)
+            response = lazy_import('requests').get(url, timeout=10)
             if response.status_code == 200:
                 proxy_list = response.text.strip().split("\r\n")
                 for proxy in proxy_list:
@@ -233,67 +355,206 @@ class FreeProxyPool:
         except Exception as e:
             logger.error(f"[Proxy Pool] Error fetching from ProxyScrape: {e}")
     
-    def check_proxy(self, proxy):
-        """检查代理是否可用"""
-        try:
-            proxies = {
-                'http': proxy,
-                'https': proxy,
-            }
-            response = requests.get(self.test_url, proxies=proxies, timeout=2)
-
-            if response.status_code == 200:
-                with self.lock:
-                    self.working_proxies.add(proxy)
-                    logger.info(f"[Proxy Pool] Working proxy found: {proxy}")
-                return True
-        except:
-            pass
-        return False
+    async def check_proxy(self, proxy, semaphore, ssl_context):
+        """检查代理是否可用，并记录延迟"""
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                async with httpx.AsyncClient(proxy=proxy, timeout=self.check_timeout, verify=ssl_context) as client:
+                    start = time.perf_counter()  # 不计入客户端创建时间
+                    response = await client.get(self.test_url)
+                ok = response.status_code == 200
+            except Exception:
+                ok = False
+            latency = time.perf_counter() - start
+        
+        self.record_result(proxy, ok, latency)
+        if ok:
+            logger.info(f"[Proxy Pool] Working proxy found: {proxy} ({latency:.2f}s)")
+        return ok
     
-    def verify_proxies(self):
-        """验证所有代理的可用性"""
-        logger.info(f"[Proxy Pool] Verifying {len(self.proxies)} proxies...")
+    async def verify_proxies_async(self, proxies):
+        """并发检查一批代理，同时进行的检查数受信号量限制"""
+        semaphore = asyncio.Semaphore(self.check_concurrency)
+        # 所有检查共用一个SSL上下文，避免每个客户端重新加载证书
+        ssl_context = httpx.create_ssl_context()
+        await asyncio.gather(*(self.check_proxy(proxy, semaphore, ssl_context) for proxy in proxies))
+    
+    def verify_proxies(self, proxies=None):
+        """验证代理的可用性（默认验证全部候选代理）"""
+        if proxies is None:
+            with self.lock:
+                proxies = list(self.proxies)
+        logger.info(f"[Proxy Pool] Verifying {len(proxies)} proxies...")
         
-        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-            executor.map(self.check_proxy, list(self.proxies))
+        start = time.perf_counter()
+        # 在后台线程自己的事件循环中运行
+        asyncio.run(self.verify_proxies_async(proxies))
             
-        logger.info(f"[Proxy Pool] Verification complete. Working proxies: {len(self.working_proxies)}")
+        logger.info(f"[Proxy Pool] Verification complete in {time.perf_counter() - start:.1f}s. Working proxies: {len(self.working_proxies)}")
+    
+    def record_result(self, proxy, ok, latency=None):
+        """记录一次检查或请求的结果，更新评分和调度堆"""
+        with self.lock:
+            score = self.scores.setdefault(proxy, ProxyScore())
+            score.record(ok, latency)
+            if ok and proxy not in self.working_proxies:
+                self.working_proxies.add(proxy)
+                # 新代理从当前虚拟时间开始排队
+                score.next_turn = self.clock + score.cost
+                heapq.heappush(self.heap, (score.next_turn, proxy))
+            elif not ok and proxy not in self.working_proxies:
+                # 未通过检查的候选代理不保留评分
+                del self.scores[proxy]
+            elif not ok and score.consecutive_failures >= PROXY_MAX_FAILURES:
+                self.evict(proxy)
+    
+    def evict(self, proxy):
+        """移出代理（调用方需持有锁）；堆中的旧条目在出堆时丢弃"""
+        self.working_proxies.discard(proxy)
+        self.proxies.discard(proxy)
+        self.scores.pop(proxy, None)
+        metrics.inc('dune_proxy_evictions_total')
+        logger.info(f"[Proxy Pool] Evicted proxy {proxy} after {PROXY_MAX_FAILURES} consecutive failures")
+    
+    def report_success(self, proxy, latency):
+        """实际请求通过代理成功（被动健康信号）"""
+        if proxy in self.working_proxies:
+            self.record_result(proxy, True, latency)
+    
+    def report_failure(self, proxy):
+        """实际请求通过代理失败（被动健康信号）"""
+        if proxy in self.working_proxies:
+            self.record_result(proxy, False)
     
     def get_proxy(self):
-        """获取一个随机可用代理"""
+        """获取下一个可用代理（按评分加权轮转），没有可用代理时返回None"""
         with self.lock:
-            if not self.working_proxies:
-                if self.initialized:
-                    # 如果已经初始化过，但没有工作代理，返回None
-                    return None
-                else:
-                    # 如果未初始化，返回None
-                    return None
-            return random.choice(list(self.working_proxies))
+            while self.heap:
+                next_turn, proxy = heapq.heappop(self.heap)
+                score = self.scores.get(proxy)
+                # 已移出可用集合的代理留在堆中，出堆时丢弃
+                if proxy not in self.working_proxies or score is None or score.next_turn != next_turn:
+                    continue
+                self.clock = next_turn
+                score.next_turn = next_turn + score.cost
+                heapq.heappush(self.heap, (score.next_turn, proxy))
+                return proxy
+            return None
     
-    def refresh(self):
-        """刷新代理池"""
+    def save_state(self, path=None):
+        """把可用代理及其评分写入状态文件"""
+        path = path or self.state_file
+        if not path:
+            return
         with self.lock:
-            self.proxies.clear()
-            self.working_proxies.clear()
-
+            state = {
+                "saved_at": time.time(),
+                "proxies": {proxy: self.scores[proxy].to_dict() for proxy in self.working_proxies},
+            }
+        try:
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(state, f)
+            os.replace(tmp_path, path)
+            logger.info(f"[Proxy Pool] Saved {len(state['proxies'])} proxies to {path}")
+        except OSError as e:
+            logger.error(f"[Proxy Pool] Failed to save proxy state: {e}")
+    
+    def load_state(self, path=None):
+        """
+        Load working proxies saved by `save_state`.
+        
+        Proxies not confirmed healthy within PROXY_STATE_MAX_AGE are skipped.
+        Loaded proxies are usable right away but are one failure away from
+        eviction until they pass a check or a real request again.
+        
+        Args:
+            path: State file (defaults to `state_file`)
+            
+        Returns:
+            int: Number of proxies loaded
+        """
+        path = path or self.state_file
+        try:
+            with open(path) as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            return 0
+        except (OSError, ValueError) as e:
+            logger.error(f"[Proxy Pool] Failed to load proxy state: {e}")
+            return 0
+        
+        now = time.time()
+        with self.lock:
+            for proxy, data in state.get('proxies', {}).items():
+                score = ProxyScore.from_dict(data)
+                if now - score.last_checked > PROXY_STATE_MAX_AGE or proxy in self.working_proxies:
+                    continue
+                score.consecutive_failures = max(score.consecutive_failures, PROXY_MAX_FAILURES - 1)
+                score.next_turn = self.clock + score.cost
+                self.scores[proxy] = score
+                self.proxies.add(proxy)
+                self.working_proxies.add(proxy)
+                heapq.heappush(self.heap, (score.next_turn, proxy))
+            self.restored = len(self.working_proxies)
+        logger.info(f"[Proxy Pool] Loaded {self.restored} proxies from {path}")
+        return self.restored
+    
+    def refresh(self):
+        """获取新的候选代理并验证，已可用的代理保持不变"""
         # self.fetch_free_proxy_list()
         # self.fetch_geonode_proxies()
         self.fetch_proxyscrape_proxies()
         
-        self.verify_proxies()
+        with self.lock:
+            candidates = [proxy for proxy in self.proxies if proxy not in self.working_proxies]
+        self.verify_proxies(candidates)
         
         with self.lock:
+            # 只保留可用代理，未通过的候选下次获取时会重新检查
+            self.proxies &= self.working_proxies
             self.initialized = True
+    
+    def recheck_working(self, batch_size=PROXY_RECHECK_BATCH):
+        """复查最久没有健康信号的一批可用代理"""
+        with self.lock:
+            batch = heapq.nsmallest(batch_size, self.working_proxies, key=lambda proxy: self.scores[proxy].last_checked)
+        if batch:
+            logger.info(f"[Proxy Pool] Re-checking {len(batch)} of {len(self.working_proxies)} working proxies")
+            self.verify_proxies(batch)
         
+    def start(self):
+        """
+        Start the pool once: load the saved proxies, save them again at exit
+        and begin fetching and verifying proxies in a background thread.
+        Later calls return immediately.
+        """
+        if self.started:
+            return
+        with self.lock:
+            if self.started:
+                return
+            self.started = True
+        if self.state_file:
+            self.load_state()
+            atexit.register(self.save_state)
+        logger.info("[Proxy Pool] Starting proxy pool in background...")
+        self.initialize_in_background()
+    
     def initialize_in_background(self):
         """在后台线程中初始化代理池"""
         def background_init():
             logger.info("[Proxy Pool] Starting background initialization...")
             try:
+                if self.restored:
+                    # 先重新验证上次保存的代理，失效的会被立即移出
+                    self.verify_proxies(list(self.working_proxies))
+                    self.restored = 0
                 self.refresh()
                 logger.info(f"[Proxy Pool] Initial proxy pool populated with {len(self.working_proxies)} working proxies")
+                self.save_state()
                 # 开始定期维护
                 self.maintain_pool()
             except Exception as e:
@@ -303,366 +564,3805 @@ class FreeProxyPool:
         self.initialization_thread = threading.Thread(target=background_init, daemon=True)
         self.initialization_thread.start()
         
-    def maintain_pool(self, interval=1800):
-        """定期维护代理池"""
+    def maintain_pool(self, interval=PROXY_REFRESH_INTERVAL):
+        """定期维护代理池：滚动复查可用代理，每隔 interval 秒补充新候选"""
+        last_refresh = last_save = time.monotonic()
         while True:
             try:
                 # 第一次初始化已经完成，这里是后续维护
-                time.sleep(interval)  # 先等待，避免过快刷新
-                logger.info("[Proxy Pool] Refreshing proxy pool...")
-                self.refresh()
-                logger.info(f"[Proxy Pool] Proxy pool refreshed. {len(self.working_proxies)} working proxies. Sleeping for {interval} seconds...")
+                time.sleep(PROXY_RECHECK_INTERVAL)
+                self.recheck_working()
+                if time.monotonic() - last_refresh >= interval:
+                    logger.info("[Proxy Pool] Fetching new proxy candidates...")
+                    self.refresh()
+                    last_refresh = time.monotonic()
+                    logger.info(f"[Proxy Pool] Proxy pool refreshed. {len(self.working_proxies)} working proxies.")
+                if time.monotonic() - last_save >= PROXY_STATE_SAVE_INTERVAL:
+                    self.save_state()
+                    last_save = time.monotonic()
             except Exception as e:
                 logger.info(f"[Proxy Pool] Error during proxy pool maintenance: {e}")
                 time.sleep(300)  # 出错后等待5分钟再尝试
 
-# 初始化代理池
+# 是否通过免费代理池发送请求（设为0时全部直连）
+USE_PROXY_POOL = os.getenv('DUNE_USE_PROXY', '1') == '1'
+# 代理池何时启动：lazy（第一次需要代理的请求时）、eager（服务器启动时）或 manual（只由代码调用 start()）
+PROXY_POOL_START = os.getenv('DUNE_PROXY_POOL_START', 'lazy')
+
+# 初始化代理池；导入模块时不加载状态文件，也不发起网络请求
 proxy_pool = FreeProxyPool()
+proxy_pool.state_file = PROXY_STATE_FILE or None
+
+# HTTP连接池配置（可通过环境变量调整）
+HTTP_POOL_SIZE = int(os.getenv('DUNE_HTTP_POOL_SIZE', '20'))  # 每个上游（直连或单个代理）的最大连接数
+HTTP_KEEPALIVE_CONNECTIONS = int(os.getenv('DUNE_HTTP_KEEPALIVE_CONNECTIONS', '20'))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv('DUNE_HTTP_KEEPALIVE_EXPIRY', '60'))
+HTTP_TIMEOUT = float(os.getenv('DUNE_HTTP_TIMEOUT', '30'))
+HTTP_MAX_PROXY_CLIENTS = int(os.getenv('DUNE_HTTP_MAX_PROXY_CLIENTS', '32'))
+# HTTP/2 需要可选依赖 h2（pip install "dune-dashboard-mcp[http2]"）
+HTTP2_ENABLED = os.getenv('DUNE_HTTP2', '1') == '1' and importlib.util.find_spec('h2') is not None
+
+# 限速与重试配置（速率为0时不限速）
+RATE_LIMIT = float(os.getenv('DUNE_RATE_LIMIT', '10'))  # 每个API端点每秒请求数
+RATE_LIMIT_BURST = float(os.getenv('DUNE_RATE_LIMIT_BURST', '20'))
+PROXY_RATE_LIMIT = float(os.getenv('DUNE_PROXY_RATE_LIMIT', '2'))  # 每个代理每秒请求数
+PROXY_RATE_LIMIT_BURST = float(os.getenv('DUNE_PROXY_RATE_LIMIT_BURST', '4'))
+RATE_LIMIT_MIN = float(os.getenv('DUNE_RATE_LIMIT_MIN', '0.2'))  # 被限流后最低降到的速率
+MAX_RETRIES = int(os.getenv('DUNE_MAX_RETRIES', '2'))
+RETRY_BASE_DELAY = float(os.getenv('DUNE_RETRY_BASE_DELAY', '0.5'))  # 指数退避的初始等待（秒）
+RETRY_MAX_DELAY = float(os.getenv('DUNE_RETRY_MAX_DELAY', '30'))
+REQUEST_DEADLINE = float(os.getenv('DUNE_REQUEST_DEADLINE', '60'))  # 单个请求（含重试和等待）的总时限（秒）
+
+# 对冲请求配置：代理请求超过近期延迟分位数仍未返回时，经另一个代理再发一次
+HEDGE_ENABLED = os.getenv('DUNE_HEDGE', '0') == '1'
+HEDGE_PERCENTILE = float(os.getenv('DUNE_HEDGE_PERCENTILE', '95'))
+HEDGE_MIN_DELAY = float(os.getenv('DUNE_HEDGE_MIN_DELAY', '0.25'))  # 对冲前的最短等待（秒），样本不足时也使用该值
+HEDGE_MAX_EXTRA = int(os.getenv('DUNE_HEDGE_MAX_EXTRA', '1'))  # 每次尝试最多额外发送的请求数
+LATENCY_WINDOW = int(os.getenv('DUNE_LATENCY_WINDOW', '1000'))  # 计算延迟分位数的最近样本数
+
+# 执行ID批量查询配置：同一时间窗口内的GetLatestResultSetIds查询合并为一个GraphQL请求
+EXECUTION_ID_BATCH_SIZE = int(os.getenv('DUNE_EXECUTION_ID_BATCH_SIZE', '25'))  # 每个请求最多解析的查询数（1表示不合并）
+EXECUTION_ID_BATCH_WINDOW = float(os.getenv('DUNE_EXECUTION_ID_BATCH_WINDOW', '0.002'))  # 收集查询的等待时间（秒）
+
+# 仪表盘图表并发抓取配置
+DASHBOARD_MAX_CONCURRENCY = int(os.getenv('DUNE_DASHBOARD_CONCURRENCY', '8'))
+DASHBOARD_DEADLINE = float(os.getenv('DUNE_DASHBOARD_DEADLINE', '120'))  # 单个仪表盘的总时限（秒）
+
+# 批量获取多个仪表盘（get_dashboards_data）：所有仪表盘的图表共享并发数和总时限
+BATCH_MAX_DASHBOARDS = int(os.getenv('DUNE_BATCH_MAX_DASHBOARDS', '20'))
+BATCH_CONCURRENCY = int(os.getenv('DUNE_BATCH_CONCURRENCY', '16'))
+BATCH_DEADLINE = float(os.getenv('DUNE_BATCH_DEADLINE', '300'))  # 整批的总时限（秒）
+
+# 仪表盘元数据缓存配置（FindDashboard结果）
+DASHBOARD_CACHE_TTL = float(os.getenv('DUNE_DASHBOARD_CACHE_TTL', '300'))  # 新鲜期（秒），0表示不缓存
+DASHBOARD_CACHE_STALE_TTL = float(os.getenv('DUNE_DASHBOARD_CACHE_STALE_TTL', '3600'))  # 过期后仍可先返回旧数据的时长，0表示关闭
+DASHBOARD_CACHE_MAX_ENTRIES = int(os.getenv('DUNE_DASHBOARD_CACHE_MAX_ENTRIES', '256'))
+DASHBOARD_CACHE_MAX_BYTES = int(os.getenv('DUNE_DASHBOARD_CACHE_MAX_BYTES', str(64 * 1024 * 1024)))
+
+# 查询结果缓存配置（execution结果不可变，无需TTL；字节预算为0时关闭）
+RESULT_CACHE_MAX_ENTRIES = int(os.getenv('DUNE_RESULT_CACHE_MAX_ENTRIES', '512'))
+RESULT_CACHE_MAX_BYTES = int(os.getenv('DUNE_RESULT_CACHE_MAX_BYTES', str(256 * 1024 * 1024)))
+
+# 图表数据采样与完整结果分页下载配置
+DEFAULT_SAMPLE_SIZE = int(os.getenv('DUNE_SAMPLE_SIZE', '8000'))
+FULL_RESULT_PAGE_SIZE = int(os.getenv('DUNE_FULL_RESULT_PAGE_SIZE', '10000'))
+FULL_RESULT_PAGE_CONCURRENCY = int(os.getenv('DUNE_FULL_RESULT_PAGE_CONCURRENCY', '4'))
+FULL_RESULT_MAX_ROWS = int(os.getenv('DUNE_FULL_RESULT_MAX_ROWS', '2000000'))
 
-# 异步启动代理池初始化
-logger.info("[Proxy Pool] Starting proxy pool in background...")
-proxy_pool.initialize_in_background()
+# 增量获取（默认关闭）：查询有新执行时，只下载比上次结果新的行，旧的历史行抽样核对后从上次结果复制
+INCREMENTAL_ENABLED = os.getenv('DUNE_INCREMENTAL', '0') == '1'
+INCREMENTAL_PAGE_SIZE = int(os.getenv('DUNE_INCREMENTAL_PAGE_SIZE', '50'))  # 查找新行的第一页行数，之后每页翻倍
+INCREMENTAL_VERIFY_PAGES = int(os.getenv('DUNE_INCREMENTAL_VERIFY_PAGES', '4'))  # 重新下载核对的历史行页数：最早、最新及随机位置
+INCREMENTAL_VERIFY_ROWS = int(os.getenv('DUNE_INCREMENTAL_VERIFY_ROWS', '50'))  # 每个核对页的行数
 
-def run_curl_command(url, data, is_json=True, use_proxy=True):
+# JSON后端：auto（安装了orjson时使用orjson）、orjson 或 json
+JSON_BACKEND = os.getenv('DUNE_JSON_BACKEND', 'auto')
+
+# 指标HTTP端点（端口为0时不启动；get_metrics工具和 metrics://prometheus 资源始终可用）
+METRICS_PORT = int(os.getenv('DUNE_METRICS_PORT', '0'))
+METRICS_HOST = os.getenv('DUNE_METRICS_HOST', '127.0.0.1')
+
+# 分页读取图表数据时每页的默认/最大行数
+CHART_PAGE_DEFAULT_LIMIT = int(os.getenv('DUNE_CHART_PAGE_DEFAULT_LIMIT', '1000'))
+CHART_PAGE_MAX_LIMIT = int(os.getenv('DUNE_CHART_PAGE_MAX_LIMIT', '10000'))
+
+# 本地持久化结果存储配置（目录设为空字符串时关闭）
+RESULT_STORE_DIR = os.getenv('DUNE_RESULT_STORE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'dune-dashboard-mcp', 'results'))
+RESULT_STORE_MAX_BYTES = int(os.getenv('DUNE_RESULT_STORE_MAX_BYTES', str(1024 * 1024 * 1024)))
+
+# 关注列表：后台定期刷新的仪表盘（文件设为空字符串时不持久化）
+WATCHLIST_FILE = os.getenv('DUNE_WATCHLIST_FILE', os.path.join(os.path.expanduser('~'), '.cache', 'dune-dashboard-mcp', 'watchlist.json'))
+WATCH_INTERVAL = float(os.getenv('DUNE_WATCH_INTERVAL', '300'))  # 默认刷新间隔（秒）
+WATCH_MIN_INTERVAL = float(os.getenv('DUNE_WATCH_MIN_INTERVAL', '30'))  # 允许的最短刷新间隔（秒）
+WATCH_JITTER = float(os.getenv('DUNE_WATCH_JITTER', '0.1'))  # 刷新间隔的随机浮动比例
+WATCH_CONCURRENCY = int(os.getenv('DUNE_WATCH_CONCURRENCY', '2'))  # 所有关注的仪表盘同时刷新的上限
+WATCH_RETRY_DELAY = float(os.getenv('DUNE_WATCH_RETRY_DELAY', '15'))  # 刷新失败后的首次重试等待（秒），之后翻倍，不超过刷新间隔
+WATCH_MAX_AGE = float(os.getenv('DUNE_WATCH_MAX_AGE', '3600'))  # 超过该时长的快照不再直接返回（秒），0表示不限
+
+# 所有Dune请求共用的浏览器请求头
+DUNE_HEADERS = {
+    'accept': '*/*',
+    'accept-language': 'zh-CN,zh;q=0.9',
+    'cookie': DUNE_COOKIES,
+    'origin': 'https://dune.com',
+    'priority': 'u=1, i',
+    'referer': 'https://dune.com/',
+    'sec-ch-ua': '"Google Chrome";v="135", "Not-A.Brand";v="8", "Chromium";v="135"',
+    'sec-ch-ua-mobile': '?0',
+    'sec-ch-ua-platform': '"macOS"',
+    'sec-fetch-dest': 'empty',
+    'sec-fetch-mode': 'cors',
+    'sec-fetch-site': 'same-site',
+    'user-agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/135.0.0.0 Safari/537.36',
+}
+
+class HttpClientPool:
     """
-    Run a curl command to make an HTTP request.
-    
-    Args:
-        url: The URL to send the request to
-        data: The data to send (either JSON or raw data)
-        is_json: Whether the data is JSON (if True, adds Content-Type header)
-        use_proxy: Whether to use a proxy (if False, uses direct connection)
-        
-    Returns:
-        dict: Response data parsed as JSON or None if failed
+    Keep one persistent async httpx client per upstream route.
+
+    httpx binds a proxy to the client, so the direct route and every proxy get
+    their own client (and connection pool). Proxy clients are kept in LRU order
+    and closed once more than `max_proxy_clients` are open.
+
+    In-flight requests per client are capped at the pool size: httpcore's
+    request queue gets slow when many requests wait for a connection, so
+    excess requests wait on a semaphore instead.
     """
-    max_retries = 2
-    
-    for retry in range(max_retries):
-        try:
-            # 创建基本curl命令
-            cmd = [
-                'curl', url,
-                '-H', 'accept: */*',
-                '-H', 'accept-language: zh-CN,zh;q=0.9',
-                '-b', DUNE_COOKIES,
-                '-H', 'origin: https://dune.com',
-                '-H', 'priority: u=1, i',
-                '-H', 'referer: https://dune.com/',
-                '-H', 'sec-ch-ua: "Google Chrome";v="135", "Not-A.Brand";v="8", "Chromium";v="135"',
-                '-H', 'sec-ch-ua-mobile: ?0',
-                '-H', 'sec-ch-ua-platform: "macOS"',
-                '-H', 'sec-fetch-dest: empty',
-                '-H', 'sec-fetch-mode: cors',
-                '-H', 'sec-fetch-site: same-site',
-                '-H', 'user-agent: Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/135.0.0.0 Safari/537.36',
-            ]
-            
-            # 如果使用代理，添加代理参数
-            if use_proxy:
-                proxy = proxy_pool.get_proxy()
-                if proxy:
-                    # 提取代理地址和端口
-                    if proxy.startswith('http://'):
-                        proxy_parts = proxy[7:].split(':')
-                    elif proxy.startswith('https://'):
-                        proxy_parts = proxy[8:].split(':')
-                    else:
-                        # 跳过此次重试，获取新代理
-                        logger.info(f"Invalid proxy format: {proxy}, retrying... ({retry+1}/{max_retries})")
-                        continue
-                        
-                    if len(proxy_parts) != 2:
-                        logger.info(f"Invalid proxy format: {proxy}, retrying... ({retry+1}/{max_retries})")
-                        continue
-                        
-                    proxy_host = proxy_parts[0]
-                    proxy_port = proxy_parts[1]
-                    cmd.extend(['-x', f"{proxy_host}:{proxy_port}"])
-                    logger.info(f"Using proxy: {proxy_host}:{proxy_port}")
-                else:
-                    # 如果代理池未初始化完成或没有可用代理，直接使用无代理连接
-                    logger.info(f"No proxy available, trying direct connection... ({retry+1}/{max_retries})")
-                    use_proxy = False
-            
-            # 添加Content-Type
-            if is_json:
-                cmd.extend(['-H', 'content-type: application/json'])
-                
-            # 添加数据
-            if isinstance(data, dict) or isinstance(data, list):
-                data_str = json.dumps(data)
-                cmd.extend(['--data-raw', data_str])
-            else:
-                cmd.extend(['--data-raw', str(data)])
-            
-            # 输出更简洁的命令日志
-            logger.info(f"Running curl to {url} (retry {retry+1}/{max_retries})")
-            
-            # 执行curl
-            result = subprocess.run(cmd, capture_output=True, text=True)
-            
-            if result.returncode != 0:
-                logger.info(f"Curl command failed with return code {result.returncode}: {result.stderr}")
-                if use_proxy:
-                    logger.info("Retrying with a different proxy...")
-                continue
+
+    def __init__(self, pool_size=HTTP_POOL_SIZE, keepalive_connections=HTTP_KEEPALIVE_CONNECTIONS,
+                 keepalive_expiry=HTTP_KEEPALIVE_EXPIRY, timeout=HTTP_TIMEOUT,
+                 max_proxy_clients=HTTP_MAX_PROXY_CLIENTS, http2=HTTP2_ENABLED):
+        self.pool_size = pool_size
+        self.limits = httpx.Limits(
+            max_connections=pool_size,
+            max_keepalive_connections=keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.timeout = httpx.Timeout(timeout)
+        self.http2 = http2
+        self.max_proxy_clients = max_proxy_clients
+        self.direct_entry = None
+        self.proxy_entries = OrderedDict()  # proxy -> (client, semaphore)
+        self.closing = set()
+        self.lock = threading.Lock()
+
+    def _create_entry(self, proxy=None):
+        client = httpx.AsyncClient(
+            headers=DUNE_HEADERS,
+            limits=self.limits,
+            timeout=self.timeout,
+            http2=self.http2,
+            proxy=proxy,
+        )
+        return client, asyncio.Semaphore(self.pool_size)
+
+    def _get_entry(self, proxy=None):
+        evicted = []
+        with self.lock:
+            if proxy is None:
+                if self.direct_entry is None:
+                    self.direct_entry = self._create_entry()
+                return self.direct_entry
+
+            entry = self.proxy_entries.get(proxy)
+            if entry is not None:
+                self.proxy_entries.move_to_end(proxy)
+                return entry
+
+            entry = self._create_entry(proxy)
+            self.proxy_entries[proxy] = entry
+            while len(self.proxy_entries) > self.max_proxy_clients:
+                _, (old_client, _) = self.proxy_entries.popitem(last=False)
+                evicted.append(old_client)
+
+        # 在锁外关闭被淘汰的客户端，不阻塞当前请求
+        for old_client in evicted:
+            task = asyncio.ensure_future(old_client.aclose())
+            self.closing.add(task)
+            task.add_done_callback(self.closing.discard)
+        return entry
+
+    def get_client(self, proxy=None):
+        """获取直连或指定代理对应的客户端"""
+        return self._get_entry(proxy)[0]
+
+    async def post(self, url, proxy=None, **kwargs):
+        """通过直连或指定代理发送POST请求"""
+        client, slots = self._get_entry(proxy)
+        async with slots:
+            return await client.post(url, **kwargs)
+
+    async def aclose(self):
+        """关闭所有客户端及其连接"""
+        with self.lock:
+            entries = list(self.proxy_entries.values())
+            if self.direct_entry is not None:
+                entries.append(self.direct_entry)
+            self.proxy_entries.clear()
+            self.direct_entry = None
+
+        for client, _ in entries:
+            await client.aclose()
+
+# 全局HTTP客户端池
+http_pool = HttpClientPool()
+
+class TokenBucket:
+    """
+    Token bucket whose rate adapts to throttling (AIMD).
+
+    Callers reserve a token and sleep for the returned delay, so waiting
+    requests queue up in order instead of bursting when tokens return. A
+    throttled response halves the rate (at most once per DECREASE_INTERVAL,
+    since requests already in flight report the same overload) and pauses
+    the bucket; each success adds back RECOVERY_STEP requests/s.
+    """
+
+    RECOVERY_STEP = 0.05  # 每次成功恢复的速率（请求/秒）
+    DECREASE_INTERVAL = 1.0  # 两次降速之间的最短间隔（秒）
+
+    def __init__(self, rate, burst, min_rate=RATE_LIMIT_MIN):
+        self.max_rate = rate
+        self.rate = rate
+        self.min_rate = min(min_rate, rate)
+        self.burst = max(burst, 1)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.last_decrease = float('-inf')
+        self.throttled = 0
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, deadline=None):
+        """预约一个令牌，返回需要等待的秒数；等待会超过deadline时不预约并返回None"""
+        now = time.monotonic()
+        self._refill(now)
+        wait = max(self.blocked_until - now, 0.0)
+        if self.tokens < 1:
+            wait = max(wait, (1 - self.tokens) / self.rate)
+        if deadline is not None and now + wait > deadline:
+            return None
+        self.tokens -= 1
+        return wait
+
+    def release(self):
+        """退还未使用的预约"""
+        self.tokens += 1
+
+    def on_success(self):
+        self.rate = min(self.max_rate, self.rate + self.RECOVERY_STEP)
+
+    def on_throttle(self, retry_after=None):
+        now = time.monotonic()
+        self._refill(now)
+        self.throttled += 1
+        if now - self.last_decrease < self.DECREASE_INTERVAL:
+            return
+        self.last_decrease = now
+        self.rate = max(self.min_rate, self.rate / 2)
+        pause = retry_after if retry_after is not None else 1 / self.rate
+        self.blocked_until = max(self.blocked_until, now + min(pause, RETRY_MAX_DELAY))
+        self.tokens = min(self.tokens, 0)
+
+    def stats(self):
+        return {"rate": round(self.rate, 3), "max_rate": self.max_rate, "throttled": self.throttled}
+
+class RateLimiter:
+    """
+    Token buckets per upstream endpoint and per proxy.
+
+    A request waits for a token from its endpoint's bucket and, when sent
+    through a proxy, from that proxy's bucket too. Throttling via a proxy
+    slows only that proxy (Cloudflare limits by client IP); throttling on the
+    direct route slows the endpoint.
+    """
+
+    def __init__(self, rate=RATE_LIMIT, burst=RATE_LIMIT_BURST,
+                 proxy_rate=PROXY_RATE_LIMIT, proxy_burst=PROXY_RATE_LIMIT_BURST, max_proxy_buckets=4096):
+        self.rate = rate
+        self.burst = burst
+        self.proxy_rate = proxy_rate
+        self.proxy_burst = proxy_burst
+        self.max_proxy_buckets = max_proxy_buckets
+        self.endpoint_buckets = {}
+        self.proxy_buckets = OrderedDict()
+
+    def endpoint_bucket(self, url):
+        if self.rate <= 0:
+            return None
+        bucket = self.endpoint_buckets.get(url)
+        if bucket is None:
+            bucket = self.endpoint_buckets[url] = TokenBucket(self.rate, self.burst)
+        return bucket
+
+    def proxy_bucket(self, proxy):
+        if proxy is None or self.proxy_rate <= 0:
+            return None
+        bucket = self.proxy_buckets.get(proxy)
+        if bucket is None:
+            bucket = self.proxy_buckets[proxy] = TokenBucket(self.proxy_rate, self.proxy_burst)
+            if len(self.proxy_buckets) > self.max_proxy_buckets:
+                self.proxy_buckets.popitem(last=False)
+        else:
+            self.proxy_buckets.move_to_end(proxy)
+        return bucket
+
+    async def acquire(self, url, proxy=None, deadline=None):
+        """
+        Wait until the request may be sent.
+        
+        Args:
+            url: Upstream endpoint
+            proxy: Proxy the request goes through, if any
+            deadline: Absolute time.monotonic() by which the request must start
             
-            try:
-                json_response = json.loads(result.stdout)
-                return json_response
-            except json.JSONDecodeError:
-                logger.error(f"Invalid JSON response: {result.stdout[:100]}...")
-                if "Cloudflare" in result.stdout or "cloudflare" in result.stdout.lower():
-                    logger.error("Cloudflare detected, trying with a different proxy...")
+        Returns:
+            bool: False if the wait would run past the deadline
+        """
+        reserved = []
+        wait = 0.0
+        for bucket in (self.endpoint_bucket(url), self.proxy_bucket(proxy)):
+            if bucket is None:
                 continue
-                
-        except Exception as e:
-            logger.error(f"Error during curl execution (retry {retry+1}/{max_retries}): {e}")
-    
-    # 如果所有重试都失败了，尝试直接连接（如果之前使用了代理）
-    if use_proxy:
-        logger.infot("All proxy attempts failed, trying direct connection...")
-        return run_curl_command(url, data, is_json, use_proxy=False)
+            bucket_wait = bucket.reserve(deadline)
+            if bucket_wait is None:
+                for reserved_bucket in reserved:
+                    reserved_bucket.release()
+                return False
+            reserved.append(bucket)
+            wait = max(wait, bucket_wait)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return True
+
+    def on_success(self, url, proxy=None):
+        for bucket in (self.endpoint_bucket(url), self.proxy_bucket(proxy)):
+            if bucket is not None:
+                bucket.on_success()
+
+    def on_throttle(self, url, proxy=None, retry_after=None):
+        bucket = self.proxy_bucket(proxy) if proxy else self.endpoint_bucket(url)
+        if bucket is not None:
+            bucket.on_throttle(retry_after)
+
+    def stats(self):
+        return {
+            "endpoints": {url: bucket.stats() for url, bucket in self.endpoint_buckets.items()},
+            "proxies": len(self.proxy_buckets),
+            "throttled_proxies": sum(1 for bucket in self.proxy_buckets.values() if bucket.rate < bucket.max_rate),
+        }
+
+# 全局限速器
+rate_limiter = RateLimiter()
+
+def backoff_delay(attempt):
+    """第 attempt 次重试前的等待：指数增长、完全随机抖动"""
+    return random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** (attempt - 1)))
+
+class LatencyTracker:
+    """最近成功请求延迟的滑动窗口，用于计算分位数"""
+
+    MIN_SAMPLES = 20  # 样本少于该数时不给出对冲阈值
+
+    def __init__(self, window=LATENCY_WINDOW):
+        self.samples = deque(maxlen=window)
+
+    def record(self, latency):
+        self.samples.append(latency)
+
+    def percentile(self, p):
+        if len(self.samples) < self.MIN_SAMPLES:
+            return None
+        return float(np.percentile(self.samples, p))
+
+    def stats(self):
+        if not self.samples:
+            return {"count": 0}
+        p50, p95, p99 = np.percentile(self.samples, [50, 95, 99])
+        return {"count": len(self.samples), "p50": round(p50, 4), "p95": round(p95, 4), "p99": round(p99, 4)}
+
+# 每个API端点的延迟统计与对冲计数
+latency_trackers = {}
+hedge_stats = {"hedged": 0, "hedge_won": 0}
+
+def latency_tracker(url):
+    tracker = latency_trackers.get(url)
+    if tracker is None:
+        tracker = latency_trackers[url] = LatencyTracker()
+    return tracker
+
+# 直方图分桶：耗时（秒）和数据大小（字节）
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+BYTES_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216, 67108864)
+
+class Histogram:
+    """累积分桶直方图（Prometheus语义：le 桶包含等于边界的值）"""
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # 最后一格是 +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        """[(le, 累计数), ...]，最后一项为 +Inf"""
+        total = 0
+        result = []
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+class Metrics:
+    """
+    Counters and histograms rendered in the Prometheus text format.
+
+    Hot paths call `inc` / `observe` with a metric name and labels; state
+    that other components already track (cache counters, proxy pool size,
+    rate limits) is read from their `stats()` when the metrics are rendered.
+    Updates take a lock because proxy checks and the result store run in
+    other threads.
+    """
+
+    def __init__(self):
+        self.counters = {}  # (name, labels) -> value
+        self.histograms = {}  # (name, labels) -> Histogram
+        self.lock = threading.Lock()
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, value, buckets=LATENCY_BUCKETS, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    def samples(self):
+        """
+        All current samples grouped by metric name.
         
-    logger.info("All retries failed")
-    return None
+        Returns:
+            dict: name -> list of (labels tuple, value or Histogram copy)
+        """
+        families = {}
+        with self.lock:
+            for (name, labels), value in self.counters.items():
+                families.setdefault(name, []).append((labels, value))
+            for (name, labels), histogram in self.histograms.items():
+                copy = Histogram(histogram.buckets)
+                copy.counts, copy.sum, copy.count = list(histogram.counts), histogram.sum, histogram.count
+                families.setdefault(name, []).append((labels, copy))
+        return families
 
-def parse_dune_url(url):
+    def reset(self):
+        with self.lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+# 全局指标
+metrics = Metrics()
+
+def timed(stage):
+    """装饰异步函数，把耗时记入 dune_stage_duration_seconds{stage}"""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                metrics.observe('dune_stage_duration_seconds', time.perf_counter() - start, stage=stage)
+        return wrapper
+    return decorator
+
+def endpoint_name(url):
+    """指标标签用的端点名，如 .../public/graphql -> graphql"""
+    parsed = urlparse(url)
+    return parsed.path.rstrip('/').rsplit('/', 1)[-1] or parsed.netloc
+
+class RequestDeadlineExceeded(Exception):
+    """请求在截止时间前无法完成"""
+
+def parse_retry_after(response):
+    """解析 Retry-After 头（秒数），无法解析时返回None"""
+    try:
+        return max(float(response.headers.get('retry-after')), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+class LRUCache:
     """
-    Parse a Dune dashboard URL to extract handle and slug.
+    In-memory LRU cache with an optional TTL and entry/byte budgets.
+
+    Entries older than `ttl` are stale; within `stale_ttl` after that they are
+    still returned (flagged as not fresh) so callers can serve them while they
+    refresh in the background. Older entries are dropped on access.
+    """
+
+    def __init__(self, max_entries, max_bytes, ttl=None, stale_ttl=0):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.entries = OrderedDict()  # key -> (value, size, stored_at)
+        self.total_bytes = 0
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        """返回 (value, fresh)；未命中时 value 为 None"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None, False
+
+            value, size, stored_at = entry
+            age = time.monotonic() - stored_at
+            if self.ttl is not None and age > self.ttl:
+                if age > self.ttl + self.stale_ttl:
+                    self._remove(key)
+                    self.misses += 1
+                    return None, False
+                self.entries.move_to_end(key)
+                self.stale_hits += 1
+                return value, False
+
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return value, True
+
+    def set(self, key, value, size):
+        """写入缓存，超出预算时按LRU顺序淘汰"""
+        if size > self.max_bytes:
+            return
+        with self.lock:
+            if key in self.entries:
+                self._remove(key)
+            self.entries[key] = (value, size, time.monotonic())
+            self.total_bytes += size
+            while len(self.entries) > self.max_entries or self.total_bytes > self.max_bytes:
+                oldest_key = next(iter(self.entries))
+                self._remove(oldest_key)
+                self.evictions += 1
+
+    def _remove(self, key):
+        _, size, _ = self.entries.pop(key)
+        self.total_bytes -= size
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.total_bytes = 0
+
+    def stats(self):
+        """命中/未命中/淘汰计数及当前占用"""
+        with self.lock:
+            return {
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self.entries),
+                "bytes": self.total_bytes,
+            }
+
+# 仪表盘元数据缓存，键为 (handle, slug)
+dashboard_cache = LRUCache(
+    max_entries=DASHBOARD_CACHE_MAX_ENTRIES,
+    max_bytes=DASHBOARD_CACHE_MAX_BYTES,
+    ttl=DASHBOARD_CACHE_TTL,
+    stale_ttl=DASHBOARD_CACHE_STALE_TTL,
+)
+# 正在后台刷新的仪表盘，避免重复刷新
+dashboard_refreshes = {}
+
+# 查询结果缓存，键为 (execution_id, query_id, columns)
+result_cache = LRUCache(
+    max_entries=RESULT_CACHE_MAX_ENTRIES,
+    max_bytes=RESULT_CACHE_MAX_BYTES,
+)
+# 每个 (query_id, parameters, columns) 最近一次完整结果的 result_key（只保存键，结果本身在result_cache中）
+latest_results = LRUCache(
+    max_entries=RESULT_CACHE_MAX_ENTRIES,
+    max_bytes=0,
+)
+
+class StringColumn:
+    """
+    Column of strings stored as one UTF-8 byte buffer plus int64 offsets.
+
+    String `i` is `buffer[offsets[i]:offsets[i + 1]]`, so a column takes the
+    bytes of its strings plus 8 bytes per row, however uneven the lengths
+    (a fixed-width numpy `<U` array pads every cell to the longest one at 4
+    bytes per character). Both arrays may be memory-mapped. Supports the
+    parts of the numpy array interface ColumnarResult uses: len, slicing
+    (a view sharing the buffer), indexing with an integer array (a copy),
+    tolist and nbytes.
+    """
+
+    def __init__(self, buffer, offsets):
+        self.buffer = buffer    # uint8
+        self.offsets = offsets  # int64, len(self) + 1 entries
+
+    @classmethod
+    def from_strings(cls, strings):
+        """从Python字符串列表构建"""
+        encoded = [string.encode() for string in strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum(np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded)), out=offsets[1:])
+        return cls(np.frombuffer(b''.join(encoded), dtype=np.uint8), offsets)
+
+    def compact(self):
+        """只含本列字符串的 (buffer, offsets)，偏移从0开始，用于写入磁盘"""
+        start, stop = int(self.offsets[0]), int(self.offsets[-1])
+        return self.buffer[start:stop], self.offsets - start
+
+    def tolist(self):
+        start = int(self.offsets[0])
+        data = self.buffer[start:int(self.offsets[-1])].tobytes()
+        bounds = (self.offsets - start).tolist()
+        return [data[a:b].decode() for a, b in zip(bounds, bounds[1:])]
+
+    @property
+    def nbytes(self):
+        return int(self.offsets[-1] - self.offsets[0]) + self.offsets.nbytes
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step == 1:
+                return StringColumn(self.buffer, self.offsets[start:max(start, stop) + 1])
+            index = np.arange(start, stop, step)
+        if np.ndim(index) == 0:
+            return self.buffer[self.offsets[index]:self.offsets[index + 1]].tobytes().decode()
+        # 按行号取出时复制对应的字节，不经过Python字符串
+        index = np.asarray(index, dtype=np.int64)
+        starts, stops = self.offsets[index], self.offsets[index + 1]
+        offsets = np.zeros(len(index) + 1, dtype=np.int64)
+        np.cumsum(stops - starts, out=offsets[1:])
+        buffer = np.concatenate([self.buffer[a:b] for a, b in zip(starts.tolist(), stops.tolist())] or [np.zeros(0, dtype=np.uint8)])
+        return StringColumn(buffer, offsets)
+
+def encode_column(values):
+    """
+    Encode one column of JSON values as a typed numpy array.
+    
+    Strings and JSON-encoded values are kept in a StringColumn rather than a
+    fixed-width numpy string array.
     
     Args:
-        url: The Dune dashboard URL
+        values: Column values as decoded from JSON
         
     Returns:
-        tuple: (handle, slug) or (None, None) if invalid
+        tuple: (kind, array, null mask or None); kind is one of
+        bool/int/float/str/json
     """
-    parsed_url = urlparse(url)
-    if 'dune.com' not in parsed_url.netloc:
-        return None, None
+    mask = np.fromiter((value is None for value in values), dtype=bool, count=len(values))
+    types = {type(value) for value in values if value is not None}
     
-    path_parts = parsed_url.path.strip('/').split('/')
-    if len(path_parts) != 2:
-        return None, None
+    if types <= {bool}:
+        kind = 'bool'
+        array = np.array([bool(value) for value in values], dtype=bool)
+    elif types <= {int, float}:
+        kind = 'int' if types == {int} else 'float'
+        try:
+            if kind == 'int':
+                array = np.array([0 if value is None else value for value in values], dtype=np.int64)
+            else:
+                array = np.array([np.nan if value is None else value for value in values], dtype=np.float64)
+        except OverflowError:
+            # 超出int64范围的整数按JSON保存，避免丢失精度
+            kind = 'json'
+    elif types <= {str}:
+        kind = 'str'
+        array = StringColumn.from_strings(['' if value is None else value for value in values])
+    else:
+        kind = 'json'
     
-    return path_parts[0], path_parts[1]
+    if kind == 'json':
+        array = StringColumn.from_strings(['' if value is None else json.dumps(value) for value in values])
+    
+    return kind, array, mask if mask.any() else None
 
-def fetch_dashboard_info(handle, slug):
+def parse_timestamps(values):
     """
-    Fetch dashboard information from Dune API.
+    Parse Dune timestamp strings ("2024-01-01 00:00:00.000 UTC") once.
+    
+    Only values matching TIMESTAMP_TEMPLATE character by character are
+    accepted, so format_timestamps reproduces them exactly.
     
     Args:
-        handle: The user/team handle
-        slug: The dashboard slug
+        values: Column values as decoded from JSON
         
     Returns:
-        dict: Dashboard data or None if failed
+        tuple: (datetime64[ms] array, null mask), or None if some value is
+        not such a timestamp
     """
-    dashboard_query = {
-        "operationName": "FindDashboard",
-        "variables": {
-            "filters": {
-                "slug": {"equals": slug},
-                "handle": {"equals": handle}
-            }
-        },
-        "query": FIND_DASHBOARD_QUERY
-    }
-    
-    response = run_curl_command(GRAPHQL_API, dashboard_query)
-    
-    if not response:
+    mask = np.fromiter((value is None for value in values), dtype=bool, count=len(values))
+    present = [value for value in values if value is not None]
+    if not all(type(value) is str for value in present):
         return None
     
-    # Check if dashboard exists
-    if not response.get('data', {}).get('dashboards', {}).get('edges'):
+    # 多留一个字符，较长的字符串在最后一位不为0
+    width = len(TIMESTAMP_TEMPLATE) + 1
+    strings = np.array(present, dtype=f'U{width}')
+    codes = strings.view(np.uint32).reshape(len(strings), width)
+    template = np.frombuffer((TIMESTAMP_TEMPLATE + '\0').encode('utf-32-le'), dtype=np.uint32)
+    digits = template == ord('0')
+    if not ((codes[:, ~digits] == template[~digits]).all() and (codes[:, digits] - ord('0') < 10).all()):
         return None
     
-    return response['data']['dashboards']['edges'][0]['node']
+    array = np.full(len(values), np.datetime64('NaT'), dtype='datetime64[ms]')
+    try:
+        array[~mask] = strings.astype(f'U{len(TIMESTAMP_TEMPLATE) - len(TIMESTAMP_SUFFIX)}').astype('datetime64[ms]')
+    except ValueError:
+        return None  # 例如 2024-02-30
+    return array, mask
 
-def get_execution_id(query_id, parameters):
-    """
-    Get execution ID for a query.
+def format_timestamps(array):
+    """datetime64数组 -> Dune格式的时间字符串列表（NaT为None）"""
+    return [None if value == 'NaT' else value.replace('T', ' ') + TIMESTAMP_SUFFIX
+            for value in np.datetime_as_string(array, unit='ms').tolist()]
+
+def decode_column(kind, array, mask=None):
+    """把 encode_column 的结果还原为Python值列表"""
+    if kind == 'json':
+        values = [json.loads(value) if value else None for value in array.tolist()]
+    elif kind == 'timestamp':
+        values = format_timestamps(array)
+    else:
+        values = array.tolist()
+    
+    if mask is not None:
+        for index in np.flatnonzero(mask).tolist():
+            values[index] = None
+    return values
+
+# columns_metadata类型到列存储类型的映射，其余类型按Python对象保存
+COLUMN_TYPE_KINDS = {
+    'double': 'float',
+    'real': 'float',
+    'float': 'float',
+    'integer': 'int',
+    'int': 'int',
+    'bigint': 'int',
+    'smallint': 'int',
+    'tinyint': 'int',
+    'boolean': 'bool',
+    'timestamp': 'timestamp',
+    'timestamp with time zone': 'timestamp',
+}
+KIND_DTYPES = {'float': np.float64, 'int': np.int64, 'bool': bool, 'timestamp': 'datetime64[ms]'}
+TIMESTAMP_SUFFIX = ' UTC'
+# API返回的时间戳格式，0表示任意数字
+TIMESTAMP_TEMPLATE = '0000-00-00 00:00:00.000 UTC'
+
+def column_kind(column_type):
+    """columns_metadata 中的类型 -> 列存储类型，如 "timestamp(3) with time zone" -> timestamp"""
+    column_type = re.sub(r'\(\d+\)', '', str(column_type or '')).strip().lower()
+    return COLUMN_TYPE_KINDS.get(column_type, 'object')
+
+class ColumnarResult(Sequence):
+    """
+    Execution result rows stored column by column.
+
+    Each column is a (kind, numpy array or StringColumn, null mask) triple in
+    the same encoding as encode_column, plus a "timestamp" kind (datetime64, parsed
+    once from the API's strings) and an "object" kind for columns whose type
+    is not known up front. The class behaves as a read-only sequence of row
+    dicts, so code written for the API's list of rows keeps working; rows are
+    only materialized for the slice that is read.
+
+    Columns typed "double"/"real"/"float" are float64 arrays, so integral
+    values the API sent as JSON integers come back as floats (1 -> 1.0).
+    """
+
+    CHUNK_ROWS = 4096
+
+    def __init__(self, columns, encoded_columns, length):
+        self.columns = list(columns)
+        self.encoded = encoded_columns  # name -> [kind, array, mask]
+        self.length = length
+
+    @classmethod
+    def allocate(cls, columns, columns_metadata, capacity):
+        """按columns_metadata的类型预分配 capacity 行的列数组"""
+        column_types = {column_meta.get('name'): column_meta.get('type') for column_meta in columns_metadata or []}
+        encoded = {}
+        for name in columns:
+            kind = column_kind(column_types.get(name))
+            if kind == 'object':
+                encoded[name] = ['object', np.empty(capacity, dtype=object), None]
+            else:
+                encoded[name] = [kind, np.zeros(capacity, dtype=KIND_DTYPES[kind]), np.zeros(capacity, dtype=bool)]
+        return cls(columns, encoded, 0)
+
+    @classmethod
+    def from_rows(cls, columns, rows):
+        """从API返回的行列表构建"""
+        encoded = {name: list(encode_column([row.get(name) for row in rows])) for name in columns}
+        return cls(columns, encoded, len(rows))
+
+    def write(self, offset, rows):
+        """
+        Copy rows into the column arrays starting at `offset`.
+        
+        Typed columns whose values do not fit their type (e.g. a "double"
+        column holding strings) fall back to the object kind.
+        """
+        end = offset + len(rows)
+        self._reserve(end)
+        for name in self.columns:
+            values = [row.get(name) for row in rows]
+            column = self.encoded[name]
+            if column[0] == 'timestamp':
+                parsed = parse_timestamps(values)
+                if parsed is not None:
+                    column[1][offset:end], column[2][offset:end] = parsed
+                    continue
+                self._demote(name)
+            elif column[0] != 'object' and not self._fits(column[0], values):
+                self._demote(name)
+            kind, array, mask = self.encoded[name]
+            if kind == 'object':
+                array[offset:end] = np.fromiter(values, dtype=object, count=len(values))
+            else:
+                mask[offset:end] = np.fromiter((value is None for value in values), dtype=bool, count=len(values))
+                array[offset:end] = np.fromiter((0 if value is None else value for value in values), dtype=array.dtype, count=len(values))
+        self.length = max(self.length, end)
+
+    @staticmethod
+    def _fits(kind, values):
+        present = [value for value in values if value is not None]
+        allowed = {'float': {int, float}, 'int': {int}, 'bool': {bool}}[kind]
+        if not {type(value) for value in present} <= allowed:
+            return False
+        if kind == 'int' and present:
+            return -2 ** 63 <= min(present) and max(present) < 2 ** 63
+        return True
+
+    def _demote(self, name):
+        """把已有的类型化列转换为object列"""
+        kind, array, mask = self.encoded[name]
+        objects = np.empty(len(array), dtype=object)
+        objects[:self.length] = np.fromiter(decode_column(kind, array[:self.length], mask[:self.length]), dtype=object, count=self.length)
+        self.encoded[name] = ['object', objects, None]
+
+    def _reserve(self, size):
+        for column in self.encoded.values():
+            kind, array, mask = column
+            if size <= len(array):
+                continue
+            capacity = max(size, 2 * len(array))
+            grown = np.empty(capacity, dtype=array.dtype) if kind == 'object' else np.zeros(capacity, dtype=array.dtype)
+            grown[:len(array)] = array
+            column[1] = grown
+            if mask is not None:
+                grown_mask = np.zeros(capacity, dtype=bool)
+                grown_mask[:len(mask)] = mask
+                column[2] = grown_mask
+
+    def write_columns(self, offset, source, start=0, stop=None):
+        """
+        Copy rows [start, stop) of another ColumnarResult with the same
+        columns to `offset`. Columns of the same kind are copied array to
+        array; otherwise the values are decoded into an object column.
+        """
+        stop = source.length if stop is None else stop
+        end = offset + stop - start
+        self._reserve(end)
+        for name in self.columns:
+            source_kind, source_array, source_mask = source.encoded[name]
+            if self.encoded[name][0] not in (source_kind, 'object'):
+                self._demote(name)
+            kind, array, mask = self.encoded[name]
+            if kind == source_kind:
+                array[offset:end] = source_array[start:stop]
+                if mask is not None:
+                    mask[offset:end] = False if source_mask is None else source_mask[start:stop]
+            else:
+                array[offset:end] = np.fromiter(source.column_values(name, start, stop), dtype=object, count=stop - start)
+        self.length = max(self.length, end)
+
+    def take(self, indices):
+        """按行号取出部分行，返回新的ColumnarResult（复制数据）"""
+        encoded = {}
+        for name in self.columns:
+            kind, array, mask = self.encoded[name]
+            encoded[name] = [kind, array[:self.length][indices], None if mask is None else mask[:self.length][indices]]
+        return ColumnarResult(self.columns, encoded, len(indices))
+
+    def select(self, columns=None, stop=None):
+        """只含部分列和前 stop 行的视图，共享列数组而不复制"""
+        columns = list(self.columns if columns is None else columns)
+        length = self.length if stop is None else min(self.length, stop)
+        return ColumnarResult(columns, {name: self.encoded[name] for name in columns}, length)
+
+    def column_values(self, name, start=0, stop=None):
+        """一列（或其中一段）的Python值"""
+        stop = self.length if stop is None else stop
+        kind, array, mask = self.encoded[name]
+        return decode_column(kind, array[start:stop], None if mask is None else mask[start:stop])
+
+    def rows(self, start=0, stop=None):
+        """把 [start, stop) 范围的行还原为字典列表"""
+        start, stop, _ = slice(start, stop).indices(self.length)
+        values = [self.column_values(name, start, stop) for name in self.columns]
+        return [dict(zip(self.columns, row)) for row in zip(*values)]
+
+    def encode(self, name):
+        """按 encode_column 的格式返回一列，用于写入结果存储"""
+        kind, array, mask = self.encoded[name]
+        if kind == 'object':
+            return encode_column(array[:self.length].tolist())
+        mask = mask[:self.length] if mask is not None and mask[:self.length].any() else None
+        return kind, array[:self.length], mask
+
+    def to_frame(self, columns=None):
+        """转为pandas DataFrame（数值列直接使用数组）"""
+        pd = lazy_import('pandas')
+        data = {}
+        for name in columns or self.columns:
+            kind, array, mask = self.encoded[name]
+            if kind in ('float', 'int') and (mask is None or not mask[:self.length].any()):
+                data[name] = np.asarray(array[:self.length])
+            elif kind == 'float':
+                data[name] = np.where(mask[:self.length], np.nan, array[:self.length])
+            elif kind == 'timestamp':
+                # 时间列直接给出datetime64，聚合时不必再解析字符串
+                data[name] = array[:self.length] if mask is None else np.where(mask[:self.length], np.datetime64('NaT'), array[:self.length])
+            else:
+                data[name] = self.column_values(name)
+        return pd.DataFrame(data, columns=columns or self.columns)
+
+    @property
+    def nbytes(self):
+        """估算占用的内存字节数"""
+        total = 0
+        for kind, array, mask in self.encoded.values():
+            total += array.nbytes + (mask.nbytes if mask is not None else 0)
+            if kind == 'object' and self.length:
+                sample = [value for value in array[:min(self.length, 100)].tolist() if value is not None]
+                if sample:
+                    total += sum(sys.getsizeof(value) for value in sample) * self.length // len(sample)
+        return total
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self.length)
+            rows = self.rows(start, stop) if step == 1 else [self[i] for i in range(start, stop, step)]
+            return rows
+        if index < 0:
+            index += self.length
+        if not 0 <= index < self.length:
+            raise IndexError("row index out of range")
+        return self.rows(index, index + 1)[0]
+
+    def __iter__(self):
+        for start in range(0, self.length, self.CHUNK_ROWS):
+            yield from self.rows(start, start + self.CHUNK_ROWS)
+
+class JsonSerializer:
+    """
+    JSON encoding and decoding with an optional fast backend.
+
+    orjson is used when it is installed (unless DUNE_JSON_BACKEND=json),
+    otherwise the standard library. ColumnarResult values are written as the
+    usual list of row objects, CHUNK_ROWS rows at a time, so a full list of
+    row dicts is never built for the response.
+    """
+
+    def __init__(self, backend=JSON_BACKEND):
+        self.orjson = None
+        if backend in ('auto', 'orjson') and importlib.util.find_spec('orjson') is not None:
+            self.orjson = importlib.import_module('orjson')
+        elif backend == 'orjson':
+            logger.info("orjson is not installed, using the json module")
+        self.name = 'orjson' if self.orjson else 'json'
+
+    def loads(self, data):
+        """解析JSON（bytes或str）；解析失败时抛出 json.JSONDecodeError"""
+        if self.orjson:
+            return self.orjson.loads(data)
+        return json.loads(data)
+
+    def dumps(self, obj):
+        """编码为JSON字符串"""
+        if self.orjson:
+            option = self.orjson.OPT_NON_STR_KEYS | self.orjson.OPT_SERIALIZE_NUMPY
+            return self.orjson.dumps(obj, default=self._orjson_default, option=option).decode()
+        
+        # 标准库：列式结果先用占位字符串代替，再把分块编码的行拼接进去
+        columnar = []
+        token = os.urandom(8).hex()
+        
+        def default(value):
+            if isinstance(value, ColumnarResult):
+                columnar.append(value)
+                return f"\x00{token}:{len(columnar) - 1}"
+            raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+        
+        text = json.dumps(obj, default=default)
+        if not columnar:
+            return text
+        
+        # 所有片段最后只拼接一次，避免中间字符串副本
+        parts = []
+        for i, part in enumerate(re.split(rf'"\\u0000{token}:(\d+)"', text)):
+            if i % 2 == 0:
+                parts.append(part)
+            else:
+                parts.extend(self._encode_rows(columnar[int(part)]))
+        return "".join(parts)
+
+    @staticmethod
+    def _encode_rows(rows):
+        """按块编码行，返回待拼接的片段"""
+        parts = ["["]
+        for start in range(0, len(rows), ColumnarResult.CHUNK_ROWS):
+            if start:
+                parts.append(",")
+            parts.append(json.dumps(rows.rows(start, start + ColumnarResult.CHUNK_ROWS))[1:-1])
+        parts.append("]")
+        return parts
+
+    def _orjson_default(self, value):
+        if isinstance(value, ColumnarResult):
+            # orjson.Fragment（3.10+）可直接嵌入已编码的JSON
+            if hasattr(self.orjson, 'Fragment'):
+                chunks = [self.orjson.dumps(value.rows(start, start + ColumnarResult.CHUNK_ROWS))[1:-1]
+                          for start in range(0, len(value), ColumnarResult.CHUNK_ROWS)]
+                return self.orjson.Fragment(b"[" + b",".join(chunks) + b"]")
+            return value.rows()
+        raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+# 全局JSON序列化器
+serializer = JsonSerializer()
+
+def columnar_rows(succeeded_data):
+    """把 execution_succeeded 中的行列表转换为 ColumnarResult"""
+    rows = succeeded_data['data']
+    names = list(succeeded_data.get('columns') or (rows[0] if rows else []))
+    columnar = ColumnarResult.allocate(names, succeeded_data.get('columns_metadata'), len(rows))
+    columnar.write(0, rows)
+    return columnar
+
+def columnar_response(response):
+    """
+    把执行结果中的行列表转换为 ColumnarResult（解析后立即转换，不保留行字典）。
+    
+    两种JSON后端都转换：缓存中的列数组约为行字典的十分之一；标准库json编码时要再还原成行，多花一些CPU。
+    """
+    succeeded_data = (response or {}).get('execution_succeeded')
+    if not succeeded_data or not isinstance(succeeded_data.get('data'), list):
+        return response
+    return {**response, "execution_succeeded": {**succeeded_data, "data": columnar_rows(succeeded_data)}}
+
+# 估算行列表大小时编码的样本行数
+PAYLOAD_SIZE_SAMPLE_ROWS = 64
+
+def payload_size(response):
+    """估算执行结果占用的字节数，用于缓存预算（行列表只编码均匀抽取的样本行，不重新编码整个结果）"""
+    succeeded_data = (response or {}).get('execution_succeeded') or {}
+    rows = succeeded_data.get('data')
+    fields = {key: value for key, value in succeeded_data.items() if key != 'data'}
+    if isinstance(rows, ColumnarResult):
+        return len(serializer.dumps(fields)) + rows.nbytes
+    if isinstance(rows, list) and len(rows) > PAYLOAD_SIZE_SAMPLE_ROWS:
+        sample = rows[::len(rows) // PAYLOAD_SIZE_SAMPLE_ROWS][:PAYLOAD_SIZE_SAMPLE_ROWS]
+        return len(serializer.dumps(fields)) + len(serializer.dumps(sample)) * len(rows) // len(sample)
+    return len(serializer.dumps(response))
+
+class ResultStore:
+    """
+    Persistent on-disk store for execution results.
+
+    Each result is a directory holding `meta.json` plus one `.npy` file per
+    column (and a null mask where needed; string and JSON columns add an
+    offsets file, see StringColumn). Columns are read back with
+    `mmap_mode='r'`, so warm restarts skip both the network and JSON parsing
+    of the row data. Least recently used entries are removed once the store
+    grows beyond `max_bytes`.
+    """
+
+    def __init__(self, root, max_bytes):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.total_bytes = None  # 首次使用时扫描目录得到
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def entry_id(key):
+        """结果缓存键 -> 目录名"""
+        return hashlib.sha1(json.dumps(key, default=list).encode()).hexdigest()[:32]
+
+    def entry_path(self, key):
+        return os.path.join(self.root, self.entry_id(key))
+
+    def load(self, key):
+        """
+        Load a stored execution result.
+        
+        Args:
+            key: Result cache key (see result_key)
+            
+        Returns:
+            dict: Execution response in the API's shape with the rows as a
+            memory-mapped ColumnarResult, or None if not stored
+        """
+        path = self.entry_path(key)
+        meta_path = os.path.join(path, 'meta.json')
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+            
+            encoded = {}
+            for column in meta['column_files']:
+                array = np.load(os.path.join(path, column['file']), mmap_mode='r')
+                if column.get('offsets_file'):
+                    array = StringColumn(array, np.load(os.path.join(path, column['offsets_file']), mmap_mode='r'))
+                mask = None
+                if column.get('mask_file'):
+                    mask = np.load(os.path.join(path, column['mask_file']), mmap_mode='r')
+                encoded[column['name']] = [column['kind'], array, mask]
+            
+            # 更新访问时间，供LRU清理使用
+            os.utime(meta_path)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.error(f"[Result Store] Failed to read {path}: {e}")
+            return None
+        
+        rows = ColumnarResult(list(encoded), encoded, meta['row_count'])
+        return {"execution_succeeded": {**meta['fields'], "data": rows}}
+
+    def save(self, key, response):
+        """
+        Persist a successful execution response.
+        
+        Args:
+            key: Result cache key (see result_key)
+            response: Execution response containing `execution_succeeded`
+        """
+        succeeded_data = response['execution_succeeded']
+        rows = succeeded_data.get('data') or []
+        if not isinstance(rows, ColumnarResult):
+            names = list(succeeded_data.get('columns') or [])
+            for name in (rows[0] if rows else {}):
+                if name not in names:
+                    names.append(name)
+            rows = ColumnarResult.from_rows(names, rows)
+        
+        path = self.entry_path(key)
+        if os.path.exists(path):
+            return
+        
+        os.makedirs(self.root, exist_ok=True)
+        tmp_path = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+        try:
+            os.makedirs(tmp_path)
+            column_files = []
+            for index, name in enumerate(rows.columns):
+                kind, array, mask = rows.encode(name)
+                column = {"name": name, "kind": kind, "file": f"c{index}.npy"}
+                if isinstance(array, StringColumn):
+                    # 字符串列保存为UTF-8字节和偏移两个文件
+                    array, offsets = array.compact()
+                    column['offsets_file'] = f"c{index}.offsets.npy"
+                    np.save(os.path.join(tmp_path, column['offsets_file']), offsets)
+                np.save(os.path.join(tmp_path, column['file']), array)
+                if mask is not None:
+                    column['mask_file'] = f"c{index}.mask.npy"
+                    np.save(os.path.join(tmp_path, column['mask_file']), mask)
+                column_files.append(column)
+            
+            meta = {
+                "key": list(key),
+                "row_count": len(rows),
+                "stored_at": time.time(),
+                "column_files": column_files,
+                "fields": {k: v for k, v in succeeded_data.items() if k != 'data'},
+            }
+            with open(os.path.join(tmp_path, 'meta.json'), 'w') as f:
+                json.dump(meta, f, default=list)
+            
+            os.rename(tmp_path, path)
+        except OSError as e:
+            # 其他进程或任务可能已经写入了同一条结果
+            if not os.path.exists(path):
+                logger.error(f"[Result Store] Failed to write {path}: {e}")
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            return
+        
+        size = self._dir_size(path)
+        with self.lock:
+            if self.total_bytes is not None:
+                self.total_bytes += size
+            over_budget = self.total_bytes is None or self.total_bytes > self.max_bytes
+        if over_budget:
+            self.prune(self.max_bytes)
+
+    @staticmethod
+    def _dir_size(path):
+        return sum(entry.stat().st_size for entry in os.scandir(path) if entry.is_file())
+
+    def entries(self):
+        """列出所有已保存的结果（按最近访问时间从旧到新）"""
+        if not os.path.isdir(self.root):
+            return []
+        
+        entries = []
+        for entry in os.scandir(self.root):
+            meta_path = os.path.join(entry.path, 'meta.json')
+            if not entry.is_dir() or not os.path.exists(meta_path):
+                continue
+            try:
+                with open(meta_path) as f:
+                    meta = json.load(f)
+                execution_id, query_id, columns = meta['key'][:3]
+                entries.append({
+                    "id": entry.name,
+                    "path": entry.path,
+                    "execution_id": execution_id,
+                    "query_id": query_id,
+                    "columns": columns,
+                    "row_count": meta.get('row_count', 0),
+                    "stored_at": meta.get('stored_at'),
+                    "last_used": os.path.getmtime(meta_path),
+                    "bytes": self._dir_size(entry.path),
+                })
+            except Exception as e:
+                logger.error(f"[Result Store] Skipping unreadable entry {entry.path}: {e}")
+        
+        entries.sort(key=lambda item: item['last_used'])
+        return entries
+
+    def remove(self, entry):
+        shutil.rmtree(entry['path'], ignore_errors=True)
+        with self.lock:
+            if self.total_bytes is not None:
+                self.total_bytes -= entry['bytes']
+
+    def prune(self, max_bytes=None, older_than=None, query_id=None):
+        """
+        Remove stored results.
+        
+        Args:
+            max_bytes: Remove least recently used entries until the store fits
+            older_than: Remove entries not used for this many seconds
+            query_id: Remove all entries of this query
+            
+        Returns:
+            list: Removed entries
+        """
+        entries = self.entries()
+        total = sum(entry['bytes'] for entry in entries)
+        now = time.time()
+        removed = []
+        for entry in entries:
+            if (
+                (query_id is not None and entry['query_id'] == query_id)
+                or (older_than is not None and now - entry['last_used'] > older_than)
+                or (max_bytes is not None and total > max_bytes)
+            ):
+                self.remove(entry)
+                total -= entry['bytes']
+                removed.append(entry)
+        
+        with self.lock:
+            self.total_bytes = total
+        if removed:
+            logger.info(f"[Result Store] Pruned {len(removed)} entries, {total} bytes left")
+        return removed
+
+    def stats(self):
+        entries = self.entries()
+        return {
+            "path": self.root,
+            "entries": len(entries),
+            "bytes": sum(entry['bytes'] for entry in entries),
+            "max_bytes": self.max_bytes,
+        }
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls with the same key into one upstream request.
+
+    The first caller starts the request as a task; callers arriving while it
+    is in flight await the same task. The task is shielded, so a caller that
+    gives up (e.g. a dashboard deadline) does not cancel it for the others.
+    """
+
+    def __init__(self):
+        self.calls = {}  # key -> in-flight task
+        self.upstream = 0
+        self.coalesced = 0
+
+    async def do(self, key, func, *args):
+        task = self.calls.get(key)
+        if task is None:
+            task = asyncio.create_task(func(*args))
+            self.calls[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+            self.upstream += 1
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def _forget(self, key, task):
+        if self.calls.get(key) is task:
+            del self.calls[key]
+
+    def stats(self):
+        return {
+            "calls": self.upstream + self.coalesced,
+            "upstream": self.upstream,
+            "coalesced": self.coalesced,
+            "in_flight": len(self.calls),
+        }
+
+# 合并并发的相同请求
+dashboard_flight = SingleFlight()
+execution_id_flight = SingleFlight()
+chart_data_flight = SingleFlight()
+
+@functools.lru_cache(maxsize=None)
+def execution_batch_query(count):
+    """生成用别名一次查询 count 个 resultSetForQuery 的GraphQL文档"""
+    variables = ", ".join(f"$queryId{i}: Int!, $parameters{i}: [ExecutionParameterInput!]" for i in range(count))
+    fields = "\n".join(
+        f"""    result{i}: resultSetForQuery(canRefresh: $canRefresh, queryId: $queryId{i}, parameters: $parameters{i}) {{
+        completedExecutionId
+        failedExecutionId
+        pendingExecutionId
+        __typename
+    }}"""
+        for i in range(count)
+    )
+    return f"query GetLatestResultSetIdsBatch($canRefresh: Boolean!, {variables}) {{\n{fields}\n}}"
+
+class ExecutionIdBatcher:
+    """
+    Resolve execution IDs in batches.
+
+    Lookups made within `window` seconds of each other are collected and
+    sent as one GraphQL document with an aliased resultSetForQuery field per
+    (query_id, parameters), at most `max_batch` per request. Lookups a batch
+    response does not answer are retried one by one with the plain
+    GetLatestResultSetIds query; if no response arrives at all, the whole
+    batch resolves to None instead.
+    """
+
+    def __init__(self, max_batch=EXECUTION_ID_BATCH_SIZE, window=EXECUTION_ID_BATCH_WINDOW):
+        self.max_batch = max_batch
+        self.window = window
+        self.pending = {}  # key -> (query_id, parameters, future)
+        self.flush_task = None
+        self.lookups = 0
+        self.requests = 0
+        self.fallbacks = 0
+
+    async def load(self, key, query_id, parameters):
+        if self.max_batch <= 1:
+            self.lookups += 1
+            self.requests += 1
+            return await request_execution_id(query_id, parameters)
+        
+        entry = self.pending.get(key)
+        if entry is None:
+            self.lookups += 1
+            entry = self.pending[key] = (query_id, parameters, asyncio.get_running_loop().create_future())
+            if self.flush_task is None:
+                self.flush_task = asyncio.create_task(self._flush())
+        return await asyncio.shield(entry[2])
+
+    async def _flush(self):
+        await asyncio.sleep(self.window)
+        batch = list(self.pending.items())
+        self.pending = {}
+        self.flush_task = None
+        chunks = [batch[i:i + self.max_batch] for i in range(0, len(batch), self.max_batch)]
+        await asyncio.gather(*(self._resolve(chunk) for chunk in chunks))
+
+    async def _resolve(self, chunk):
+        try:
+            if len(chunk) == 1:
+                (_, (query_id, parameters, _)), = chunk
+                self.requests += 1
+                results = [await request_execution_id(query_id, parameters)]
+            else:
+                results = await self._request_batch(chunk)
+            for (_, (_, _, future)), execution_id in zip(chunk, results):
+                if not future.done():
+                    future.set_result(execution_id)
+        except Exception as e:
+            for _, (_, _, future) in chunk:
+                if not future.done():
+                    future.set_exception(e)
+
+    async def _request_batch(self, chunk):
+        """发送一个批量查询；响应中缺失的查询逐个重试，整个请求失败时全部返回None"""
+        variables = {"canRefresh": True}
+        for i, (_, (query_id, parameters, _)) in enumerate(chunk):
+            variables[f"queryId{i}"] = query_id
+            variables[f"parameters{i}"] = parameters
+        batch_query = {
+            "operationName": "GetLatestResultSetIdsBatch",
+            "variables": variables,
+            "query": execution_batch_query(len(chunk)),
+        }
+        
+        logger.info(f"Resolving {len(chunk)} execution IDs in one request...")
+        self.requests += 1
+        response = await run_curl_command(GRAPHQL_API, batch_query)
+        if not response:
+            # 整个批量请求失败（已按 run_curl_command 的策略重试过）：接口正在拒绝请求，不再逐个重试
+            logger.info(f"Batch of {len(chunk)} execution ID lookups failed")
+            return [None] * len(chunk)
+        data = response.get('data') or {}
+        
+        execution_ids = []
+        missing = []
+        for i in range(len(chunk)):
+            result_set = data.get(f"result{i}")
+            if result_set is None:
+                missing.append(i)
+            execution_ids.append(result_set.get('completedExecutionId') if result_set else None)
+        
+        if missing:
+            # 批量结果缺失的查询并发逐个重试
+            self.fallbacks += len(missing)
+            self.requests += len(missing)
+            retried = await asyncio.gather(*(request_execution_id(*chunk[i][1][:2]) for i in missing))
+            for i, execution_id in zip(missing, retried):
+                execution_ids[i] = execution_id
+        return execution_ids
+
+    def stats(self):
+        return {"lookups": self.lookups, "requests": self.requests, "fallbacks": self.fallbacks}
+
+execution_id_batcher = ExecutionIdBatcher()
+
+# 本地持久化结果存储
+result_store = ResultStore(RESULT_STORE_DIR, RESULT_STORE_MAX_BYTES) if RESULT_STORE_DIR else None
+# 正在后台写入的结果
+result_store_writes = set()
+
+async def send_request(url, body, headers, proxy, deadline):
+    """
+    Send one request over the direct route or one proxy.
+    
+    Waits for the rate limiter, feeds the outcome back to the limiter, the
+    proxy pool and the endpoint's latency tracker.
+    
+    Returns:
+        dict: Parsed JSON response, or None if this attempt failed
+        
+    Raises:
+        RequestDeadlineExceeded: If the rate limiter wait would pass the deadline
+    """
+    proxy_url = None
+    if proxy:
+        # 提取代理地址和端口
+        if proxy.startswith('http://'):
+            proxy_parts = proxy[7:].split(':')
+        elif proxy.startswith('https://'):
+            proxy_parts = proxy[8:].split(':')
+        else:
+            proxy_parts = []
+        
+        if len(proxy_parts) != 2:
+            logger.info(f"Invalid proxy format: {proxy}")
+            proxy_pool.report_failure(proxy)
+            return None
+        
+        proxy_host = proxy_parts[0]
+        proxy_port = proxy_parts[1]
+        # 与 curl -x host:port 一致，统一按HTTP代理连接
+        proxy_url = f"http://{proxy_host}:{proxy_port}"
+        logger.info(f"Using proxy: {proxy_host}:{proxy_port}")
+    
+    if not await rate_limiter.acquire(url, proxy, deadline):
+        raise RequestDeadlineExceeded(f"rate limit wait for {url} would pass the deadline")
+    
+    # 输出更简洁的请求日志
+    logger.info(f"Sending request to {url}")
+    
+    endpoint = endpoint_name(url)
+    route = 'proxy' if proxy else 'direct'
+    start = time.perf_counter()
+    timeout = min(HTTP_TIMEOUT, max(deadline - time.monotonic(), 0.001))
+    try:
+        response = await http_pool.post(url, proxy=proxy_url, content=body, headers=headers, timeout=timeout)
+    except httpx.HTTPError as e:
+        logger.info(f"HTTP request failed: {e!r}")
+        metrics.inc('dune_http_requests_total', endpoint=endpoint, route=route, outcome='error')
+        if proxy:
+            proxy_pool.report_failure(proxy)
+            logger.info("Retrying with a different proxy...")
+        return None
+    
+    if response.status_code == 429:
+        logger.info(f"Rate limited by {url} (429), backing off...")
+        metrics.inc('dune_http_requests_total', endpoint=endpoint, route=route, outcome='throttled')
+        rate_limiter.on_throttle(url, proxy, parse_retry_after(response))
+        if proxy:
+            proxy_pool.report_failure(proxy)
+        return None
+    
+    try:
+        json_response = serializer.loads(response.content)
+    except json.JSONDecodeError:
+        text = response.text
+        logger.error(f"Invalid JSON response: {text[:100]}...")
+        if proxy:
+            proxy_pool.report_failure(proxy)
+        if "cloudflare" in text.lower():
+            logger.error("Cloudflare detected, trying with a different proxy...")
+        outcome = 'cloudflare' if "cloudflare" in text.lower() else 'invalid_json'
+        metrics.inc('dune_http_requests_total', endpoint=endpoint, route=route, outcome=outcome)
+        if response.status_code == 403 or "cloudflare" in text.lower():
+            rate_limiter.on_throttle(url, proxy, parse_retry_after(response))
+        return None
+    
+    latency = time.perf_counter() - start
+    latency_tracker(url).record(latency)
+    metrics.inc('dune_http_requests_total', endpoint=endpoint, route=route, outcome='ok')
+    metrics.observe('dune_http_request_duration_seconds', latency, endpoint=endpoint, route=route)
+    metrics.observe('dune_http_response_bytes', len(response.content), BYTES_BUCKETS, endpoint=endpoint)
+    rate_limiter.on_success(url, proxy)
+    if proxy:
+        proxy_pool.report_success(proxy, latency)
+    return json_response
+
+async def send_hedged_request(url, body, headers, proxy, deadline):
+    """
+    Send a request through `proxy` and hedge it through other proxies.
+    
+    If no response has arrived after the endpoint's HEDGE_PERCENTILE latency
+    (at least HEDGE_MIN_DELAY), the same request is sent through a different
+    proxy, up to HEDGE_MAX_EXTRA times. The first valid JSON response wins
+    and the other requests are cancelled.
+    
+    Returns:
+        dict: Parsed JSON response, or None if every request failed
+    """
+    delay = max(HEDGE_MIN_DELAY, latency_tracker(url).percentile(HEDGE_PERCENTILE) or 0)
+    pending = {asyncio.create_task(send_request(url, body, headers, proxy, deadline))}
+    hedge_tasks = set()
+    used_proxies = {proxy}
+    can_hedge = True
+    try:
+        while pending:
+            timeout = delay if can_hedge and len(hedge_tasks) < HEDGE_MAX_EXTRA else None
+            done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                result = task.result()
+                if result is not None:
+                    if task in hedge_tasks:
+                        hedge_stats["hedge_won"] += 1
+                    return result
+            if done or timeout is None:
+                continue
+            
+            # 超过阈值仍未返回，换一个代理再发一次
+            hedge_proxy = None
+            for _ in range(3):
+                candidate = proxy_pool.get_proxy()
+                if candidate and candidate not in used_proxies:
+                    hedge_proxy = candidate
+                    break
+            if hedge_proxy is None:
+                # 没有其他代理可用，不再对冲
+                can_hedge = False
+                continue
+            logger.info(f"No response after {delay:.2f}s, hedging through {hedge_proxy}")
+            used_proxies.add(hedge_proxy)
+            hedge_stats["hedged"] += 1
+            task = asyncio.create_task(send_request(url, body, headers, hedge_proxy, deadline))
+            hedge_tasks.add(task)
+            pending.add(task)
+        return None
+    finally:
+        for task in pending:
+            task.cancel()
+
+async def run_curl_command(url, data, is_json=True, use_proxy=True, deadline=None):
+    """
+    Send a POST request to a Dune API endpoint through the pooled HTTP client.
+    
+    Connections are reused across calls (per direct route or proxy), so no
+    curl process is spawned and TCP/TLS sessions stay warm. The function keeps
+    its historical name and behavior: proxy rotation, retries, Cloudflare
+    detection and a final direct-connection fallback.
+    
+    Every attempt waits for the endpoint's (and proxy's) rate limiter first.
+    429 responses, non-JSON 403s and Cloudflare pages slow the matching
+    limiter down, retries wait with exponential backoff and jitter, and no
+    attempt starts after the deadline. With DUNE_HEDGE=1, slow proxy
+    requests are hedged through a second proxy.
+    
+    Args:
+        url: The URL to send the request to
+        data: The data to send (either JSON or raw data)
+        is_json: Whether the data is JSON (if True, adds Content-Type header)
+        use_proxy: Whether to use a proxy (if False, uses direct connection)
+        deadline: Absolute time.monotonic() deadline (default: now + DUNE_REQUEST_DEADLINE)
+        
+    Returns:
+        dict: Response data parsed as JSON or None if failed
+    """
+    max_retries = MAX_RETRIES
+    use_proxy = use_proxy and USE_PROXY_POOL
+    if deadline is None:
+        deadline = time.monotonic() + REQUEST_DEADLINE
+    
+    # 请求体只需编码一次
+    if isinstance(data, dict) or isinstance(data, list):
+        body = json.dumps(data)
+    else:
+        body = str(data)
+    
+    # 添加Content-Type
+    headers = {'content-type': 'application/json'} if is_json else None
+    
+    for retry in range(max_retries):
+        if retry:
+            delay = backoff_delay(retry)
+            if time.monotonic() + delay >= deadline:
+                logger.info(f"Request deadline reached for {url}, giving up")
+                metrics.inc('dune_http_deadline_exceeded_total', endpoint=endpoint_name(url))
+                return None
+            metrics.inc('dune_http_retries_total', endpoint=endpoint_name(url))
+            await asyncio.sleep(delay)
+        
+        try:
+            proxy = None
+            
+            # 如果使用代理，选择代理（首次需要时才启动代理池）
+            if use_proxy:
+                if PROXY_POOL_START == 'lazy':
+                    proxy_pool.start()
+                proxy = proxy_pool.get_proxy()
+                if not proxy:
+                    # 如果代理池未初始化完成或没有可用代理，直接使用无代理连接
+                    logger.info(f"No proxy available, trying direct connection... ({retry+1}/{max_retries})")
+                    use_proxy = False
+            
+            if proxy and HEDGE_ENABLED:
+                json_response = await send_hedged_request(url, body, headers, proxy, deadline)
+            else:
+                json_response = await send_request(url, body, headers, proxy, deadline)
+            if json_response is not None:
+                return json_response
+            
+        except RequestDeadlineExceeded as e:
+            logger.info(f"Request deadline reached: {e}, giving up")
+            metrics.inc('dune_http_deadline_exceeded_total', endpoint=endpoint_name(url))
+            return None
+        except Exception as e:
+            logger.error(f"Error during request (retry {retry+1}/{max_retries}): {e}")
+    
+    # 如果所有重试都失败了，尝试直接连接（如果之前使用了代理）
+    if use_proxy:
+        logger.info("All proxy attempts failed, trying direct connection...")
+        metrics.inc('dune_http_direct_fallbacks_total', endpoint=endpoint_name(url))
+        return await run_curl_command(url, data, is_json, use_proxy=False, deadline=deadline)
+        
+    logger.info("All retries failed")
+    return None
+
+def parse_dune_url(url):
+    """
+    Parse a Dune dashboard URL to extract handle and slug.
+    
+    Args:
+        url: The Dune dashboard URL
+        
+    Returns:
+        tuple: (handle, slug) or (None, None) if invalid
+    """
+    parsed_url = urlparse(url)
+    if 'dune.com' not in parsed_url.netloc:
+        return None, None
+    
+    path_parts = parsed_url.path.strip('/').split('/')
+    if len(path_parts) != 2:
+        return None, None
+    
+    return path_parts[0], path_parts[1]
+
+@timed('fetch_dashboard_info')
+async def fetch_dashboard_info(handle, slug):
+    """
+    Fetch dashboard information, served from the metadata cache when possible.
+    
+    Fresh cache entries are returned directly. Stale entries (within the
+    stale-while-revalidate window) are returned immediately while a background
+    task refreshes them.
+    
+    Args:
+        handle: The user/team handle
+        slug: The dashboard slug
+        
+    Returns:
+        dict: Dashboard data or None if failed
+    """
+    key = (handle, slug)
+    if DASHBOARD_CACHE_TTL > 0:
+        dashboard_node, fresh = dashboard_cache.get(key)
+        if dashboard_node is not None:
+            if not fresh:
+                refresh_dashboard_in_background(handle, slug)
+            return dashboard_node
+    
+    return await refresh_dashboard_info(handle, slug)
+
+def refresh_dashboard_in_background(handle, slug):
+    """后台刷新过期的仪表盘缓存（同一仪表盘只刷新一次）"""
+    key = (handle, slug)
+    if key in dashboard_refreshes:
+        return
+    
+    logger.info(f"Refreshing stale dashboard info for {handle}/{slug} in background...")
+    task = asyncio.create_task(refresh_dashboard_info(handle, slug))
+    dashboard_refreshes[key] = task
+    task.add_done_callback(lambda _: dashboard_refreshes.pop(key, None))
+
+async def refresh_dashboard_info(handle, slug):
+    """
+    Fetch dashboard information from Dune API and update the cache.
+    
+    Concurrent fetches of the same dashboard share one upstream request.
+    
+    Args:
+        handle: The user/team handle
+        slug: The dashboard slug
+        
+    Returns:
+        dict: Dashboard data or None if failed
+    """
+    return await dashboard_flight.do((handle, slug), request_dashboard_info, handle, slug)
+
+async def request_dashboard_info(handle, slug):
+    """发送FindDashboard请求并写入缓存"""
+    dashboard_query = {
+        "operationName": "FindDashboard",
+        "variables": {
+            "filters": {
+                "slug": {"equals": slug},
+                "handle": {"equals": handle}
+            }
+        },
+        "query": FIND_DASHBOARD_QUERY
+    }
+    
+    response = await run_curl_command(GRAPHQL_API, dashboard_query)
+    
+    if not response:
+        return None
+    
+    # Check if dashboard exists
+    if not response.get('data', {}).get('dashboards', {}).get('edges'):
+        return None
+    
+    dashboard_node = response['data']['dashboards']['edges'][0]['node']
+    if DASHBOARD_CACHE_TTL > 0:
+        dashboard_cache.set((handle, slug), dashboard_node, len(json.dumps(dashboard_node)))
+    return dashboard_node
+
+@timed('get_execution_id')
+async def get_execution_id(query_id, parameters):
+    """
+    Get execution ID for a query.
+    
+    Concurrent lookups of the same query and parameters share one upstream
+    request, and lookups of different queries made at about the same time
+    are batched into one GraphQL request (see ExecutionIdBatcher).
+    
+    Args:
+        query_id: The query ID
+        parameters: Query parameters
+        
+    Returns:
+        str: Execution ID or None if failed
+    """
+    key = execution_id_key(query_id, parameters)
+    return await execution_id_flight.do(key, execution_id_batcher.load, key, query_id, parameters)
+
+def execution_id_key(query_id, parameters):
+    """执行ID查询的去重键"""
+    return (query_id, json.dumps(parameters, sort_keys=True))
+
+async def resolve_execution_ids(visualization_widgets, deadline=None):
+    """
+    Resolve the execution IDs of all widgets of a dashboard up front.
+    
+    Widgets sharing a query and parameters are looked up once, and all
+    lookups start together so they are batched into as few GraphQL requests
+    as possible.
+    
+    Args:
+        visualization_widgets: Visualization widgets from the dashboard info
+        deadline: Seconds allowed for the lookups, or None for no limit;
+            lookups still running then are cancelled and left unresolved
+        
+    Returns:
+        dict: execution_id_key(query_id, parameters) -> execution ID (None if unresolved)
+    """
+    queries = {}
+    for widget in visualization_widgets:
+        processed_data = process_visualization(widget.get('visualization', {}))
+        if processed_data:
+            query_id, parameters = processed_data[:2]
+            queries[execution_id_key(query_id, parameters)] = (query_id, parameters)
+    if not queries:
+        return {}
+    
+    tasks = {key: asyncio.create_task(get_execution_id(query_id, parameters)) for key, (query_id, parameters) in queries.items()}
+    _, pending = await asyncio.wait(tasks.values(), timeout=deadline)
+    if pending:
+        logger.info(f"Deadline of {deadline}s reached, {len(pending)} execution IDs unresolved")
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+    
+    execution_ids = {}
+    for key, task in tasks.items():
+        execution_ids[key] = None if task.cancelled() or task.exception() else task.result()
+    return execution_ids
+
+def remaining_time(started, deadline):
+    """从 started（time.monotonic()）起算，时限 deadline 秒还剩多少"""
+    return max(deadline - (time.monotonic() - started), 0)
+
+async def request_execution_id(query_id, parameters):
+    """发送GetLatestResultSetIds请求"""
+    execution_query = {
+        "operationName": "GetLatestResultSetIds",
+        "variables": {
+            "queryId": query_id,
+            "parameters": parameters,
+            "canRefresh": True
+        },
+        "query": GET_EXECUTION_QUERY
+    }
+    
+    response = await run_curl_command(GRAPHQL_API, execution_query)
+    
+    if not response:
+        return None
+    
+    return response.get('data', {}).get('resultSetForQuery', {}).get('completedExecutionId')
+
+def result_key(execution_id, query_id, columns, sample_size=DEFAULT_SAMPLE_SIZE):
+    """结果缓存/存储的键；sample_size为None表示完整结果"""
+    return (execution_id, query_id, tuple(columns), sample_size or 'full')
+
+def is_complete_result(response):
+    """结果是否包含全部行（未被采样截断）"""
+    succeeded_data = (response or {}).get('execution_succeeded') or {}
+    return len(succeeded_data.get('data') or []) >= succeeded_data.get('total_row_count', 0)
+
+def cached_complete_result(execution_id, query_id, columns):
+    """从内存缓存中找出同一执行的完整结果（完整下载的，或行数未超过采样数的）"""
+    for sample_size in (None, DEFAULT_SAMPLE_SIZE):
+        response, _ = result_cache.get(result_key(execution_id, query_id, columns, sample_size))
+        if response is not None and is_complete_result(response):
+            return response
+    return None
+
+@timed('fetch_chart_data')
+async def fetch_chart_data(execution_id, query_id, parameters, columns, sample_size=DEFAULT_SAMPLE_SIZE):
+    """
+    Fetch chart data using execution ID.
+    
+    A completed execution is immutable, so successful results are kept in the
+    in-memory result cache and the on-disk result store; repeated requests
+    (also across restarts) skip the execution API entirely. Concurrent
+    requests for the same result share one load.
+    
+    Args:
+        execution_id: The execution ID
+        query_id: The query ID
+        parameters: Query parameters
+        columns: Output columns to fetch
+        sample_size: Rows to sample, or None to download the full result page by page
+        
+    Returns:
+        dict: Chart data or None if failed
+    """
+    if sample_size is None:
+        cached_response = cached_complete_result(execution_id, query_id, columns)
+    else:
+        cached_response, _ = result_cache.get(result_key(execution_id, query_id, columns, sample_size))
+    if cached_response is not None:
+        logger.info(f"Serving chart data for execution {execution_id} from cache")
+        return cached_response
+    
+    cache_key = result_key(execution_id, query_id, columns, sample_size)
+    return await chart_data_flight.do(cache_key, load_chart_data, cache_key, execution_id, query_id, parameters, columns, sample_size)
+
+async def load_chart_data(cache_key, execution_id, query_id, parameters, columns, sample_size):
+    """从本地存储或执行API加载图表数据，并写入缓存"""
+    if result_store:
+        stored_response = await asyncio.to_thread(result_store.load, cache_key)
+        if stored_response is not None:
+            logger.info(f"Serving chart data for execution {execution_id} from result store")
+            result_cache.set(cache_key, stored_response, payload_size(stored_response))
+            remember_latest_result(cache_key, parameters, stored_response)
+            return stored_response
+    
+    response = None
+    if INCREMENTAL_ENABLED:
+        response = await request_incremental_result(execution_id, query_id, parameters, columns, sample_size)
+    if response is None and sample_size is None:
+        response = await request_full_result(execution_id, query_id, parameters, columns)
+    elif response is None:
+        chart_data_query = {
+            "execution_id": execution_id,
+            "query_id": query_id,
+            "parameters": parameters,
+            "output_columns": columns,
+            "sampling": {"count": sample_size}
+        }
+        response = columnar_response(await run_curl_command(EXECUTION_API, chart_data_query))
+    
+    # 只缓存成功的结果，失败或未完成的结果下次重新获取
+    if response and response.get('execution_succeeded'):
+        result_cache.set(cache_key, response, payload_size(response))
+        remember_latest_result(cache_key, parameters, response)
+        # 增量合并的结果只抽样核对过历史行，只保留在内存中，不写入磁盘
+        if result_store and not response['execution_succeeded'].get('incremental'):
+            # 后台写入磁盘，不阻塞当前请求
+            task = asyncio.create_task(asyncio.to_thread(result_store.save, cache_key, response))
+            result_store_writes.add(task)
+            task.add_done_callback(result_store_writes.discard)
+    
+    return response
+
+async def request_result_page(execution_id, query_id, parameters, columns, offset, limit):
+    """通过执行API的分页参数获取一页数据"""
+    chart_page_query = {
+        "execution_id": execution_id,
+        "query_id": query_id,
+        "parameters": parameters,
+        "output_columns": columns,
+        "pagination": {"limit": limit, "offset": offset}
+    }
+    return await run_curl_command(EXECUTION_API, chart_page_query)
+
+async def request_full_result(execution_id, query_id, parameters, columns):
+    """
+    Download a complete execution result page by page.
+    
+    The first page reveals `total_row_count`; column arrays for all rows are
+    then preallocated and the remaining pages are fetched concurrently and
+    copied straight into their slots, so no full list of row dicts is ever
+    built. Results are capped at FULL_RESULT_MAX_ROWS rows. If any page
+    fails, the other page downloads are cancelled.
+    
+    Args:
+        execution_id: The execution ID
+        query_id: The query ID
+        parameters: Query parameters
+        columns: Output columns to fetch
+        
+    Returns:
+        dict: Execution response with a ColumnarResult as `data`, or None if failed
+    """
+    first_page = await request_result_page(execution_id, query_id, parameters, columns, 0, FULL_RESULT_PAGE_SIZE)
+    if not first_page or not first_page.get('execution_succeeded'):
+        return first_page
+    
+    succeeded_data = first_page['execution_succeeded']
+    first_rows = succeeded_data.get('data') or []
+    total_row_count = succeeded_data.get('total_row_count', len(first_rows))
+    row_limit = min(total_row_count, FULL_RESULT_MAX_ROWS)
+    if total_row_count > row_limit:
+        logger.info(f"Execution {execution_id} has {total_row_count} rows, keeping the first {row_limit}")
+    
+    names = list(succeeded_data.get('columns') or (first_rows[0] if first_rows else []))
+    rows = ColumnarResult.allocate(names, succeeded_data.get('columns_metadata'), max(row_limit, len(first_rows)))
+    rows.write(0, first_rows[:row_limit])
+    
+    # 服务器可能限制单页行数，按第一页实际返回的行数分页
+    page_size = len(first_rows)
+    semaphore = asyncio.Semaphore(FULL_RESULT_PAGE_CONCURRENCY)
+    
+    async def fetch_page(offset):
+        limit = min(page_size, row_limit - offset)
+        async with semaphore:
+            page = await request_result_page(execution_id, query_id, parameters, columns, offset, limit)
+        page_rows = ((page or {}).get('execution_succeeded') or {}).get('data')
+        if page_rows is None or len(page_rows) < limit:
+            raise RuntimeError(f"incomplete page at offset {offset}")
+        rows.write(offset, page_rows[:limit])
+    
+    if not page_size and row_limit:
+        # 第一页为空却报告了行数：不能当作完整的空结果缓存
+        logger.error(f"Failed to download full result of execution {execution_id}: empty first page of {total_row_count} rows")
+        return None
+    
+    try:
+        # 一页失败时 TaskGroup 取消其余的页，不再继续下载和写入
+        async with asyncio.TaskGroup() as group:
+            for offset in range(page_size, row_limit, page_size):
+                group.create_task(fetch_page(offset))
+    except ExceptionGroup as e:
+        logger.error(f"Failed to download full result of execution {execution_id}: {e.exceptions[0]}")
+        return None
+    
+    full_data = {key: value for key, value in succeeded_data.items() if key != 'data'}
+    full_data['data'] = rows
+    return {"execution_succeeded": full_data}
+
+def series_key(query_id, parameters, columns):
+    """同一查询（参数和列相同）不同执行之间共用的键"""
+    return (*execution_id_key(query_id, parameters), tuple(columns))
+
+def remember_latest_result(cache_key, parameters, response):
+    """记录查询最近一次的完整结果，下次有新执行时增量获取"""
+    execution_id, query_id, columns, _ = cache_key
+    if is_complete_result(response):
+        latest_results.set(series_key(query_id, parameters, columns), cache_key, 0)
+
+def series_order(rows, columns_metadata):
+    """
+    Find the timestamp column a result is sorted by.
+    
+    Args:
+        rows: ColumnarResult of a complete result
+        columns_metadata: Column metadata of the result
+        
+    Returns:
+        tuple: (time column, datetime64 times, ascending) or None if the rows
+        are not sorted by a timestamp column without nulls
+    """
+    time_column = find_time_column(rows.columns, columns_metadata)
+    if not time_column or len(rows) < 2:
+        return None
+    kind, array, mask = rows.encoded[time_column]
+    if kind != 'timestamp' or (mask is not None and mask[:len(rows)].any()):
+        return None
+    
+    times = array[:len(rows)]
+    steps = np.diff(times.view(np.int64))
+    if (steps >= 0).all() and times[-1] > times[0]:
+        return time_column, times, True
+    if (steps <= 0).all() and times[-1] < times[0]:
+        return time_column, times, False
+    return None
+
+async def request_incremental_result(execution_id, query_id, parameters, columns, sample_size):
+    """
+    Build the result of a new execution from the previous result of the same
+    query plus only the rows that are new or may have changed.
+    
+    Works for results sorted by a timestamp column, in either direction, such
+    as daily time series. Rows older than the previous result's latest
+    timestamp are taken to be unchanged and copied from it; rows at or after
+    that timestamp (the latest bucket may still have been filling up) are
+    downloaded through the execution API's pagination. The downloaded rows
+    must line up with the previous result: the first old row is downloaded
+    too and must be identical, and the row counts must add up to the new
+    `total_row_count`. Because history can be revised upstream, pages of the
+    reused rows are downloaded again and compared as well (see
+    verify_reused_rows). On any difference None is returned and the caller
+    downloads the whole result.
+    
+    Rows outside the verified pages are still only assumed to be unchanged,
+    so the merged response carries an `incremental` entry describing how it
+    was built, and the caller keeps it out of the result store.
+    
+    Args:
+        execution_id: The new execution ID
+        query_id: The query ID
+        parameters: Query parameters
+        columns: Output columns to fetch
+        sample_size: Rows the caller samples (the merged result is only used
+            if it is not larger), or None for a full result
+        
+    Returns:
+        dict: Execution response with a ColumnarResult as `data`, or None
+    """
+    previous_key, _ = latest_results.get(series_key(query_id, parameters, columns))
+    if previous_key is None or previous_key[0] == execution_id:
+        return None
+    previous, _ = result_cache.get(previous_key)
+    if previous is None or not is_complete_result(previous):
+        return None
+    previous_data = previous['execution_succeeded']
+    previous_rows = previous_data.get('data')
+    if not isinstance(previous_rows, ColumnarResult):
+        return None
+    order = series_order(previous_rows, previous_data.get('columns_metadata'))
+    if not order:
+        return None
+    
+    time_column, times, ascending = order
+    cutoff = times[-1] if ascending else times[0]
+    kept = int(np.count_nonzero(times < cutoff))
+    row_limit = sample_size or FULL_RESULT_MAX_ROWS
+    # 升序时旧行在前，新行接在第 kept 行之后；降序时新行在前，第一条旧行是 anchor
+    anchor = kept - 1 if ascending else len(previous_rows) - kept
+    
+    try:
+        # 从 anchor（升序）或开头（降序）起逐页读取，每页行数翻倍，直到读完新行
+        new_rows, offset, limit = [], anchor if ascending else 0, INCREMENTAL_PAGE_SIZE
+        while True:
+            page = await request_result_page(execution_id, query_id, parameters, columns, offset, limit)
+            succeeded_data = (page or {}).get('execution_succeeded') or {}
+            page_rows = succeeded_data.get('data') or []
+            total_row_count = succeeded_data.get('total_row_count', 0)
+            if total_row_count > row_limit:
+                raise ValueError(f"{total_row_count} rows exceed the limit of {row_limit}")
+            if not page_rows:
+                raise ValueError(f"no rows at offset {offset}")
+            
+            if ascending:
+                if offset == anchor:
+                    if page_rows[0] != previous_rows[anchor]:
+                        raise ValueError("new rows do not continue the previous result")
+                    page_rows = page_rows[1:]
+                    offset += 1
+                new_rows.extend(page_rows)
+                offset += len(page_rows)
+                if offset >= total_row_count:
+                    break
+            else:
+                parsed = parse_timestamps([row.get(time_column) for row in page_rows])
+                if parsed is None:
+                    raise ValueError("time column is not a timestamp")
+                older = np.flatnonzero(parsed[0] < cutoff)
+                if len(older):
+                    new_rows.extend(page_rows[:older[0]])
+                    if page_rows[older[0]] != previous_rows[anchor]:
+                        raise ValueError("new rows do not continue the previous result")
+                    break
+                new_rows.extend(page_rows)
+                offset += len(page_rows)
+            limit = min(2 * limit, FULL_RESULT_PAGE_SIZE)
+        
+        if len(new_rows) + kept != total_row_count or succeeded_data.get('columns') != previous_data.get('columns'):
+            raise ValueError("row counts do not add up")
+        
+        # 升序时复用的旧行在新结果中位置不变；降序时排在新行之后
+        reused_start = 0 if ascending else anchor
+        shift = 0 if ascending else len(new_rows) - anchor
+        verified = await verify_reused_rows(execution_id, query_id, parameters, columns, previous_rows, reused_start, kept, shift)
+    except ValueError as e:
+        logger.info(f"Incremental fetch of execution {execution_id} not possible ({e}), downloading the whole result")
+        metrics.inc('dune_incremental_results_total', outcome='mismatch')
+        return None
+    
+    merged = ColumnarResult.allocate(previous_rows.columns, succeeded_data.get('columns_metadata'), total_row_count)
+    if ascending:
+        merged.write_columns(0, previous_rows, 0, kept)
+        merged.write(kept, new_rows)
+    else:
+        merged.write(0, new_rows)
+        merged.write_columns(len(new_rows), previous_rows, anchor)
+    logger.info(f"Built execution {execution_id} from {kept} previous rows and {len(new_rows)} new rows")
+    metrics.inc('dune_incremental_results_total', outcome='merged')
+    metrics.inc('dune_incremental_rows_total', kept, source='reused')
+    metrics.inc('dune_incremental_rows_total', len(new_rows), source='downloaded')
+    metrics.inc('dune_incremental_rows_total', verified, source='verified')
+    
+    merged_data = {key: value for key, value in succeeded_data.items() if key != 'data'}
+    merged_data['data'] = merged
+    merged_data['incremental'] = {
+        "base_execution_id": previous_key[0],
+        "reused_rows": kept,
+        "verified_rows": verified,
+        "downloaded_rows": len(new_rows),
+    }
+    return {"execution_succeeded": merged_data}
+
+async def verify_reused_rows(execution_id, query_id, parameters, columns, previous_rows, start, count, shift):
+    """
+    Check rows about to be reused from a previous result against the new execution.
+    
+    Downloads up to INCREMENTAL_VERIFY_PAGES pages of INCREMENTAL_VERIFY_ROWS
+    rows from the reused range `previous_rows[start:start + count]`: the
+    oldest rows, the most recent ones (where late revisions usually land) and
+    random pages in between. Row `i` of the previous result is expected at
+    offset `i + shift` of the new execution.
+    
+    Args:
+        execution_id: The new execution ID
+        query_id: The query ID
+        parameters: Query parameters
+        columns: Output columns to fetch
+        previous_rows: ColumnarResult of the previous execution
+        start: Index of the first reused row in previous_rows
+        count: Number of reused rows
+        shift: Offset of the reused rows in the new execution relative to previous_rows
+        
+    Returns:
+        int: Number of distinct rows compared
+        
+    Raises:
+        ValueError: If a downloaded row differs from the previous result
+    """
+    size = min(INCREMENTAL_VERIFY_ROWS, count)
+    if size <= 0 or INCREMENTAL_VERIFY_PAGES <= 0:
+        return 0
+    last = count - size
+    windows = [0, last] + [random.randint(0, last) for _ in range(INCREMENTAL_VERIFY_PAGES - 2)]
+    windows = sorted(set(windows[:INCREMENTAL_VERIFY_PAGES]))
+    
+    async def verify(window):
+        page = await request_result_page(execution_id, query_id, parameters, columns, start + window + shift, size)
+        page_rows = ((page or {}).get('execution_succeeded') or {}).get('data') or []
+        if page_rows != previous_rows.rows(start + window, start + window + size):
+            raise ValueError(f"reused rows from offset {start + window} changed upstream")
+    
+    await asyncio.gather(*(verify(window) for window in windows))
+    return len(set().union(*(range(window, window + size) for window in windows)))
+
+async def fetch_chart_page(execution_id, query_id, parameters, columns, offset, limit):
+    """
+    Fetch one page of rows of an execution result.
+    
+    A complete result already in the result cache is sliced locally;
+    otherwise only the requested rows are downloaded through the execution
+    API's pagination, so memory stays bounded by the page size.
+    
+    Args:
+        execution_id: The execution ID
+        query_id: The query ID
+        parameters: Query parameters
+        columns: Output columns to fetch
+        offset: Index of the first row
+        limit: Maximum number of rows
+        
+    Returns:
+        dict: Execution response holding only the page rows, or None if failed
+    """
+    cached_response = cached_complete_result(execution_id, query_id, columns)
+    if cached_response is not None:
+        succeeded_data = cached_response['execution_succeeded']
+        page_data = {key: value for key, value in succeeded_data.items() if key != 'data'}
+        page_data['data'] = succeeded_data.get('data', [])[offset:offset + limit]
+        return {"execution_succeeded": page_data}
+    
+    page_key = (execution_id, query_id, tuple(columns), 'page', offset, limit)
+    cached_page, _ = result_cache.get(page_key)
+    if cached_page is not None:
+        return cached_page
+    
+    return await chart_data_flight.do(page_key, request_chart_page, page_key, execution_id, query_id, parameters, columns, offset, limit)
+
+async def request_chart_page(page_key, execution_id, query_id, parameters, columns, offset, limit):
+    """获取一页数据并写入缓存"""
+    response = await request_result_page(execution_id, query_id, parameters, columns, offset, limit)
+    
+    if response and response.get('execution_succeeded'):
+        result_cache.set(page_key, response, payload_size(response))
+    
+    return response
+
+def encode_chart_cursor(execution_id, query_id, parameters, columns, offset):
+    """把分页位置编码为不透明的游标字符串"""
+    state = {
+        "execution_id": execution_id,
+        "query_id": query_id,
+        "parameters": parameters,
+        "columns": columns,
+        "offset": offset,
+    }
+    return base64.urlsafe_b64encode(json.dumps(state, separators=(',', ':')).encode()).decode()
+
+def decode_chart_cursor(cursor):
+    """
+    Decode a cursor produced by encode_chart_cursor.
+    
+    Returns:
+        dict: Cursor state or None if the cursor is invalid
+    """
+    try:
+        state = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(state, dict) or not {"execution_id", "query_id", "parameters", "columns", "offset"} <= state.keys():
+        return None
+    return state
+
+def process_visualization(visualization):
+    """
+    Process a visualization to extract query details and options.
+    
+    Args:
+        visualization: The visualization data
+        
+    Returns:
+        tuple: (query_id, parameters, options, columns, viz_info) or None if invalid
+    """
+    if not visualization:
+        return None
+    
+    query_details = visualization.get('query_details', {})
+    if not query_details:
+        return None
+    
+    query_id = query_details.get('query_id')
+    parameters = query_details.get('parameters', [])
+    
+    if not query_id:
+        return None
+    
+    # Extract visualization info
+    viz_info = {
+        "visualization_id": visualization.get('id'),
+        "visualization_type": visualization.get('type'),
+        "visualization_name": visualization.get('name')
+    }
+    
+    # Process options
+    options = visualization.get('options', {})
+    if isinstance(options, str):
+        try:
+            options = json.loads(options)
+        except:
+            options = {}
+    
+    # Extract columns from options
+    columns = []
+    column_mapping = options.get('columnMapping', {})
+    if column_mapping:
+        columns = list(column_mapping.keys())
+    
+    return query_id, parameters, options, columns, viz_info
+
+# 支持的聚合方式
+AGGREGATIONS = ('sum', 'mean', 'min', 'max', 'last')
+# 图表数据的输出格式：行对象列表，或按列的 {"columns": [...], "values": {...}}
+DATA_FORMATS = ('rows', 'columns')
+# columns_metadata缺少类型时，按列名识别时间列
+TIME_COLUMN_NAMES = ('date', 'day', 'time', 'timestamp', 'block_time', 'block_date', 'hour', 'week', 'month')
+
+def find_time_column(columns, columns_metadata):
+    """
+    Find the time column of a chart.
+    
+    Args:
+        columns: Column names of the chart
+        columns_metadata: Column metadata from the execution result
+        
+    Returns:
+        str: Name of the time column or None
+    """
+    for column_meta in columns_metadata or []:
+        column_type = str(column_meta.get('type', '')).lower()
+        if column_meta.get('name') in columns and ('timestamp' in column_type or column_type == 'date'):
+            return column_meta['name']
+    
+    for name in columns:
+        if name.lower() in TIME_COLUMN_NAMES:
+            return name
+    return None
+
+def parse_since(value):
+    """
+    Parse the `since` argument: a date, an ISO time or a timestamp as Dune
+    returns it ("2024-05-01 00:00:00.000 UTC"), all taken as UTC.
+    
+    Returns:
+        numpy.datetime64: The time in milliseconds
+        
+    Raises:
+        ValueError: If the value is not a time
+    """
+    text = str(value).strip().removesuffix(TIMESTAMP_SUFFIX).removesuffix('Z').replace(' ', 'T')
+    since = np.datetime64(text, 'ms')
+    if np.isnat(since):
+        raise ValueError(f"Invalid since '{value}'")
+    return since
+
+def rows_since(rows, time_column, since):
+    """
+    Keep the rows whose time column is at or after `since`.
+    
+    Args:
+        rows: ColumnarResult or list of row dicts
+        time_column: Name of the time column
+        since: numpy.datetime64 from parse_since
+        
+    Returns:
+        ColumnarResult or list: The matching rows in their original order
+    """
+    if isinstance(rows, ColumnarResult) and rows.encoded[time_column][0] == 'timestamp':
+        _, array, mask = rows.encoded[time_column]
+        keep = array[:len(rows)] >= since
+        if mask is not None:
+            keep &= ~mask[:len(rows)]
+    else:
+        # 未解析的时间列（如date类型的字符串）交给pandas解析，无法解析的行不保留
+        pd = lazy_import('pandas')
+        times = pd.to_datetime(pd.Series([row.get(time_column) for row in rows], dtype=object), utc=True, errors='coerce', format='mixed')
+        keep = (times >= pd.Timestamp(since, tz='UTC')).to_numpy()
+    
+    if isinstance(rows, ColumnarResult):
+        return rows.take(np.flatnonzero(keep))
+    return [row for row, kept in zip(rows, keep.tolist()) if kept]
+
+def frame_to_records(frame):
+    """DataFrame转为可JSON序列化的行，NaN/NaT转为None"""
+    return frame.astype(object).where(frame.notna(), None).to_dict('records')
+
+def aggregate_rows(rows, columns, method, time_bucket=None, time_column=None):
+    """
+    Aggregate chart rows with pandas.
+    
+    Without a time bucket the whole chart collapses into one row. With one,
+    rows are grouped by buckets of the time column (e.g. "1D", "1W", "MS").
+    Numeric-looking strings are converted; other non-numeric columns only
+    survive the "last" aggregation.
+    
+    Args:
+        rows: Chart rows (list of dicts)
+        columns: Columns to aggregate
+        method: One of AGGREGATIONS
+        time_bucket: pandas frequency string or None
+        time_column: Column used for ordering and bucketing
+        
+    Returns:
+        tuple: (aggregated rows, output columns)
+    """
+    pd = lazy_import('pandas')
+    needed_columns = list(dict.fromkeys(columns + ([time_column] if time_column else [])))
+    if isinstance(rows, ColumnarResult):
+        frame = rows.to_frame(needed_columns)
+    else:
+        frame = pd.DataFrame(rows, columns=needed_columns)
+    
+    values = {}
+    for name in columns:
+        if name == time_column:
+            continue
+        series = frame[name]
+        if pd.api.types.is_datetime64_any_dtype(series):
+            # 其他时间列不参与数值聚合，按API的字符串格式输出
+            series = pd.Series(format_timestamps(series.to_numpy()), index=frame.index, dtype=object)
+        numeric = pd.to_numeric(series, errors='coerce')
+        if numeric.notna().sum() == series.notna().sum():
+            values[name] = numeric
+        elif method == 'last':
+            values[name] = series
+    data = pd.DataFrame(values, index=frame.index)
+    
+    if time_column:
+        times = pd.to_datetime(frame[time_column], utc=True, errors='coerce')
+        data = data.set_index(times)
+        data = data[data.index.notna()].sort_index()
+    
+    if time_bucket and time_column:
+        grouped = data.resample(time_bucket)
+        result = getattr(grouped, method)()
+        # resample会补齐空桶，去掉没有数据的桶
+        result = result[grouped.size() > 0]
+        result.index = result.index.strftime('%Y-%m-%d %H:%M:%S.000 UTC')
+        result = result.rename_axis(time_column).reset_index()
+        return frame_to_records(result), [time_column] + list(values)
+    
+    if data.empty:
+        return [], list(values)
+    if method == 'last':
+        summary = data.ffill().iloc[[-1]]
+    else:
+        summary = data.agg([method])
+    return frame_to_records(summary), list(values)
+
+def shape_chart_result(chart_result, columns=None, max_rows=None, aggregate=None, time_bucket=None, data_format='rows', since=None):
+    """
+    Apply a time filter, column selection, aggregation and a row limit to
+    one chart result.
+    
+    Args:
+        chart_result: Chart result from fetch_chart_group (not modified)
+        columns: Columns to keep, or None for all
+        max_rows: Maximum rows to return, or None for all
+        aggregate: One of AGGREGATIONS, or None
+        time_bucket: pandas frequency string to group the time column by, or None
+        data_format: One of DATA_FORMATS
+        since: numpy.datetime64; only rows whose time column is at or after it
+            are kept (charts without a time column keep all rows), or None
+        
+    Returns:
+        dict: Shaped chart result
+    """
+    if 'data' not in chart_result:
+        return chart_result
+    
+    rows = chart_result['data']
+    chart_columns = chart_result.get('columns') or (list(rows[0]) if rows else [])
+    selected = [name for name in chart_columns if name in columns] if columns else list(chart_columns)
+    shaped = dict(chart_result)
+    
+    if since is not None:
+        time_column = find_time_column(chart_columns, chart_result.get('columns_metadata'))
+        if time_column:
+            rows = rows_since(rows, time_column, since)
+        shaped['since'] = {"time_column": time_column, "value": format_timestamps(np.array([since]))[0]}
+    
+    if aggregate:
+        time_column = find_time_column(chart_columns, chart_result.get('columns_metadata'))
+        rows, selected = aggregate_rows(rows, selected, aggregate, time_bucket, time_column)
+        shaped['aggregation'] = {
+            "method": aggregate,
+            "time_bucket": time_bucket if time_column else None,
+            "time_column": time_column,
+        }
+    elif isinstance(rows, ColumnarResult):
+        rows = rows.select(selected, max_rows)
+    elif columns:
+        rows = [{name: row.get(name) for name in selected} for row in rows]
+    
+    if max_rows is not None and not isinstance(rows, ColumnarResult):
+        rows = rows[:max_rows]
+    
+    shaped['columns'] = selected
+    shaped['columns_metadata'] = [
+        column_meta for column_meta in chart_result.get('columns_metadata', [])
+        if column_meta.get('name') in selected
+    ]
+    shaped['data'] = columns_data(rows, selected) if data_format == 'columns' else rows
+    shaped['row_count'] = len(rows)
+    return shaped
+
+def columns_data(rows, columns):
+    """
+    Convert chart rows to the column-oriented output format.
+    
+    Args:
+        rows: Chart rows (list of dicts or ColumnarResult)
+        columns: Column names of the chart
+        
+    Returns:
+        dict: {"columns": [...], "values": {column: [values...]}}
+    """
+    if isinstance(rows, ColumnarResult):
+        values = {name: rows.column_values(name) for name in columns}
+    else:
+        values = {name: [row.get(name) for row in rows] for name in columns}
+    return {"columns": list(columns), "values": values}
+
+async def resolve_visualization(widget, execution_ids=None):
+    """
+    Resolve a visualization widget to its query and latest completed execution.
+    
+    Args:
+        widget: A visualization widget from the dashboard info
+        execution_ids: Execution IDs resolved up front (see resolve_execution_ids)
+        
+    Returns:
+        tuple: (query_id, parameters, options, columns, viz_info, execution_id) or None
+    """
+    visualization = widget.get('visualization', {})
+    processed_data = process_visualization(visualization)
+    
+    if not processed_data:
+        return None
+        
+    query_id, parameters, options, columns, viz_info = processed_data
+    
+    # Get execution ID for the query
+    key = execution_id_key(query_id, parameters)
+    if execution_ids is not None and key in execution_ids:
+        execution_id = execution_ids[key]
+    else:
+        logger.info(f"Getting execution ID for query {query_id}...")
+        execution_id = await get_execution_id(query_id, parameters)
+    if not execution_id:
+        return None
+    
+    return query_id, parameters, options, columns, viz_info, execution_id
+
+def plan_chart_groups(visualization_widgets, execution_ids):
+    """
+    Group a dashboard's widgets that read the same query result.
+    
+    Widgets with the same query, parameters and execution only differ in
+    chart options and the columns they show, so each group is fetched once
+    with the union of the columns its widgets need (all columns if any
+    widget has no column mapping).
+    
+    Args:
+        visualization_widgets: Visualization widgets from the dashboard info
+        execution_ids: Execution IDs from resolve_execution_ids
+        
+    Returns:
+        list: Groups as dicts with query_id, parameters, execution_id,
+        columns and members [(widget index, options, columns, viz_info)]
+    """
+    groups = {}
+    for index, widget in enumerate(visualization_widgets):
+        processed_data = process_visualization(widget.get('visualization', {}))
+        if not processed_data:
+            continue
+        query_id, parameters, options, columns, viz_info = processed_data
+        key = execution_id_key(query_id, parameters)
+        execution_id = execution_ids.get(key)
+        if not execution_id:
+            continue
+        
+        group = groups.get(key)
+        if group is None:
+            group = groups[key] = {
+                "query_id": query_id,
+                "parameters": parameters,
+                "execution_id": execution_id,
+                "columns": list(columns),
+                "members": [],
+            }
+        elif not columns or not group['columns']:
+            # 空列映射表示需要全部列
+            group['columns'] = []
+        else:
+            group['columns'].extend(column for column in columns if column not in group['columns'])
+        group['members'].append((index, options, columns, viz_info))
+    return list(groups.values())
+
+def select_result_columns(succeeded_data, columns):
+    """
+    Take one visualization's columns out of a shared execution result.
+    
+    Args:
+        succeeded_data: `execution_succeeded` of the shared result
+        columns: Columns of the visualization (empty means all)
+        
+    Returns:
+        dict: columns, columns_metadata, data and total_row_count for the chart,
+            plus `incremental` if the result was merged from a previous one
+    """
+    result_columns = succeeded_data.get('columns', [])
+    rows = succeeded_data.get('data', [])
+    selected = [column for column in columns if column in result_columns] if columns else result_columns
+    if selected != result_columns:
+        if isinstance(rows, ColumnarResult):
+            # 列式结果直接共享列数组，不复制数据
+            rows = rows.select(selected)
+        else:
+            rows = [{column: row.get(column) for column in selected} for row in rows]
+    chart_result = {
+        "columns": selected,
+        "columns_metadata": [column_meta for column_meta in succeeded_data.get('columns_metadata', []) if column_meta.get('name') in selected],
+        "data": rows,
+        "total_row_count": succeeded_data.get('total_row_count', 0),
+    }
+    if succeeded_data.get('incremental'):
+        # 标明结果由上次结果增量合并而来
+        chart_result['incremental'] = succeeded_data['incremental']
+    return chart_result
+
+async def fetch_chart_group(group, sample_size=DEFAULT_SAMPLE_SIZE):
+    """
+    Fetch the shared result of one widget group and build each widget's chart.
+    
+    Args:
+        group: A group from plan_chart_groups
+        sample_size: Rows to sample, or None for the full result
+        
+    Returns:
+        list: (widget index, chart result) pairs
+    """
+    execution_id = group['execution_id']
+    logger.info(f"Fetching chart data for execution {execution_id} ({len(group['members'])} charts)...")
+    chart_data = await fetch_chart_data(execution_id, group['query_id'], group['parameters'], group['columns'], sample_size)
+    if not chart_data:
+        return []
+    
+    charts = []
+    for index, options, columns, viz_info in group['members']:
+        # Extract and format chart result
+        chart_result = {
+            **viz_info,
+            "query_id": group['query_id'],
+            "options": options
+        }
+        if chart_data.get('execution_succeeded'):
+            chart_result.update(select_result_columns(chart_data['execution_succeeded'], columns))
+        charts.append((index, chart_result))
+    return charts
+
+async def describe_visualization_chart(widget, execution_ids=None):
+    """
+    Resolve one visualization widget to chart metadata and a row cursor,
+    without downloading any rows.
+    
+    Args:
+        widget: A visualization widget from the dashboard info
+        execution_ids: Execution IDs resolved up front (see resolve_execution_ids)
+        
+    Returns:
+        dict: Chart metadata or None if the widget has no usable data
+    """
+    resolved = await resolve_visualization(widget, execution_ids)
+    if not resolved:
+        return None
+    
+    query_id, parameters, options, columns, viz_info, execution_id = resolved
+    return {
+        **viz_info,
+        "query_id": query_id,
+        "execution_id": execution_id,
+        "options": options,
+        "output_columns": columns,
+        "cursor": encode_chart_cursor(execution_id, query_id, parameters, columns, 0),
+    }
+
+async def fetch_charts_concurrently(visualization_widgets, handler, max_concurrency=None, deadline=None):
+    """
+    Process all visualization widgets (or widget groups) of a dashboard concurrently.
+    
+    Each item runs as its own task, limited by a semaphore. Items that are
+    not ready when the deadline expires are cancelled and skipped; the result
+    keeps input order.
+    
+    Args:
+        visualization_widgets: Visualization widgets (or groups from plan_chart_groups)
+        handler: Coroutine function turning one item into a chart dict
+        max_concurrency: Maximum widgets fetched at once (default DASHBOARD_MAX_CONCURRENCY)
+        deadline: Seconds left for the whole dashboard (default DASHBOARD_DEADLINE)
+        
+    Returns:
+        list: Chart results in widget order
+    """
+    max_concurrency = max_concurrency or DASHBOARD_MAX_CONCURRENCY
+    deadline = DASHBOARD_DEADLINE if deadline is None else deadline
+    semaphore = asyncio.Semaphore(max_concurrency)
+    
+    async def fetch_with_limit(widget):
+        async with semaphore:
+            return await handler(widget)
+    
+    tasks = [asyncio.create_task(fetch_with_limit(widget)) for widget in visualization_widgets]
+    if not tasks:
+        return []
+    done, pending = await asyncio.wait(tasks, timeout=deadline)
+    if pending:
+        logger.info(f"Dashboard deadline of {deadline}s reached, skipping {len(pending)} unfinished charts")
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+    
+    charts_data = []
+    for task in tasks:
+        if task not in done:
+            continue
+        try:
+            chart_result = task.result()
+        except Exception as e:
+            logger.error(f"Error fetching chart: {e}")
+            continue
+        if chart_result:
+            charts_data.append(chart_result)
+    return charts_data
+
+async def fetch_dashboard_charts(dashboard_node, sample_size=DEFAULT_SAMPLE_SIZE):
+    """
+    Fetch the chart results of a dashboard, each distinct query result once.
+    
+    Execution IDs are resolved up front, widgets reading the same result are
+    grouped, and the groups are fetched in parallel.
     
     Args:
-        query_id: The query ID
-        parameters: Query parameters
+        dashboard_node: Dashboard info from fetch_dashboard_info
+        sample_size: Rows to sample, or None for full results
         
     Returns:
-        str: Execution ID or None if failed
+        list: Chart results in widget order
     """
-    execution_query = {
-        "operationName": "GetLatestResultSetIds",
-        "variables": {
-            "queryId": query_id,
-            "parameters": parameters,
-            "canRefresh": True
-        },
-        "query": GET_EXECUTION_QUERY
-    }
-    
-    response = run_curl_command(GRAPHQL_API, execution_query)
-    
-    if not response:
-        return None
-    
-    return response.get('data', {}).get('resultSetForQuery', {}).get('completedExecutionId')
+    # 执行ID解析和图表获取共用 DASHBOARD_DEADLINE
+    started = time.monotonic()
+    execution_ids = await resolve_execution_ids(dashboard_node['visualizationWidgets'], DASHBOARD_DEADLINE)
+    groups = plan_chart_groups(dashboard_node['visualizationWidgets'], execution_ids)
+    grouped_charts = await fetch_charts_concurrently(
+        groups,
+        handler=functools.partial(fetch_chart_group, sample_size=sample_size),
+        deadline=remaining_time(started, DASHBOARD_DEADLINE),
+    )
+    return [chart for _, chart in sorted((pair for charts in grouped_charts for pair in charts), key=lambda pair: pair[0])]
 
-def fetch_chart_data(execution_id, query_id, parameters, columns):
+async def fetch_dashboards_charts(dashboard_nodes, sample_size=DEFAULT_SAMPLE_SIZE):
     """
-    Fetch chart data using execution ID.
+    Fetch the charts of several dashboards as one job graph.
+    
+    The widgets of all dashboards are planned together: execution IDs of
+    every dashboard are resolved in the same batched GraphQL requests, and
+    widgets of different dashboards that read the same query result are
+    fetched once, with the union of their columns. All chart fetches share
+    BATCH_CONCURRENCY and BATCH_DEADLINE; the per-endpoint rate limits apply
+    as for single dashboards.
     
     Args:
-        execution_id: The execution ID
-        query_id: The query ID
-        parameters: Query parameters
-        columns: Output columns to fetch
+        dashboard_nodes: Dashboard infos from fetch_dashboard_info
+        sample_size: Rows to sample, or None for full results
         
     Returns:
-        dict: Chart data or None if failed
+        tuple: ([(charts in widget order, failed charts) per dashboard], plan stats)
     """
-    chart_data_query = {
-        "execution_id": execution_id,
-        "query_id": query_id,
-        "parameters": parameters,
-        "output_columns": columns,
-        "sampling": {"count": 8000}
-    }
+    widgets = [widget for dashboard_node in dashboard_nodes for widget in dashboard_node['visualizationWidgets']]
+    started = time.monotonic()
+    execution_ids = await resolve_execution_ids(widgets, BATCH_DEADLINE)
+    groups = plan_chart_groups(widgets, execution_ids)
+    grouped_charts = await fetch_charts_concurrently(
+        groups,
+        handler=functools.partial(fetch_chart_group, sample_size=sample_size),
+        max_concurrency=BATCH_CONCURRENCY,
+        deadline=remaining_time(started, BATCH_DEADLINE),
+    )
+    charts = dict(pair for group_charts in grouped_charts for pair in group_charts)
     
-    response = run_curl_command(EXECUTION_API, chart_data_query)
+    # 按每个仪表盘的控件范围拆分结果，找出缺失的图表及原因
+    results = []
+    start = 0
+    for dashboard_node in dashboard_nodes:
+        stop = start + len(dashboard_node['visualizationWidgets'])
+        charts_data, failed = [], []
+        for index in range(start, stop):
+            if index in charts:
+                charts_data.append(charts[index])
+                continue
+            processed_data = process_visualization(widgets[index].get('visualization', {}))
+            if not processed_data:
+                continue
+            query_id, parameters, _, _, viz_info = processed_data
+            resolved = execution_ids.get(execution_id_key(query_id, parameters))
+            failed.append({
+                **viz_info,
+                "query_id": query_id,
+                "error": "Chart data could not be fetched" if resolved else "No completed execution found",
+            })
+        results.append((charts_data, failed))
+        start = stop
     
-    return response
+    stats = {"widgets": len(widgets), "queries": len(execution_ids), "result_fetches": len(groups)}
+    return results, stats
 
-def process_visualization(visualization):
+async def load_dashboard(url):
     """
-    Process a visualization to extract query details and options.
+    Parse a dashboard URL and fetch its info.
     
     Args:
-        visualization: The visualization data
+        url: The URL of the Dune dashboard
         
     Returns:
-        tuple: (query_id, parameters, options, columns, viz_info) or None if invalid
+        tuple: (dashboard_node, None) or (None, error message)
     """
-    if not visualization:
-        return None
+    # Parse URL to get handle and slug
+    handle, slug = parse_dune_url(url)
+    if not handle or not slug:
+        return None, "Invalid Dune dashboard URL format"
+        
+    # Fetch dashboard info
+    logger.info(f"Fetching dashboard info for {handle}/{slug}...")
+    dashboard_node = await fetch_dashboard_info(handle, slug)
+    if not dashboard_node:
+        return None, "Dashboard not found or access denied by Cloudflare."
     
-    query_details = visualization.get('query_details', {})
-    if not query_details:
-        return None
+    if not dashboard_node.get('visualizationWidgets'):
+        return None, "No visualizations found in dashboard"
     
-    query_id = query_details.get('query_id')
-    parameters = query_details.get('parameters', [])
+    return dashboard_node, None
+
+def dashboard_result(dashboard_node, charts_data):
+    """组装返回给调用方的仪表盘结果"""
+    return {
+        "dashboard_name": dashboard_node.get('name'),
+        "dashboard_slug": dashboard_node.get('slug'),
+        "dashboard_id": dashboard_node.get('id'),
+        "user": dashboard_node.get('user', {}).get('name'),
+        "charts": charts_data
+    }
+
+def iso_time(timestamp):
+    """Unix时间戳 -> ISO 8601 UTC字符串"""
+    return time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(timestamp))
+
+class Watchlist:
+    """
+    Dashboards kept warm by refreshing them in the background.
     
-    if not query_id:
-        return None
+    Each watched dashboard has its own refresh interval. One asyncio task
+    sleeps until the next dashboard is due, then refreshes its metadata and
+    chart results (sampled with DEFAULT_SAMPLE_SIZE) into a snapshot that
+    get_dashboard_data answers from without any upstream request. Intervals
+    are jittered by WATCH_JITTER so dashboards added together drift apart,
+    at most WATCH_CONCURRENCY dashboards refresh at once, and a failed
+    refresh keeps the previous snapshot and is retried with backoff.
     
-    # Extract visualization info
-    viz_info = {
-        "visualization_id": visualization.get('id'),
-        "visualization_type": visualization.get('type'),
-        "visualization_name": visualization.get('name')
-    }
+    Watched URLs and intervals are saved to a JSON file (also the place to
+    register dashboards by hand) and loaded when the scheduler starts:
     
-    # Process options
-    options = visualization.get('options', {})
-    if isinstance(options, str):
+        {"dashboards": [{"url": "https://dune.com/handle/slug", "interval": 300}]}
+    """
+    
+    def __init__(self, path=WATCHLIST_FILE):
+        self.path = path
+        self.entries = {}  # (handle, slug) -> 关注状态
+        self.loaded = False
+        self.task = None
+        self.refresh_tasks = set()
+        self.wakeup = None  # 调度任务的事件循环中创建
+        self.semaphore = None
+        self.refreshes = 0
+        self.failures = 0
+        self.served = 0
+    
+    def add(self, url, interval=None, first_refresh=None):
+        """
+        Watch a dashboard, or change the interval of a watched one.
+        
+        Args:
+            url: The URL of the Dune dashboard
+            interval: Seconds between refreshes (default WATCH_INTERVAL, at least WATCH_MIN_INTERVAL)
+            first_refresh: Unix time of the first refresh of a new entry (default now)
+            
+        Returns:
+            tuple: (entry, None) or (None, error message)
+        """
+        handle, slug = parse_dune_url(url)
+        if not handle or not slug:
+            return None, "Invalid Dune dashboard URL format"
+        interval = max(WATCH_MIN_INTERVAL, interval or WATCH_INTERVAL)
+        
+        entry = self.entries.get((handle, slug))
+        if entry is None:
+            entry = self.entries[(handle, slug)] = {
+                "url": url,
+                "handle": handle,
+                "slug": slug,
+                "interval": interval,
+                "next_refresh": first_refresh or time.time(),
+                "refreshing": False,
+                "snapshot": None,
+                "last_error": None,
+                "consecutive_failures": 0,
+            }
+        elif interval != entry['interval']:
+            entry['interval'] = interval
+            entry['next_refresh'] = min(entry['next_refresh'], time.time() + jittered(interval))
+        if self.wakeup:
+            self.wakeup.set()
+        return entry, None
+    
+    def remove(self, url):
+        """停止关注，返回是否原本在关注列表中"""
+        entry = self.entries.pop(parse_dune_url(url), None)
+        if entry and self.wakeup:
+            self.wakeup.set()
+        return entry is not None
+    
+    def snapshot(self, url):
+        """
+        Warm data of a watched dashboard.
+        
+        Args:
+            url: The URL of the Dune dashboard
+            
+        Returns:
+            tuple: (dashboard_node, charts, freshness) or None if the dashboard
+            is not watched, not refreshed yet, or its snapshot is older than WATCH_MAX_AGE
+        """
+        entry = self.entries.get(parse_dune_url(url))
+        snapshot = entry and entry['snapshot']
+        if not snapshot:
+            return None
+        age = time.time() - snapshot['refreshed_at']
+        if WATCH_MAX_AGE > 0 and age > WATCH_MAX_AGE:
+            return None
+        
+        self.served += 1
+        freshness = {
+            "source": "watchlist",
+            "refreshed_at": iso_time(snapshot['refreshed_at']),
+            "age_seconds": round(age, 1),
+            "next_refresh_at": iso_time(entry['next_refresh']),
+            "interval": entry['interval'],
+        }
+        if entry['last_error']:
+            freshness['last_error'] = entry['last_error']
+        return snapshot['dashboard_node'], snapshot['charts'], freshness
+    
+    def status(self, entry):
+        """单个关注仪表盘的状态（供 list_watched_dashboards 返回）"""
+        snapshot = entry['snapshot']
+        return {
+            "url": entry['url'],
+            "interval": entry['interval'],
+            "refreshing": entry['refreshing'],
+            "next_refresh_at": iso_time(entry['next_refresh']),
+            "refreshed_at": iso_time(snapshot['refreshed_at']) if snapshot else None,
+            "refresh_seconds": round(snapshot['duration'], 3) if snapshot else None,
+            "charts": len(snapshot['charts']) if snapshot else None,
+            "last_error": entry['last_error'],
+            "consecutive_failures": entry['consecutive_failures'],
+        }
+    
+    def save(self):
+        """把关注的URL和刷新间隔写入关注列表文件"""
+        if not self.path:
+            return
+        state = {"dashboards": [{"url": entry['url'], "interval": entry['interval']} for entry in self.entries.values()]}
         try:
-            options = json.loads(options)
-        except:
-            options = {}
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(state, f, indent=2)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.error(f"[Watchlist] Failed to save watchlist: {e}")
     
-    # Extract columns from options
-    columns = []
-    column_mapping = options.get('columnMapping', {})
-    if column_mapping:
-        columns = list(column_mapping.keys())
+    def load(self):
+        """
+        Load dashboards from the watchlist file.
+        
+        Entries are either URLs or {"url": ..., "interval": ...} objects. Their
+        first refreshes are spread over the first WATCH_JITTER of their
+        interval so a long list does not refresh all at once.
+        
+        Returns:
+            int: Number of dashboards loaded
+        """
+        if not self.path:
+            return 0
+        try:
+            with open(self.path) as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            return 0
+        except (OSError, ValueError) as e:
+            logger.error(f"[Watchlist] Failed to load watchlist: {e}")
+            return 0
+        
+        loaded = 0
+        for item in state.get('dashboards', []) if isinstance(state, dict) else state:
+            url, interval = (item, None) if isinstance(item, str) else (item.get('url'), item.get('interval'))
+            interval = max(WATCH_MIN_INTERVAL, interval or WATCH_INTERVAL)
+            entry, error = self.add(url or '', interval, time.time() + random.uniform(0, WATCH_JITTER * interval))
+            if error:
+                logger.error(f"[Watchlist] Skipping {url!r}: {error}")
+            else:
+                loaded += 1
+        logger.info(f"[Watchlist] Loaded {loaded} dashboards from {self.path}")
+        return loaded
     
-    return query_id, parameters, options, columns, viz_info
+    def start(self):
+        """
+        Load the watchlist file (on the first call) and start the scheduler
+        on the running event loop, unless no dashboard is watched. Calls
+        while the scheduler runs return immediately.
+        """
+        if self.task:
+            return
+        if not self.loaded:
+            self.loaded = True
+            self.load()
+        if not self.entries:
+            return
+        self.wakeup = asyncio.Event()
+        self.semaphore = asyncio.Semaphore(WATCH_CONCURRENCY)
+        self.task = asyncio.create_task(self.run())
+    
+    async def stop(self):
+        """取消调度任务和正在进行的刷新，并等待它们结束"""
+        tasks = [task for task in (self.task, *self.refresh_tasks) if task]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.task = None
+        self.wakeup = None
+        self.semaphore = None
+    
+    async def run(self):
+        """调度循环：启动到期的刷新，然后睡到下一个仪表盘到期或关注列表变化"""
+        while True:
+            now = time.time()
+            for entry in list(self.entries.values()):
+                if not entry['refreshing'] and entry['next_refresh'] <= now:
+                    entry['refreshing'] = True
+                    task = asyncio.create_task(self.refresh(entry))
+                    self.refresh_tasks.add(task)
+                    task.add_done_callback(self.refresh_tasks.discard)
+            
+            due = [entry['next_refresh'] for entry in self.entries.values() if not entry['refreshing']]
+            self.wakeup.clear()
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), timeout=max(0, min(due) - now) if due else None)
+            except asyncio.TimeoutError:
+                pass
+    
+    async def refresh(self, entry):
+        """刷新一个关注的仪表盘：重新获取元数据、执行ID和图表数据，写入快照"""
+        handle, slug = entry['handle'], entry['slug']
+        delay = entry['interval']
+        try:
+            async with self.semaphore:
+                logger.info(f"[Watchlist] Refreshing {handle}/{slug}...")
+                start = time.perf_counter()
+                dashboard_node = await refresh_dashboard_info(handle, slug)
+                if not dashboard_node:
+                    raise RuntimeError("Dashboard not found or access denied by Cloudflare.")
+                if not dashboard_node.get('visualizationWidgets'):
+                    raise RuntimeError("No visualizations found in dashboard")
+                charts = await fetch_dashboard_charts(dashboard_node)
+                if not charts:
+                    raise RuntimeError("No chart data could be fetched")
+                duration = time.perf_counter() - start
+            
+            entry['snapshot'] = {"dashboard_node": dashboard_node, "charts": charts, "refreshed_at": time.time(), "duration": duration}
+            entry['last_error'] = None
+            entry['consecutive_failures'] = 0
+            delay = jittered(entry['interval'])
+            self.refreshes += 1
+            metrics.inc('dune_watch_refreshes_total', outcome='success')
+            metrics.observe('dune_stage_duration_seconds', duration, stage='watch_refresh')
+        except Exception as e:
+            entry['last_error'] = str(e)
+            entry['consecutive_failures'] += 1
+            delay = min(entry['interval'], jittered(WATCH_RETRY_DELAY * 2 ** (entry['consecutive_failures'] - 1)))
+            self.failures += 1
+            metrics.inc('dune_watch_refreshes_total', outcome='failure')
+            logger.error(f"[Watchlist] Failed to refresh {handle}/{slug}, retrying in {delay:.0f}s: {e}")
+        finally:
+            entry['next_refresh'] = time.time() + delay
+            entry['refreshing'] = False
+            self.wakeup.set()
+    
+    def stats(self):
+        now = time.time()
+        ages = [now - entry['snapshot']['refreshed_at'] for entry in self.entries.values() if entry['snapshot']]
+        return {
+            "dashboards": len(self.entries),
+            "warm": len(ages),
+            "refreshing": sum(entry['refreshing'] for entry in self.entries.values()),
+            "refreshes": self.refreshes,
+            "failures": self.failures,
+            "served": self.served,
+            "oldest_snapshot_age": round(max(ages), 1) if ages else None,
+        }
+
+def jittered(delay):
+    """在 delay 上加减最多 WATCH_JITTER 比例的随机浮动"""
+    return delay * random.uniform(1 - WATCH_JITTER, 1 + WATCH_JITTER)
+
+# 关注列表与后台刷新调度
+watchlist = Watchlist()
+
+def parse_data_options(columns, max_rows, aggregate, time_bucket, sample_size, full_result, data_format, since):
+    """
+    Validate the data options of get_dashboard_data and get_dashboards_data.
+    
+    Returns:
+        tuple: (options, None) or (None, error message); options holds the
+        `sample_size` to fetch and the `shape` keyword arguments of
+        shape_chart_result
+    """
+    if time_bucket and not aggregate:
+        aggregate = 'last'
+    if aggregate and aggregate not in AGGREGATIONS:
+        return None, f"Unsupported aggregate '{aggregate}', use one of {', '.join(AGGREGATIONS)}"
+    if time_bucket:
+        try:
+            lazy_import('pandas.tseries.frequencies').to_offset(time_bucket)
+        except ValueError:
+            return None, f"Invalid time_bucket '{time_bucket}'"
+    if max_rows is not None and max_rows < 0:
+        return None, "max_rows must not be negative"
+    if sample_size is not None and sample_size < 1:
+        return None, "sample_size must be positive"
+    if data_format not in DATA_FORMATS:
+        return None, f"Unsupported format '{data_format}', use one of {', '.join(DATA_FORMATS)}"
+    if since is not None:
+        try:
+            since = parse_since(since)
+        except ValueError:
+            return None, f"Invalid since '{since}'"
+    
+    return {
+        "sample_size": None if full_result else sample_size or DEFAULT_SAMPLE_SIZE,
+        "shape": {
+            "columns": columns,
+            "max_rows": max_rows,
+            "aggregate": aggregate,
+            "time_bucket": time_bucket,
+            "data_format": data_format,
+            "since": since,
+        },
+    }, None
+
+async def shape_charts(charts_data, shape):
+    """对图表应用 shape_chart_result（在线程中运行，不阻塞事件循环）；没有需要处理的选项时原样返回"""
+    if not (shape['columns'] or shape['max_rows'] is not None or shape['aggregate'] or shape['data_format'] != 'rows' or shape['since'] is not None):
+        return charts_data
+    return await asyncio.to_thread(lambda: [shape_chart_result(chart, **shape) for chart in charts_data])
+
+def tool_response(tool, result):
+    """编码工具返回值，记录序列化耗时和响应大小"""
+    start = time.perf_counter()
+    text = serializer.dumps(result)
+    metrics.observe('dune_stage_duration_seconds', time.perf_counter() - start, stage='serialize')
+    metrics.observe('dune_tool_response_bytes', len(text), BYTES_BUCKETS, tool=tool)
+    return text
 
 @mcp.tool()
-def get_dashboard_data(url: str) -> str:
+async def get_dashboard_data(
+    url: str,
+    columns: list[str] | None = None,
+    max_rows: int | None = None,
+    aggregate: str | None = None,
+    time_bucket: str | None = None,
+    sample_size: int | None = None,
+    full_result: bool = False,
+    format: str = "rows",
+    since: str | None = None,
+) -> str:
     """
     Retrieve chart data from a Dune dashboard URL.
     
+    For large dashboards prefer get_dashboard_charts + get_chart_rows, which
+    page through rows instead of returning every chart in one response.
+    Selecting columns, limiting rows or aggregating also shrinks the response.
+    Dashboards registered with watch_dashboard are answered immediately from
+    their last background refresh; such responses carry a `freshness` field.
+    
     Args:
         url: The URL of the Dune dashboard, e.g., https://dune.com/cryptokoryo/crypto-buy-signal
+        columns: Only return these columns (charts keep the ones they have)
+        max_rows: Maximum rows returned per chart
+        aggregate: Aggregate each chart with one of sum, mean, min, max, last
+        time_bucket: Group the time column into buckets before aggregating, e.g. "1h", "1D", "1W", "MS" (default aggregate: last)
+        sample_size: Rows Dune samples per chart (default 8000); `total_row_count` shows the real size
+        full_result: Download every row instead of a sample (paged; can be large)
+        format: "rows" (list of row objects) or "columns" ({"columns": [...], "values": {column: [...]}}, smaller)
+        since: Only return rows whose time column is at or after this time (UTC), e.g. "2024-05-01" or "2024-05-01 12:00:00"; for polling time series
     
     Returns:
         JSON string containing the chart data
     """
     try:
-        # Step 1: Parse URL to get handle and slug
-        handle, slug = parse_dune_url(url)
-        if not handle or not slug:
-            return json.dumps({"error": "Invalid Dune dashboard URL format"})
-            
-        # Step 2: Fetch dashboard info
-        logger.info(f"Fetching dashboard info for {handle}/{slug}...")
-        dashboard_node = fetch_dashboard_info(handle, slug)
-        if not dashboard_node:
-            return json.dumps({"error": "Dashboard not found or access denied by Cloudflare."})
-        
-        # Get visualization widgets
-        visualization_widgets = dashboard_node.get('visualizationWidgets', [])
-        if not visualization_widgets:
-            return json.dumps({"error": "No visualizations found in dashboard"})
-        
-        # Step 3: Process each visualization widget
-        charts_data = []
-        
-        for widget in visualization_widgets:
-            visualization = widget.get('visualization', {})
-            processed_data = process_visualization(visualization)
-            
-            if not processed_data:
-                continue
-                
-            query_id, parameters, options, columns, viz_info = processed_data
-            
-            # Step 4: Get execution ID for the query
-            logger.info(f"Getting execution ID for query {query_id}...")
-            execution_id = get_execution_id(query_id, parameters)
-            if not execution_id:
-                continue
-            
-            # Step 5: Fetch chart data
-            logger.info(f"Fetching chart data for execution {execution_id}...")
-            chart_data = fetch_chart_data(execution_id, query_id, parameters, columns)
-            if not chart_data:
-                continue
-            
-            # Step 6: Extract and format chart result
-            chart_result = {
-                **viz_info,
-                "query_id": query_id,
-                "options": options
-            }
-            
-            if chart_data.get('execution_succeeded'):
-                succeeded_data = chart_data['execution_succeeded']
-                chart_result['columns'] = succeeded_data.get('columns', [])
-                chart_result['columns_metadata'] = succeeded_data.get('columns_metadata', [])
-                chart_result['data'] = succeeded_data.get('data', [])
-                chart_result['total_row_count'] = succeeded_data.get('total_row_count', 0)
+        options, error = parse_data_options(columns, max_rows, aggregate, time_bucket, sample_size, full_result, format, since)
+        if error:
+            return json.dumps({"error": error})
+        sample_size = options['sample_size']
+        
+        # Watched dashboards are answered from the snapshot of the last background refresh
+        warm = watchlist.snapshot(url) if sample_size == DEFAULT_SAMPLE_SIZE else None
+        if warm:
+            dashboard_node, charts_data, freshness = warm
+        else:
+            # Step 1: Parse URL and fetch dashboard info
+            dashboard_node, error = await load_dashboard(url)
+            if error:
+                return json.dumps({"error": error})
             
-            charts_data.append(chart_result)
+            # Step 2: Resolve execution IDs, then fetch each distinct query result once, in parallel
+            charts_data = await fetch_dashboard_charts(dashboard_node, sample_size)
+            freshness = None
+        
+        # Step 3: Filter by time, select columns, aggregate, limit rows and convert the format (pandas work runs off the event loop)
+        charts_data = await shape_charts(charts_data, options['shape'])
+        
+        # Step 4: Return dashboard data with all charts
+        result = dashboard_result(dashboard_node, charts_data)
+        if freshness:
+            result['freshness'] = freshness
+        return tool_response('get_dashboard_data', result)
+        
+    except Exception as e:
+        return json.dumps({"error": f"Failed to process dashboard: {str(e)}"})
+
+@mcp.tool()
+async def get_dashboards_data(
+    urls: list[str],
+    columns: list[str] | None = None,
+    max_rows: int | None = None,
+    aggregate: str | None = None,
+    time_bucket: str | None = None,
+    sample_size: int | None = None,
+    full_result: bool = False,
+    format: str = "rows",
+    since: str | None = None,
+) -> str:
+    """
+    Retrieve chart data from several Dune dashboards in one call.
+    
+    Prefer this over calling get_dashboard_data once per URL: all dashboards
+    are fetched together, and a query shown on several dashboards is
+    downloaded only once. Each dashboard comes back with the fields of
+    get_dashboard_data plus a `status`: "ok", "partial" (some charts failed,
+    listed in `failed_charts`) or "error" (with `error`), so one failing
+    dashboard does not fail the others.
+    
+    Args:
+        urls: Dashboard URLs (up to 20), e.g., ["https://dune.com/cryptokoryo/crypto-buy-signal"]
+        columns: Only return these columns (charts keep the ones they have)
+        max_rows: Maximum rows returned per chart
+        aggregate: Aggregate each chart with one of sum, mean, min, max, last
+        time_bucket: Group the time column into buckets before aggregating, e.g. "1h", "1D", "1W", "MS" (default aggregate: last)
+        sample_size: Rows Dune samples per chart (default 8000)
+        full_result: Download every row instead of a sample (paged; can be large)
+        format: "rows" (list of row objects) or "columns" ({"columns": [...], "values": {column: [...]}}, smaller)
+        since: Only return rows whose time column is at or after this time (UTC)
+    
+    Returns:
+        JSON string with one entry per URL under "dashboards" and a "summary"
+    """
+    try:
+        if not urls:
+            return json.dumps({"error": "urls must not be empty"})
+        if len(urls) > BATCH_MAX_DASHBOARDS:
+            return json.dumps({"error": f"At most {BATCH_MAX_DASHBOARDS} dashboards per call"})
+        options, error = parse_data_options(columns, max_rows, aggregate, time_bucket, sample_size, full_result, format, since)
+        if error:
+            return json.dumps({"error": error})
+        sample_size = options['sample_size']
+        start = time.perf_counter()
+        
+        # Step 1: One job per distinct dashboard; watched dashboards come from their snapshot
+        keys = {url: parse_dune_url(url) for url in urls}
+        jobs = {}  # (handle, slug) -> URL used to fetch it
+        for url, key in keys.items():
+            if all(key):
+                jobs.setdefault(key, url)
+        warm = {key: watchlist.snapshot(url) if sample_size == DEFAULT_SAMPLE_SIZE else None for key, url in jobs.items()}
+        cold = [key for key in jobs if not warm[key]]
+        loaded = await asyncio.gather(*(load_dashboard(jobs[key]) for key in cold), return_exceptions=True)
+        dashboard_nodes, errors = {}, {}
+        for key, result in zip(cold, loaded):
+            if isinstance(result, Exception):
+                errors[key] = f"Failed to process dashboard: {str(result)}"
+            elif result[1]:
+                errors[key] = result[1]
+            else:
+                dashboard_nodes[key] = result[0]
+        
+        # Step 2: Resolve execution IDs and fetch chart data of all dashboards as one job graph
+        results, stats = await fetch_dashboards_charts(list(dashboard_nodes.values()), sample_size)
+        charts = dict(zip(dashboard_nodes, results))
+        for key in jobs:
+            if warm[key]:
+                dashboard_nodes[key], charts_data, _ = warm[key]
+                charts[key] = (charts_data, [])
+        
+        # Step 3: Shape the charts of all dashboards in one pass
+        keys_in_order = [key for key in jobs if key in charts]
+        shaped = await shape_charts([chart for key in keys_in_order for chart in charts[key][0]], options['shape'])
+        position = 0
+        for key in keys_in_order:
+            charts_data, failed = charts[key]
+            charts[key] = (shaped[position:position + len(charts_data)], failed)
+            position += len(charts_data)
+        
+        # Step 4: One entry per requested URL, with partial failures reported per dashboard
+        entries = []
+        for url in urls:
+            key = keys[url]
+            if not all(key):
+                entries.append({"url": url, "status": "error", "error": "Invalid Dune dashboard URL format"})
+            elif key in errors:
+                entries.append({"url": url, "status": "error", "error": errors[key]})
+            else:
+                charts_data, failed = charts[key]
+                entry = {"url": url, "status": "partial" if failed else "ok", **dashboard_result(dashboard_nodes[key], charts_data)}
+                if failed:
+                    entry['failed_charts'] = failed
+                    if not charts_data:
+                        entry['status'] = "error"
+                        entry['error'] = "No chart data could be fetched"
+                if warm[key]:
+                    entry['freshness'] = warm[key][2]
+                entries.append(entry)
         
-        # Step 7: Return dashboard data with all charts
-        result = {
-            "dashboard_name": dashboard_node.get('name'),
-            "dashboard_slug": dashboard_node.get('slug'),
-            "dashboard_id": dashboard_node.get('id'),
-            "user": dashboard_node.get('user', {}).get('name'),
-            "charts": charts_data
+        statuses = [entry['status'] for entry in entries]
+        summary = {
+            "dashboards": len(entries),
+            "ok": statuses.count("ok"),
+            "partial": statuses.count("partial"),
+            "failed": statuses.count("error"),
+            "from_watchlist": sum(1 for key in jobs if warm[key]),
+            **stats,
+            "elapsed_seconds": round(time.perf_counter() - start, 3),
         }
+        return tool_response('get_dashboards_data', {"dashboards": entries, "summary": summary})
+        
+    except Exception as e:
+        return json.dumps({"error": f"Failed to process dashboards: {str(e)}"})
 
-        return json.dumps(result)
+@mcp.tool()
+async def get_dashboard_charts(url: str) -> str:
+    """
+    List the charts of a Dune dashboard without their rows.
+    
+    Each chart carries a `cursor`; pass it to get_chart_rows to page through
+    the chart's data.
+    
+    Args:
+        url: The URL of the Dune dashboard, e.g., https://dune.com/cryptokoryo/crypto-buy-signal
+    
+    Returns:
+        JSON string containing dashboard info and chart metadata
+    """
+    try:
+        dashboard_node, error = await load_dashboard(url)
+        if error:
+            return json.dumps({"error": error})
+        
+        started = time.monotonic()
+        execution_ids = await resolve_execution_ids(dashboard_node['visualizationWidgets'], DASHBOARD_DEADLINE)
+        charts_data = await fetch_charts_concurrently(
+            dashboard_node['visualizationWidgets'],
+            handler=functools.partial(describe_visualization_chart, execution_ids=execution_ids),
+            deadline=remaining_time(started, DASHBOARD_DEADLINE),
+        )
+        return tool_response('get_dashboard_charts', dashboard_result(dashboard_node, charts_data))
         
     except Exception as e:
         return json.dumps({"error": f"Failed to process dashboard: {str(e)}"})
 
+@mcp.tool()
+async def get_chart_rows(cursor: str, limit: int = CHART_PAGE_DEFAULT_LIMIT, offset: int | None = None, format: str = "rows") -> str:
+    """
+    Page through the rows of one chart.
+    
+    Args:
+        cursor: A chart cursor from get_dashboard_charts, or `next_cursor` from a previous page
+        limit: Maximum rows to return (capped by the server)
+        offset: Row index to start from, overriding the cursor position
+        format: "rows" (list of row objects) or "columns" ({"columns": [...], "values": {column: [...]}})
+    
+    Returns:
+        JSON string with the page rows and `next_cursor` (null on the last page)
+    """
+    try:
+        state = decode_chart_cursor(cursor)
+        if not state:
+            return json.dumps({"error": "Invalid cursor"})
+        
+        offset = state['offset'] if offset is None else offset
+        limit = max(1, min(limit, CHART_PAGE_MAX_LIMIT))
+        if offset < 0:
+            return json.dumps({"error": "offset must not be negative"})
+        if format not in DATA_FORMATS:
+            return json.dumps({"error": f"Unsupported format '{format}', use one of {', '.join(DATA_FORMATS)}"})
+        
+        execution_id = state['execution_id']
+        query_id = state['query_id']
+        parameters = state['parameters']
+        columns = state['columns']
+        
+        logger.info(f"Fetching rows {offset}-{offset + limit} of execution {execution_id}...")
+        chart_page = await fetch_chart_page(execution_id, query_id, parameters, columns, offset, limit)
+        if not chart_page or not chart_page.get('execution_succeeded'):
+            return json.dumps({"error": "Failed to fetch chart rows"})
+        
+        succeeded_data = chart_page['execution_succeeded']
+        rows = succeeded_data.get('data', [])
+        total_row_count = succeeded_data.get('total_row_count', 0)
+        next_offset = offset + len(rows)
+        next_cursor = None
+        if rows and next_offset < total_row_count:
+            next_cursor = encode_chart_cursor(execution_id, query_id, parameters, columns, next_offset)
+        
+        return tool_response('get_chart_rows', {
+            "query_id": query_id,
+            "execution_id": execution_id,
+            "offset": offset,
+            "columns": succeeded_data.get('columns', []),
+            "columns_metadata": succeeded_data.get('columns_metadata', []),
+            "data": columns_data(rows, succeeded_data.get('columns', [])) if format == 'columns' else rows,
+            "total_row_count": total_row_count,
+            "next_cursor": next_cursor,
+        })
+        
+    except Exception as e:
+        return json.dumps({"error": f"Failed to fetch chart rows: {str(e)}"})
+
+@mcp.tool()
+def get_cache_stats() -> str:
+    """
+    Report hit/miss/eviction counters of the server's caches, how many
+    concurrent requests were coalesced into a single upstream call, the
+    current adaptive rate limits, and p50/p95/p99 request latency per
+    endpoint (useful for tuning DUNE_HEDGE_PERCENTILE).
+    
+    Returns:
+        JSON string with counters and current size per cache
+    """
+    return json.dumps({
+        "dashboard_cache": dashboard_cache.stats(),
+        "result_cache": result_cache.stats(),
+        "request_coalescing": {
+            "dashboard_info": dashboard_flight.stats(),
+            "execution_id": execution_id_flight.stats(),
+            "chart_data": chart_data_flight.stats(),
+        },
+        "execution_id_batching": execution_id_batcher.stats(),
+        "rate_limits": rate_limiter.stats(),
+        "latency": {url: tracker.stats() for url, tracker in latency_trackers.items()},
+        "hedging": {"enabled": HEDGE_ENABLED, **hedge_stats},
+        "watchlist": watchlist.stats(),
+    })
+
+@mcp.tool()
+async def watch_dashboard(url: str, interval: float | None = None) -> str:
+    """
+    Keep a Dune dashboard warm: its metadata and chart data are refreshed in
+    the background every `interval` seconds, and get_dashboard_data answers
+    from the latest refresh instead of fetching. The watchlist is kept
+    across restarts.
+    
+    Args:
+        url: The URL of the Dune dashboard, e.g., https://dune.com/cryptokoryo/crypto-buy-signal
+        interval: Seconds between refreshes (default 300)
+    
+    Returns:
+        JSON string with the dashboard's watch status
+    """
+    # 先加载关注列表文件，加入新仪表盘后再启动调度
+    watchlist.start()
+    entry, error = watchlist.add(url, interval)
+    if error:
+        return json.dumps({"error": error})
+    watchlist.start()
+    watchlist.save()
+    return json.dumps(watchlist.status(entry))
+
+@mcp.tool()
+async def unwatch_dashboard(url: str) -> str:
+    """
+    Stop refreshing a dashboard registered with watch_dashboard.
+    
+    Args:
+        url: The URL of the Dune dashboard
+    
+    Returns:
+        JSON string telling whether the dashboard was watched
+    """
+    removed = watchlist.remove(url)
+    if removed:
+        watchlist.save()
+    return json.dumps({"url": url, "removed": removed})
+
+@mcp.tool()
+async def list_watched_dashboards() -> str:
+    """
+    List watched dashboards with their refresh interval, when they were last
+    refreshed, when the next refresh is due and the last refresh error.
+    
+    Returns:
+        JSON string with one status per watched dashboard
+    """
+    watchlist.start()
+    return json.dumps({"dashboards": [watchlist.status(entry) for entry in watchlist.entries.values()]})
+
+# 热路径上记录的指标：(类型, 说明)
+METRIC_HELP = {
+    'dune_stage_duration_seconds': ('histogram', 'Time spent per stage (dashboard info, execution ID, chart data, serialization)'),
+    'dune_http_requests_total': ('counter', 'Upstream HTTP requests by endpoint, route and outcome'),
+    'dune_http_request_duration_seconds': ('histogram', 'Latency of successful upstream HTTP requests'),
+    'dune_http_response_bytes': ('histogram', 'Size of successful upstream response bodies'),
+    'dune_http_retries_total': ('counter', 'Upstream requests retried after a failed attempt'),
+    'dune_http_deadline_exceeded_total': ('counter', 'Upstream requests abandoned at their deadline'),
+    'dune_http_direct_fallbacks_total': ('counter', 'Requests sent directly after every proxy attempt failed'),
+    'dune_proxy_evictions_total': ('counter', 'Proxies evicted after consecutive failures'),
+    'dune_tool_response_bytes': ('histogram', 'Size of encoded tool responses'),
+    'dune_watch_refreshes_total': ('counter', 'Background refreshes of watched dashboards by outcome'),
+    'dune_incremental_results_total': ('counter', 'New executions built from the previous result (merged) or downloaded whole after a mismatch'),
+    'dune_incremental_rows_total': ('counter', 'Rows of incrementally built results, reused from the previous result or downloaded'),
+}
+
+def component_metrics():
+    """
+    Metrics read from the state of the proxy pool, caches, request
+    coalescing, execution ID batching, rate limiter, hedging and watchlist.
+    
+    Returns:
+        list: (name, type, help, [(labels dict, value), ...]) tuples
+    """
+    with proxy_pool.lock:
+        candidates = len(proxy_pool.proxies)
+        working = len(proxy_pool.working_proxies)
+        latencies = [proxy_pool.scores[proxy].latency for proxy in proxy_pool.working_proxies
+                     if proxy in proxy_pool.scores and proxy_pool.scores[proxy].latency is not None]
+    caches = {"dashboard": dashboard_cache.stats(), "result": result_cache.stats()}
+    flights = {"dashboard_info": dashboard_flight, "execution_id": execution_id_flight, "chart_data": chart_data_flight}
+    flight_stats = {operation: flight.stats() for operation, flight in flights.items()}
+    buckets = list(rate_limiter.endpoint_buckets.items())
+    watch_stats = watchlist.stats()
+    
+    return [
+        ("dune_proxy_pool_enabled", "gauge", "1 if requests go through the proxy pool", [({}, int(USE_PROXY_POOL))]),
+        ("dune_proxy_pool_started", "gauge", "1 once the proxy pool has been started", [({}, int(proxy_pool.started))]),
+        ("dune_proxy_pool_proxies", "gauge", "Proxies known to the pool by state",
+         [({"state": "candidate"}, candidates), ({"state": "working"}, working)]),
+        ("dune_proxy_pool_latency_seconds", "gauge", "Mean latency estimate of working proxies",
+         [({}, sum(latencies) / len(latencies))] if latencies else []),
+        ("dune_cache_requests_total", "counter", "Cache lookups by result",
+         [({"cache": cache, "result": result}, stats[key])
+          for cache, stats in caches.items() for result, key in (("hit", "hits"), ("stale_hit", "stale_hits"), ("miss", "misses"))]),
+        ("dune_cache_evictions_total", "counter", "Cache entries evicted", [({"cache": cache}, stats["evictions"]) for cache, stats in caches.items()]),
+        ("dune_cache_entries", "gauge", "Entries held per cache", [({"cache": cache}, stats["entries"]) for cache, stats in caches.items()]),
+        ("dune_cache_bytes", "gauge", "Estimated bytes held per cache", [({"cache": cache}, stats["bytes"]) for cache, stats in caches.items()]),
+        ("dune_coalesced_calls_total", "counter", "Calls by whether they started an upstream request or joined one in flight",
+         [({"operation": operation, "kind": kind}, stats[kind]) for operation, stats in flight_stats.items() for kind in ("upstream", "coalesced")]),
+        ("dune_in_flight_requests", "gauge", "Coalesced upstream requests in flight",
+         [({"operation": operation}, stats["in_flight"]) for operation, stats in flight_stats.items()]),
+        ("dune_execution_id_lookups_total", "counter", "Execution ID lookups resolved through batching", [({}, execution_id_batcher.lookups)]),
+        ("dune_execution_id_batches_total", "counter", "Batched execution ID requests sent", [({}, execution_id_batcher.requests)]),
+        ("dune_execution_id_fallbacks_total", "counter", "Lookups retried individually after a batch", [({}, execution_id_batcher.fallbacks)]),
+        ("dune_rate_limit_requests_per_second", "gauge", "Current adaptive rate per endpoint",
+         [({"endpoint": endpoint_name(url)}, bucket.rate) for url, bucket in buckets]),
+        ("dune_rate_limit_throttled_total", "counter", "Throttling responses seen per endpoint",
+         [({"endpoint": endpoint_name(url)}, bucket.throttled) for url, bucket in buckets]),
+        ("dune_hedged_requests_total", "counter", "Extra requests sent by hedging", [({}, hedge_stats["hedged"])]),
+        ("dune_hedge_wins_total", "counter", "Hedged requests that answered first", [({}, hedge_stats["hedge_won"])]),
+        ("dune_watched_dashboards", "gauge", "Watched dashboards by whether they have warm data",
+         [({"state": "warm"}, watch_stats["warm"]), ({"state": "cold"}, watch_stats["dashboards"] - watch_stats["warm"])]),
+        ("dune_watch_served_total", "counter", "get_dashboard_data calls answered from watchlist snapshots", [({}, watch_stats["served"])]),
+        ("dune_watch_snapshot_age_seconds", "gauge", "Age of the oldest watchlist snapshot",
+         [({}, watch_stats["oldest_snapshot_age"])] if watch_stats["oldest_snapshot_age"] is not None else []),
+    ]
+
+def format_labels(labels):
+    """标签 -> {name="value"}，按Prometheus规则转义"""
+    if not labels:
+        return ''
+    items = labels.items() if isinstance(labels, dict) else labels
+    escaped = {name: str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for name, value in items}
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped.items()) + '}'
+
+def format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(value) if isinstance(value, float) else str(value)
+
+def render_metrics():
+    """
+    Render all metrics in the Prometheus text exposition format.
+    
+    Returns:
+        str: Metrics text (content type text/plain; version=0.0.4)
+    """
+    lines = []
+    families = metrics.samples()
+    for name, (kind, help_text) in METRIC_HELP.items():
+        samples = families.get(name, [])
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, value in samples:
+            if kind != 'histogram':
+                lines.append(f"{name}{format_labels(labels)} {format_value(value)}")
+                continue
+            for bound, count in value.cumulative():
+                lines.append(f"{name}_bucket{format_labels(labels + (('le', format_value(float(bound))),))} {count}")
+            lines.append(f"{name}_sum{format_labels(labels)} {format_value(value.sum)}")
+            lines.append(f"{name}_count{format_labels(labels)} {value.count}")
+    
+    for name, kind, help_text, samples in component_metrics():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, value in samples:
+            lines.append(f"{name}{format_labels(labels)} {format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    """GET /metrics 返回Prometheus格式的指标"""
+
+    def do_GET(self):
+        if urlparse(self.path).path != '/metrics':
+            self.send_error(404)
+            return
+        body = render_metrics().encode()
+        self.send_response(200)
+        self.send_header('content-type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('content-length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_metrics_server(port=METRICS_PORT, host=METRICS_HOST):
+    """在后台线程中启动指标HTTP端点"""
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    logger.info(f"[Metrics] Serving metrics on http://{host}:{server.server_address[1]}/metrics")
+    return server
+
+@mcp.tool()
+def get_metrics() -> str:
+    """
+    Report server metrics in the Prometheus text format: per-stage latency
+    histograms (dashboard info, execution ID, chart data, serialization),
+    upstream request outcomes, retries and response sizes, proxy pool size
+    and health, cache and coalescing counters, rate limits and hedging.
+    
+    Returns:
+        Prometheus exposition text
+    """
+    return render_metrics()
+
+@mcp.resource("metrics://prometheus", name="metrics", mime_type="text/plain")
+def metrics_resource() -> str:
+    """Server metrics in the Prometheus text format (same as get_metrics)"""
+    return render_metrics()
+
+def run_store_cli(argv):
+    """
+    Inspect and prune the on-disk result store.
+    
+    Usage: python main.py store {list,stats,prune,clear} [options]
+    """
+    parser = argparse.ArgumentParser(prog="main.py store", description="Inspect and prune the on-disk result store")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("list", help="list stored results, least recently used first")
+    subparsers.add_parser("stats", help="show store location and size")
+    prune_parser = subparsers.add_parser("prune", help="remove stored results")
+    prune_parser.add_argument("--max-bytes", type=int, help="remove least recently used results until the store fits")
+    prune_parser.add_argument("--older-than-days", type=float, help="remove results not used for this many days")
+    prune_parser.add_argument("--query-id", type=int, help="remove all results of this query")
+    subparsers.add_parser("clear", help="remove all stored results")
+    args = parser.parse_args(argv)
+    
+    if not result_store:
+        print("Result store is disabled (DUNE_RESULT_STORE_DIR is empty)")
+        return
+    
+    if args.command == "list":
+        print(f"{'id':<32}  {'query_id':>9}  {'rows':>8}  {'bytes':>12}  {'last used':<19}  execution_id")
+        for entry in result_store.entries():
+            last_used = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(entry['last_used']))
+            print(f"{entry['id']:<32}  {entry['query_id']:>9}  {entry['row_count']:>8}  {entry['bytes']:>12}  {last_used:<19}  {entry['execution_id']}")
+    elif args.command == "stats":
+        print(json.dumps(result_store.stats(), indent=2))
+    elif args.command == "prune":
+        if args.max_bytes is None and args.older_than_days is None and args.query_id is None:
+            parser.error("prune needs --max-bytes, --older-than-days or --query-id")
+        older_than = args.older_than_days * 86400 if args.older_than_days is not None else None
+        removed = result_store.prune(args.max_bytes, older_than, args.query_id)
+        print(f"Removed {len(removed)} entries ({sum(entry['bytes'] for entry in removed)} bytes)")
+    elif args.command == "clear":
+        removed = result_store.prune(max_bytes=0)
+        print(f"Removed {len(removed)} entries")
+
 if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "store":
+        run_store_cli(sys.argv[2:])
+        sys.exit(0)
+    
+    if METRICS_PORT:
+        start_metrics_server()
+    if USE_PROXY_POOL and PROXY_POOL_START == 'eager':
+        proxy_pool.start()
+    
     # 立即启动MCP服务器，不等待代理池初始化
     logger.info("Starting Dune Dashboard MCP server...")
     mcp.run()
@@ -0,0 +1,14 @@
+import os
+import sys
+
+# 测试不使用代理、磁盘存储和持久化状态文件
+os.environ.setdefault("DUNE_USE_PROXY", "0")
+os.environ.setdefault("DUNE_PROXY_POOL_START", "manual")
+os.environ.setdefault("DUNE_PROXY_STATE_FILE", "")
+os.environ.setdefault("DUNE_RESULT_STORE_DIR", "")
+os.environ.setdefault("DUNE_WATCHLIST_FILE", "")
+os.environ.setdefault("DUNE_RATE_LIMIT", "0")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
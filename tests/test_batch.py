@@ -0,0 +1,72 @@
+import asyncio
+import json
+
+import main
+import pytest
+from fake_dune import FakeDuneConfig, FakeDuneServer
+
+
+@pytest.fixture
+def fake_dune(monkeypatch):
+    with FakeDuneServer(FakeDuneConfig(widgets=3, rows=20)) as server:
+        monkeypatch.setattr(main, "GRAPHQL_API", server.graphql_url)
+        monkeypatch.setattr(main, "EXECUTION_API", server.execution_url)
+        main.dashboard_cache.clear()
+        yield server
+        main.dashboard_cache.clear()
+
+
+@pytest.fixture
+def loads(monkeypatch):
+    """记录 load_dashboard 的调用"""
+    calls = []
+    load_dashboard = main.load_dashboard
+
+    async def counting_load_dashboard(url):
+        calls.append(url)
+        return await load_dashboard(url)
+
+    monkeypatch.setattr(main, "load_dashboard", counting_load_dashboard)
+    return calls
+
+
+def get_dashboards_data(urls, **kwargs):
+    async def run():
+        try:
+            return json.loads(await main.get_dashboards_data(urls, **kwargs))
+        finally:
+            await main.http_pool.aclose()
+
+    return asyncio.run(run())
+
+
+def test_urls_of_one_dashboard_are_fetched_once(fake_dune, loads):
+    base = fake_dune.dashboard_url
+    urls = [base, base + "/", base + "?tab=1", base, base + "-1"]
+    result = get_dashboards_data(urls, max_rows=2)
+
+    assert sorted(loads) == sorted([base, base + "-1"])
+    assert [entry["url"] for entry in result["dashboards"]] == urls
+    assert [entry["status"] for entry in result["dashboards"]] == ["ok"] * 5
+    assert result["dashboards"][0]["charts"] == result["dashboards"][1]["charts"]
+    assert result["summary"]["dashboards"] == 5 and result["summary"]["ok"] == 5
+
+
+def test_invalid_url_fails_only_its_entry(fake_dune, loads):
+    result = get_dashboards_data([fake_dune.dashboard_url, "https://example.com/a/b"], max_rows=1)
+
+    ok, invalid = result["dashboards"]
+    assert ok["status"] == "ok" and ok["charts"]
+    assert invalid == {"url": "https://example.com/a/b", "status": "error", "error": "Invalid Dune dashboard URL format"}
+    assert loads == [fake_dune.dashboard_url]
+    assert result["summary"]["failed"] == 1
+
+
+def test_rejects_empty_and_oversized_batches(monkeypatch, loads):
+    monkeypatch.setattr(main, "BATCH_MAX_DASHBOARDS", 2)
+    urls = [f"https://dune.com/a/dashboard-{i}" for i in range(3)]
+
+    assert get_dashboards_data([]) == {"error": "urls must not be empty"}
+    assert get_dashboards_data(urls) == {"error": "At most 2 dashboards per call"}
+    assert "error" in get_dashboards_data(urls[:1], aggregate="median")
+    assert loads == []
@@ -0,0 +1,96 @@
+import asyncio
+
+import main
+import pytest
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(main.time, "monotonic", clock)
+    return clock
+
+
+@pytest.fixture
+def dashboard_cache():
+    main.dashboard_cache.clear()
+    yield main.dashboard_cache
+    main.dashboard_cache.clear()
+
+
+def test_byte_budget_evicts_least_recently_used():
+    cache = main.LRUCache(max_entries=10, max_bytes=100)
+    cache.set("a", 1, 40)
+    cache.set("b", 2, 40)
+    assert cache.get("a") == (1, True)  # a 变为最近使用
+    cache.set("c", 3, 40)
+
+    assert cache.get("b") == (None, False)
+    assert cache.get("a") == (1, True) and cache.get("c") == (3, True)
+    assert cache.stats()["evictions"] == 1 and cache.stats()["bytes"] == 80
+
+
+def test_entry_budget_and_oversized_values():
+    cache = main.LRUCache(max_entries=2, max_bytes=100)
+    cache.set("a", 1, 10)
+    cache.set("b", 2, 10)
+    cache.set("c", 3, 10)
+    assert list(cache.entries) == ["b", "c"]
+
+    cache.set("huge", 4, 101)
+    assert cache.get("huge") == (None, False)
+    assert list(cache.entries) == ["b", "c"]
+
+
+def test_replacing_an_entry_updates_its_size():
+    cache = main.LRUCache(max_entries=10, max_bytes=100)
+    cache.set("a", 1, 60)
+    cache.set("a", 2, 30)
+    assert cache.get("a") == (2, True)
+    assert cache.stats()["bytes"] == 30
+
+
+def test_stale_window(clock):
+    cache = main.LRUCache(max_entries=10, max_bytes=100, ttl=10, stale_ttl=20)
+    cache.set("a", 1, 1)
+
+    clock.now += 10
+    assert cache.get("a") == (1, True)
+    clock.now += 5
+    assert cache.get("a") == (1, False)
+    clock.now += 15
+    assert cache.get("a") == (1, False)
+    clock.now += 1
+    assert cache.get("a") == (None, False)
+    assert "a" not in cache.entries
+    assert (cache.stats()["hits"], cache.stats()["stale_hits"], cache.stats()["misses"]) == (1, 2, 1)
+
+
+def test_stale_dashboard_is_served_while_refreshing(monkeypatch, dashboard_cache):
+    refreshed = {"name": "new"}
+    calls = []
+
+    async def request_dashboard_info(handle, slug):
+        calls.append((handle, slug))
+        dashboard_cache.set((handle, slug), refreshed, 1)
+        return refreshed
+
+    monkeypatch.setattr(main, "request_dashboard_info", request_dashboard_info)
+    # 写入一条刚过期（仍在 stale 窗口内）的缓存
+    dashboard_cache.entries[("h", "s")] = ({"name": "old"}, 1, main.time.monotonic() - main.DASHBOARD_CACHE_TTL - 1)
+
+    async def fetch():
+        served = await main.fetch_dashboard_info("h", "s")
+        await asyncio.gather(*main.dashboard_refreshes.values())
+        return served, await main.fetch_dashboard_info("h", "s")
+
+    assert asyncio.run(fetch()) == ({"name": "old"}, refreshed)
+    assert calls == [("h", "s")]
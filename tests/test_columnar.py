@@ -0,0 +1,83 @@
+import json
+
+import main
+import numpy as np
+import pytest
+
+COLUMNS = {
+    "bools": [True, None, False],
+    "ints": [1, None, -(2 ** 63)],
+    "floats": [1.5, 2, None],
+    "big_ints": [1, 2 ** 70, None],
+    "strings": ["a", None, "é" * 5000],
+    "mixed": [1, "two", {"three": [3]}],
+    "nulls": [None, None, None],
+}
+
+
+@pytest.mark.parametrize("name", list(COLUMNS))
+def test_encode_decode_round_trip(name):
+    values = COLUMNS[name]
+    kind, array, mask = main.encode_column(values)
+    assert main.decode_column(kind, array, mask) == values
+    assert main.decode_column(kind, array[1:], None if mask is None else mask[1:]) == values[1:]
+
+
+def test_encode_column_kinds():
+    kinds = {name: main.encode_column(values)[0] for name, values in COLUMNS.items()}
+    assert kinds == {
+        "bools": "bool", "ints": "int", "floats": "float", "big_ints": "json",
+        "strings": "str", "mixed": "json", "nulls": "bool",
+    }
+    assert main.encode_column([1, 2])[2] is None
+
+
+def test_string_column_uneven_lengths():
+    strings = ["", "x" * 100000, "short", "ü€"]
+    column = main.StringColumn.from_strings(strings)
+    assert len(column) == 4
+    assert column.tolist() == strings
+    assert column.nbytes == sum(len(s.encode()) for s in strings) + 5 * 8
+    assert column[1:3].tolist() == strings[1:3]
+    assert column[3] == "ü€"
+    assert column[np.array([3, 0, 1])].tolist() == [strings[3], strings[0], strings[1]]
+    buffer, offsets = column[2:].compact()
+    assert buffer.tobytes() == "shortü€".encode() and offsets.tolist() == [0, 5, 10]
+
+
+def test_columnar_result_round_trip():
+    rows = [dict(zip(COLUMNS, values)) for values in zip(*COLUMNS.values())]
+    result = main.ColumnarResult.from_rows(list(COLUMNS), rows)
+    assert list(result) == rows
+    assert result[-1] == rows[-1]
+    assert result.take(np.array([2, 0])).rows() == [rows[2], rows[0]]
+    assert result.select(["strings", "ints"], 2).rows() == [{"strings": r["strings"], "ints": r["ints"]} for r in rows[:2]]
+
+
+def test_allocated_columns_demote_values_that_do_not_fit():
+    metadata = [{"name": "date", "type": "timestamp with time zone"}, {"name": "value", "type": "double"}]
+    result = main.ColumnarResult.allocate(["date", "value"], metadata, 2)
+    rows = [
+        {"date": "2024-01-01 00:00:00.000 UTC", "value": 1.5},
+        {"date": "2024-01-02 00:00:00.000 UTC", "value": None},
+        {"date": "yesterday", "value": "n/a"},
+    ]
+    result.write(0, rows[:2])
+    assert result.encoded["date"][0] == "timestamp" and result.encoded["value"][0] == "float"
+    result.write(2, rows[2:])
+    assert result.encoded["date"][0] == "object" and result.encoded["value"][0] == "object"
+    assert list(result) == rows
+
+    copy = main.ColumnarResult.allocate(["date", "value"], metadata, 0)
+    copy.write_columns(0, result, 1)
+    assert list(copy) == rows[1:]
+
+
+def test_double_columns_return_floats():
+    metadata = [{"name": "price", "type": "double"}, {"name": "count", "type": "bigint"}]
+    rows = [{"price": 1, "count": 1}, {"price": 2.5, "count": None}]
+    result = main.ColumnarResult.allocate(["price", "count"], metadata, len(rows))
+    result.write(0, rows)
+    assert result.rows() == [{"price": 1.0, "count": 1}, {"price": 2.5, "count": None}]
+    assert [type(row["price"]) for row in result] == [float, float]
+    assert json.dumps(result.rows()) == '[{"price": 1.0, "count": 1}, {"price": 2.5, "count": null}]'
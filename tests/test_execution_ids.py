@@ -0,0 +1,87 @@
+import asyncio
+
+import main
+import pytest
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    """替换批量 GraphQL 请求和单个查询，记录调用"""
+    calls = {"batches": [], "single": []}
+    responses = []
+
+    async def run_curl_command(url, data, **kwargs):
+        calls["batches"].append(data["variables"])
+        return responses.pop(0)
+
+    async def request_execution_id(query_id, parameters):
+        calls["single"].append(query_id)
+        return f"single-{query_id}"
+
+    monkeypatch.setattr(main, "run_curl_command", run_curl_command)
+    monkeypatch.setattr(main, "request_execution_id", request_execution_id)
+    return calls, responses
+
+
+def load_all(batcher, query_ids):
+    async def run():
+        return await asyncio.gather(*(
+            batcher.load(main.execution_id_key(query_id, []), query_id, []) for query_id in query_ids
+        ))
+
+    return asyncio.run(run())
+
+
+def test_lookups_are_batched_into_one_request(upstream):
+    calls, responses = upstream
+    responses.append({"data": {f"result{i}": {"completedExecutionId": f"batch-{i}"} for i in range(3)}})
+    batcher = main.ExecutionIdBatcher(max_batch=10, window=0)
+
+    assert load_all(batcher, [1, 2, 3]) == ["batch-0", "batch-1", "batch-2"]
+    assert len(calls["batches"]) == 1 and calls["single"] == []
+    assert batcher.stats() == {"lookups": 3, "requests": 1, "fallbacks": 0}
+
+
+def test_only_missing_aliases_fall_back(upstream):
+    calls, responses = upstream
+    responses.append({"data": {"result0": {"completedExecutionId": "batch-0"}, "result1": None}})
+    batcher = main.ExecutionIdBatcher(max_batch=10, window=0)
+
+    assert load_all(batcher, [1, 2, 3]) == ["batch-0", "single-2", "single-3"]
+    assert calls["single"] == [2, 3]
+    assert batcher.stats() == {"lookups": 3, "requests": 3, "fallbacks": 2}
+
+
+def test_failed_batch_is_not_retried_per_query(upstream):
+    calls, responses = upstream
+    responses.append(None)
+    batcher = main.ExecutionIdBatcher(max_batch=10, window=0)
+
+    assert load_all(batcher, [1, 2, 3]) == [None, None, None]
+    assert calls["single"] == []
+    assert batcher.stats()["fallbacks"] == 0
+
+
+def test_batches_are_split_at_max_batch(upstream):
+    calls, responses = upstream
+    responses.append({"data": {f"result{i}": {"completedExecutionId": f"a-{i}"} for i in range(2)}})
+    responses.append({"data": {f"result{i}": {"completedExecutionId": f"b-{i}"} for i in range(2)}})
+    batcher = main.ExecutionIdBatcher(max_batch=2, window=0)
+
+    assert load_all(batcher, [1, 2, 3, 4]) == ["a-0", "a-1", "b-0", "b-1"]
+    assert [batch["queryId0"] for batch in calls["batches"]] == [1, 3]
+
+
+def test_resolve_execution_ids_stops_at_deadline(monkeypatch):
+    async def get_execution_id(query_id, parameters):
+        await asyncio.sleep(0 if query_id == 1 else 10)
+        return f"exec-{query_id}"
+
+    monkeypatch.setattr(main, "get_execution_id", get_execution_id)
+    widgets = [
+        {"visualization": {"query_details": {"query_id": query_id, "parameters": []}}}
+        for query_id in (1, 1, 2)
+    ]
+
+    execution_ids = asyncio.run(main.resolve_execution_ids(widgets, deadline=0.05))
+    assert execution_ids == {main.execution_id_key(1, []): "exec-1", main.execution_id_key(2, []): None}
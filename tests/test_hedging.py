@@ -0,0 +1,73 @@
+import asyncio
+
+import main
+import pytest
+
+URL = "https://example.test/hedge"
+
+
+class Proxies:
+    def __init__(self, *proxies):
+        self.proxies = list(proxies)
+
+    def get_proxy(self):
+        return self.proxies.pop(0) if self.proxies else None
+
+
+@pytest.fixture
+def hedging(monkeypatch):
+    """替换 send_request：每个代理按给定延迟返回结果，记录被取消的请求"""
+    latency = {}
+    cancelled = []
+
+    async def send_request(url, body, headers, proxy, deadline):
+        try:
+            await asyncio.sleep(latency[proxy])
+        except asyncio.CancelledError:
+            cancelled.append(proxy)
+            raise
+        return {"proxy": proxy}
+
+    monkeypatch.setattr(main, "send_request", send_request)
+    monkeypatch.setattr(main, "HEDGE_MIN_DELAY", 0.01)
+    monkeypatch.setattr(main, "HEDGE_MAX_EXTRA", 1)
+    monkeypatch.setattr(main, "hedge_stats", {"hedged": 0, "hedge_won": 0})
+    return latency, cancelled
+
+
+def run_hedged(proxy):
+    async def run():
+        result = await main.send_hedged_request(URL, "{}", {}, proxy, None)
+        await asyncio.sleep(0)  # 让被取消的请求处理取消
+        return result
+
+    return asyncio.run(run())
+
+
+def test_fast_hedge_wins_and_slow_request_is_cancelled(hedging, monkeypatch):
+    latency, cancelled = hedging
+    latency.update({"slow": 10, "fast": 0})
+    monkeypatch.setattr(main, "proxy_pool", Proxies("slow", "fast"))
+
+    assert run_hedged("slow") == {"proxy": "fast"}
+    assert main.hedge_stats == {"hedged": 1, "hedge_won": 1}
+    assert cancelled == ["slow"]
+
+
+def test_waits_for_original_without_another_proxy(hedging, monkeypatch):
+    latency, cancelled = hedging
+    latency["only"] = 0.05
+    monkeypatch.setattr(main, "proxy_pool", Proxies("only"))
+
+    assert run_hedged("only") == {"proxy": "only"}
+    assert main.hedge_stats == {"hedged": 0, "hedge_won": 0}
+    assert cancelled == []
+
+
+def test_original_response_before_delay_is_not_hedged(hedging, monkeypatch):
+    latency, cancelled = hedging
+    latency["direct"] = 0
+    monkeypatch.setattr(main, "proxy_pool", Proxies("other"))
+
+    assert run_hedged("direct") == {"proxy": "direct"}
+    assert main.hedge_stats["hedged"] == 0
@@ -0,0 +1,99 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import main
+import pytest
+
+COLUMNS = ["date", "value"]
+METADATA = [{"name": "date", "type": "timestamp with time zone"}, {"name": "value", "type": "double"}]
+
+
+def series(days, revisions=None, descending=False):
+    start = datetime(2019, 6, 1, tzinfo=timezone.utc)
+    rows = [{"date": (start + timedelta(days=day)).strftime("%Y-%m-%d %H:%M:%S.000 UTC"),
+             "value": (revisions or {}).get(day, day * 0.5)} for day in range(days)]
+    return rows[::-1] if descending else rows
+
+
+def execution(rows, total_row_count=None):
+    return {"execution_succeeded": {"columns": COLUMNS, "columns_metadata": METADATA, "data": rows,
+                                    "total_row_count": len(rows) if total_row_count is None else total_row_count}}
+
+
+class Upstream:
+    """以内存中的行代替执行API的分页接口"""
+
+    def __init__(self):
+        self.rows = []
+
+    async def request_result_page(self, execution_id, query_id, parameters, columns, offset, limit):
+        return execution(self.rows[offset:offset + limit], len(self.rows))
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    upstream = Upstream()
+    monkeypatch.setattr(main, "request_result_page", upstream.request_result_page)
+    monkeypatch.setattr(main, "result_store", None)
+    for cache in (main.result_cache, main.latest_results):
+        cache.clear()
+    main.metrics.reset()
+    return upstream
+
+
+def remember(rows, execution_id="01OLD"):
+    key = main.result_key(execution_id, 1, COLUMNS, None)
+    succeeded = execution(rows)["execution_succeeded"]
+    response = {"execution_succeeded": {**succeeded, "data": main.columnar_rows(succeeded)}}
+    main.result_cache.set(key, response, main.payload_size(response))
+    main.remember_latest_result(key, [], response)
+
+
+def incremental(execution_id="01NEW"):
+    return asyncio.run(main.request_incremental_result(execution_id, 1, [], COLUMNS, None))
+
+
+def outcomes():
+    return dict(main.metrics.samples().get("dune_incremental_results_total", []))
+
+
+@pytest.mark.parametrize("descending", [False, True])
+def test_merges_new_rows_into_unchanged_history(upstream, descending):
+    remember(series(300, descending=descending))
+    upstream.rows = series(302, descending=descending)
+
+    response = incremental()
+    succeeded = response["execution_succeeded"]
+    assert list(succeeded["data"]) == upstream.rows
+    assert succeeded["incremental"]["base_execution_id"] == "01OLD"
+    assert succeeded["incremental"]["reused_rows"] == 299
+    assert succeeded["incremental"]["verified_rows"] > 0
+
+
+@pytest.mark.parametrize("descending", [False, True])
+@pytest.mark.parametrize("day", [9, 297])
+def test_revised_history_falls_back_to_full_download(upstream, descending, day):
+    remember(series(300, descending=descending))
+    upstream.rows = series(301, revisions={day: -999.0}, descending=descending)
+
+    assert incremental() is None
+    assert outcomes() == {(("outcome", "mismatch"),): 1}
+
+
+def test_merged_results_are_not_persisted(upstream, monkeypatch, tmp_path):
+    store = main.ResultStore(str(tmp_path), 1 << 30)
+    monkeypatch.setattr(main, "result_store", store)
+    monkeypatch.setattr(main, "INCREMENTAL_ENABLED", True)
+    remember(series(300))
+    upstream.rows = series(301)
+
+    async def load():
+        key = main.result_key("01NEW", 1, COLUMNS, None)
+        response = await main.load_chart_data(key, "01NEW", 1, [], COLUMNS, None)
+        await asyncio.gather(*main.result_store_writes)
+        return key, response
+
+    key, response = asyncio.run(load())
+    assert response["execution_succeeded"]["incremental"]["downloaded_rows"] == 2
+    assert main.result_cache.get(key)[0] is response
+    assert store.load(key) is None
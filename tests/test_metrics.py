@@ -0,0 +1,75 @@
+import asyncio
+
+import main
+import pytest
+
+
+@pytest.fixture
+def metrics():
+    main.metrics.reset()
+    yield main.metrics
+    main.metrics.reset()
+
+
+def test_counters_render_with_help_type_and_labels(metrics):
+    metrics.inc('dune_http_requests_total', endpoint='graphql', route='direct', outcome='ok')
+    metrics.inc('dune_http_requests_total', 2, endpoint='graphql', route='direct', outcome='ok')
+    lines = main.render_metrics().splitlines()
+
+    assert "# TYPE dune_http_requests_total counter" in lines
+    assert any(line.startswith("# HELP dune_http_requests_total ") for line in lines)
+    assert 'dune_http_requests_total{endpoint="graphql",outcome="ok",route="direct"} 3' in lines
+
+
+def test_histograms_render_cumulative_buckets(metrics):
+    for value in (0.5, 1.0, 30.0):
+        metrics.observe('dune_stage_duration_seconds', value, buckets=(0.5, 1.0, 5.0), stage='chart_data')
+    lines = main.render_metrics().splitlines()
+
+    assert "# TYPE dune_stage_duration_seconds histogram" in lines
+    assert [line for line in lines if line.startswith("dune_stage_duration_seconds")] == [
+        'dune_stage_duration_seconds_bucket{stage="chart_data",le="0.5"} 1',
+        'dune_stage_duration_seconds_bucket{stage="chart_data",le="1.0"} 2',
+        'dune_stage_duration_seconds_bucket{stage="chart_data",le="5.0"} 2',
+        'dune_stage_duration_seconds_bucket{stage="chart_data",le="+Inf"} 3',
+        'dune_stage_duration_seconds_sum{stage="chart_data"} 31.5',
+        'dune_stage_duration_seconds_count{stage="chart_data"} 3',
+    ]
+
+
+def test_timed_records_stage_duration_even_on_error(metrics):
+    @main.timed('test_stage')
+    async def fail():
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        asyncio.run(fail())
+    (labels, histogram), = metrics.samples()['dune_stage_duration_seconds']
+    assert labels == (('stage', 'test_stage'),) and histogram.count == 1
+
+
+def test_component_metrics_are_rendered(metrics):
+    text = main.render_metrics()
+    for line in ("# TYPE dune_cache_requests_total counter", "# TYPE dune_proxy_pool_proxies gauge",
+                 "# TYPE dune_hedged_requests_total counter", "# TYPE dune_watched_dashboards gauge"):
+        assert line in text
+    assert text.endswith("\n")
+
+
+def test_format_labels_escapes_values():
+    assert main.format_labels({}) == ''
+    assert main.format_labels({"path": 'a\\b "c"\nd'}) == '{path="a\\\\b \\"c\\"\\nd"}'
+    assert main.format_labels((("a", 1), ("b", "x"))) == '{a="1",b="x"}'
+
+
+def test_format_value():
+    assert main.format_value(float('inf')) == '+Inf'
+    assert main.format_value(0.25) == '0.25'
+    assert main.format_value(3) == '3'
+
+
+def test_reset_clears_samples(metrics):
+    metrics.inc('dune_http_retries_total', endpoint='graphql')
+    metrics.observe('dune_tool_response_bytes', 100, buckets=(1000,), tool='x')
+    metrics.reset()
+    assert metrics.samples() == {}
@@ -0,0 +1,105 @@
+import asyncio
+from types import SimpleNamespace
+
+import main
+import pytest
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(main.time, "monotonic", clock)
+    return clock
+
+
+def test_throttle_halves_rate_once_per_interval_and_recovers(clock):
+    bucket = main.TokenBucket(rate=8, burst=8, min_rate=1)
+
+    bucket.on_throttle()
+    assert bucket.rate == 4
+    bucket.on_throttle()  # 同一波过载的其余响应
+    assert bucket.rate == 4 and bucket.throttled == 2
+
+    clock.now += bucket.DECREASE_INTERVAL
+    bucket.on_throttle()
+    bucket.on_throttle()
+    clock.now += bucket.DECREASE_INTERVAL
+    bucket.on_throttle()
+    assert bucket.rate == 1  # 不低于 min_rate
+
+    for _ in range(1000):
+        bucket.on_success()
+    assert bucket.rate == bucket.max_rate == 8
+
+
+def test_retry_after_pauses_the_bucket(clock):
+    bucket = main.TokenBucket(rate=100, burst=10)
+    assert bucket.reserve() == 0
+
+    bucket.on_throttle(retry_after=5)
+    assert bucket.reserve() >= 5
+
+    clock.now += 5
+    assert bucket.reserve() == 0  # 暂停期间按减半的速率补充
+    assert bucket.rate == 50
+
+
+def test_retry_after_is_capped(clock):
+    bucket = main.TokenBucket(rate=10, burst=1)
+    bucket.on_throttle(retry_after=main.RETRY_MAX_DELAY * 10)
+    assert bucket.blocked_until == clock.now + main.RETRY_MAX_DELAY
+
+
+def test_reserve_queues_waiters_and_respects_deadline(clock):
+    bucket = main.TokenBucket(rate=2, burst=1)
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == pytest.approx(0.5)
+    assert bucket.reserve() == pytest.approx(1.0)
+
+    assert bucket.reserve(deadline=clock.now + 1.0) is None
+    assert bucket.reserve(deadline=clock.now + 1.5) == pytest.approx(1.5)
+
+
+def test_acquire_past_deadline_releases_reservations(clock):
+    limiter = main.RateLimiter(rate=100, burst=1, proxy_rate=1, proxy_burst=1)
+    url, proxy = "https://example.test/api", "http://proxy:1"
+
+    assert asyncio.run(limiter.acquire(url, proxy)) is True
+    tokens = limiter.endpoint_bucket(url).tokens
+
+    # 端点令牌要等 0.01s，代理令牌要等 1s：超过 deadline，端点的预约应退还
+    assert asyncio.run(limiter.acquire(url, proxy, deadline=clock.now + 0.5)) is False
+    assert limiter.endpoint_bucket(url).tokens == tokens
+
+
+def test_throttle_via_proxy_slows_only_that_proxy(clock):
+    limiter = main.RateLimiter(rate=10, burst=10, proxy_rate=4, proxy_burst=4)
+    url = "https://example.test/api"
+
+    limiter.on_throttle(url, "http://proxy:1")
+    assert limiter.proxy_bucket("http://proxy:1").rate == 2
+    assert limiter.proxy_bucket("http://proxy:2").rate == 4
+    assert limiter.endpoint_bucket(url).rate == 10
+
+    limiter.on_throttle(url, None)
+    assert limiter.endpoint_bucket(url).rate == 5
+    assert limiter.stats()["throttled_proxies"] == 1
+
+
+def test_parse_retry_after():
+    def response(value):
+        return SimpleNamespace(headers={} if value is None else {"retry-after": value})
+
+    assert main.parse_retry_after(response("3")) == 3.0
+    assert main.parse_retry_after(response("1.5")) == 1.5
+    assert main.parse_retry_after(response("-2")) == 0.0
+    assert main.parse_retry_after(response("Wed, 21 Oct 2026 07:28:00 GMT")) is None
+    assert main.parse_retry_after(response(None)) is None
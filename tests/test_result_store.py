@@ -0,0 +1,53 @@
+import os
+
+import main
+
+
+def test_uneven_string_lengths_are_stored_compactly(tmp_path):
+    wide = "x" * 20000
+    rows = [{"id": i, "note": wide if i == 3 else f"row {i}", "tag": None if i % 2 else "é"} for i in range(8000)]
+    key = ("01EXEC", 1, ("id", "note", "tag"), "{}", 8000)
+    store = main.ResultStore(str(tmp_path), 1 << 30)
+    store.save(key, {"execution_succeeded": {"columns": ["id", "note", "tag"], "data": rows, "total_row_count": 8000}})
+
+    # 字节数只取决于字符串本身的长度，而不是最长的一格
+    size = sum(entry["bytes"] for entry in store.entries())
+    assert size < len(wide) + 8000 * 40
+
+    loaded = store.load(key)["execution_succeeded"]["data"]
+    kind, array, _ = loaded.encoded["note"]
+    assert kind == "str"
+    assert isinstance(array, main.StringColumn)
+    assert isinstance(array.buffer, main.np.memmap) and isinstance(array.offsets, main.np.memmap)
+    assert list(loaded) == rows
+    assert loaded.rows(2, 5) == rows[2:5]
+    assert loaded.take(main.np.array([3, 0, 7999])).rows() == [rows[3], rows[0], rows[7999]]
+    assert sorted(os.listdir(store.entry_path(key))) == [
+        "c0.npy", "c1.npy", "c1.offsets.npy", "c2.mask.npy", "c2.npy", "c2.offsets.npy", "meta.json",
+    ]
+
+
+def test_save_load_round_trip(tmp_path):
+    metadata = [{"name": "date", "type": "timestamp with time zone"}, {"name": "value", "type": "double"},
+                {"name": "label", "type": "varchar"}]
+    rows = [
+        {"date": "2024-01-01 00:00:00.000 UTC", "value": 1.5, "label": "a"},
+        {"date": None, "value": None, "label": {"nested": [1, None]}},
+        {"date": "2024-01-03 12:30:00.250 UTC", "value": -2.0, "label": None},
+    ]
+    succeeded = {"execution_id": "01EXEC", "columns": ["date", "value", "label"], "columns_metadata": metadata,
+                 "data": rows, "total_row_count": 3}
+    response = {"execution_succeeded": {**succeeded, "data": main.columnar_rows(succeeded)}}
+    key = main.result_key("01EXEC", 7, ["date", "value", "label"], None)
+    store = main.ResultStore(str(tmp_path), 1 << 30)
+    assert store.load(key) is None
+
+    store.save(key, response)
+    loaded = store.load(key)["execution_succeeded"]
+    assert list(loaded["data"]) == rows
+    assert {k: v for k, v in loaded.items() if k != "data"} == {k: v for k, v in succeeded.items() if k != "data"}
+    assert loaded["data"].encoded["date"][0] == "timestamp"
+    assert [entry["query_id"] for entry in store.entries()] == [7]
+
+    store.prune(query_id=7)
+    assert store.load(key) is None
@@ -0,0 +1,65 @@
+import asyncio
+
+import main
+
+
+def test_concurrent_calls_share_one_request():
+    flight = main.SingleFlight()
+    calls = []
+
+    async def fetch(value):
+        calls.append(value)
+        await asyncio.sleep(0.01)
+        return {"value": value}
+
+    async def run():
+        results = await asyncio.gather(*(flight.do("key", fetch, 1) for _ in range(5)))
+        later = await flight.do("key", fetch, 2)
+        return results, later
+
+    results, later = asyncio.run(run())
+    assert calls == [1, 2]
+    assert all(result is results[0] for result in results)
+    assert later == {"value": 2}
+    assert flight.stats() == {"calls": 6, "upstream": 2, "coalesced": 4, "in_flight": 0}
+
+
+def test_cancelled_caller_does_not_cancel_the_others():
+    flight = main.SingleFlight()
+    async def run():
+        gate = asyncio.Event()
+
+        async def fetch():
+            await gate.wait()
+            return "done"
+
+        first = asyncio.create_task(flight.do("key", fetch))
+        second = asyncio.create_task(flight.do("key", fetch))
+        await asyncio.sleep(0)
+        first.cancel()
+        await asyncio.sleep(0)
+        gate.set()
+        return first, await second
+
+    first, result = asyncio.run(run())
+    assert first.cancelled()
+    assert result == "done"
+
+
+def test_errors_reach_every_caller_and_are_not_kept():
+    flight = main.SingleFlight()
+    calls = []
+
+    async def fail():
+        calls.append(1)
+        await asyncio.sleep(0)
+        raise RuntimeError("upstream failed")
+
+    async def run():
+        results = await asyncio.gather(flight.do("key", fail), flight.do("key", fail), return_exceptions=True)
+        retry = await asyncio.gather(flight.do("key", fail), return_exceptions=True)
+        return results + retry
+
+    results = asyncio.run(run())
+    assert [str(result) for result in results] == ["upstream failed"] * 3
+    assert len(calls) == 2
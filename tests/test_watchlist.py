@@ -0,0 +1,129 @@
+import asyncio
+import json
+
+import main
+import pytest
+
+URL = "https://dune.com/alice/dex-volume"
+NODE = {"name": "DEX volume", "visualizationWidgets": [{"id": 1}]}
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    """替换刷新用到的上游调用；fail 为 True 时元数据请求返回None"""
+    state = {"fail": False, "refreshes": 0}
+
+    async def refresh_dashboard_info(handle, slug):
+        state["refreshes"] += 1
+        return None if state["fail"] else NODE
+
+    async def fetch_dashboard_charts(dashboard_node):
+        return [{"chart": 1}]
+
+    monkeypatch.setattr(main, "refresh_dashboard_info", refresh_dashboard_info)
+    monkeypatch.setattr(main, "fetch_dashboard_charts", fetch_dashboard_charts)
+    monkeypatch.setattr(main, "WATCH_JITTER", 0)
+    return state
+
+
+def refresh(watchlist, entry):
+    async def run():
+        watchlist.wakeup = asyncio.Event()
+        watchlist.semaphore = asyncio.Semaphore(1)
+        await watchlist.refresh(entry)
+
+    asyncio.run(run())
+
+
+def test_add_remove_and_change_interval():
+    watchlist = main.Watchlist(path="")
+    entry, error = watchlist.add(URL, interval=600)
+    assert error is None and entry["interval"] == 600
+
+    assert watchlist.add(URL + "/", interval=1)[0] is entry  # 同一仪表盘，间隔不低于下限
+    assert entry["interval"] == main.WATCH_MIN_INTERVAL
+    assert watchlist.add("https://example.com/nope") == (None, "Invalid Dune dashboard URL format")
+
+    assert watchlist.remove(URL) is True
+    assert watchlist.remove(URL) is False
+    assert watchlist.entries == {}
+
+
+def test_save_and_load_round_trip(tmp_path):
+    path = str(tmp_path / "watch" / "watchlist.json")
+    watchlist = main.Watchlist(path=path)
+    watchlist.add(URL, interval=120)
+    watchlist.save()
+    assert json.loads(open(path).read()) == {"dashboards": [{"url": URL, "interval": 120}]}
+
+    loaded = main.Watchlist(path=path)
+    assert loaded.load() == 1
+    entry = loaded.entries[("alice", "dex-volume")]
+    assert entry["interval"] == 120 and entry["snapshot"] is None
+
+
+def test_load_accepts_plain_urls_and_skips_invalid(tmp_path):
+    path = tmp_path / "watchlist.json"
+    path.write_text(json.dumps([URL, {"url": "not a url"}]))
+    watchlist = main.Watchlist(path=str(path))
+    assert watchlist.load() == 1
+    assert watchlist.entries[("alice", "dex-volume")]["interval"] == main.WATCH_INTERVAL
+
+
+def test_refresh_stores_snapshot(upstream):
+    watchlist = main.Watchlist(path="")
+    entry, _ = watchlist.add(URL, interval=300)
+    refresh(watchlist, entry)
+
+    dashboard_node, charts, freshness = watchlist.snapshot(URL)
+    assert dashboard_node is NODE and charts == [{"chart": 1}]
+    assert freshness["source"] == "watchlist" and freshness["interval"] == 300
+    assert entry["next_refresh"] == pytest.approx(main.time.time() + 300, abs=5)
+    assert watchlist.stats()["warm"] == 1
+
+
+def test_failed_refresh_keeps_snapshot_and_backs_off(upstream):
+    watchlist = main.Watchlist(path="")
+    entry, _ = watchlist.add(URL, interval=300)
+    refresh(watchlist, entry)
+    snapshot = entry["snapshot"]
+
+    upstream["fail"] = True
+    refresh(watchlist, entry)
+    refresh(watchlist, entry)
+
+    assert entry["snapshot"] is snapshot
+    assert entry["consecutive_failures"] == 2
+    assert entry["last_error"] == "Dashboard not found or access denied by Cloudflare."
+    assert entry["next_refresh"] == pytest.approx(main.time.time() + 2 * main.WATCH_RETRY_DELAY, abs=5)
+    assert watchlist.snapshot(URL)[2]["last_error"] == entry["last_error"]
+
+
+def test_start_without_entries_does_not_schedule(tmp_path):
+    watchlist = main.Watchlist(path=str(tmp_path / "missing.json"))
+
+    async def run():
+        watchlist.start()
+        return watchlist.task
+
+    assert asyncio.run(run()) is None
+    assert watchlist.loaded
+
+
+def test_scheduler_refreshes_due_dashboards_until_stopped(upstream):
+    watchlist = main.Watchlist(path="")
+    watchlist.add(URL, interval=300)
+
+    async def run():
+        watchlist.start()
+        task = watchlist.task
+        for _ in range(100):
+            if watchlist.snapshot(URL):
+                break
+            await asyncio.sleep(0.01)
+        await watchlist.stop()
+        return task
+
+    task = asyncio.run(run())
+    assert upstream["refreshes"] == 1
+    assert task.cancelled() and watchlist.task is None